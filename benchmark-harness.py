@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Usage:
+  benchmark-harness.py [options]
+  benchmark-harness.py --help
+
+Options:
+  -h --help                        Show this help screen
+  --baseline=path                  Compare the results with those (JSON) of an earlier benchmark; exits
+                                       with status 1 if the harness has regressed
+  --concurrency=num                Number of API calls executed in parallel by the sweep throughput
+                                       benchmark (default: 8)
+  --config-file=path               Config file path, if not 'perf_config.json'; only the 'Mock_Server'
+                                       section is used
+  --duration=seconds               Duration of the load test throughput benchmark (default: 10)
+  --latency=ms                     Latency of the mock API in the overhead benchmark (default: 5)
+  --output=path                    Write the results (JSON) to this file, e.g. to be used as a baseline
+  --passes=num                     Number of times each API call is made by the overhead and sweep
+                                       throughput benchmarks (default: 100)
+  --target-rps=rps                 Request rate of the load test throughput benchmark (default: 2000)
+  --tolerance=fraction             Relative change of a result beyond which the harness has regressed
+                                       (default: 0.2)
+"""
+
+from docopt import docopt
+import perf
+import prettytable
+import requests
+
+import collections
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+# results of the benchmarks: name -> (description, whether higher is better, minimum absolute change
+# to be considered a regression, so that noise on small values is not)
+METRICS = collections.OrderedDict([
+    ('overhead_p50_ms', ('Client-side time not spent by the API, p50 (ms)', False, 0.1)),
+    ('overhead_p99_ms', ('Client-side time not spent by the API, p99 (ms)', False, 0.5)),
+    ('pass_overhead_ms', ('Harness time per request outside of the request (ms)', False, 0.1)),
+    ('under_reported_pct', ('Client-side times below the latency of the API (%)', False, 1)),
+    ('sweep_rps', ('Sweep throughput (req/s)', True, 0)),
+    ('load_rps', ('Load test throughput (req/s)', True, 0)),
+    ('load_p99_ms', ('Load test latency, p99 (ms)', False, 1))
+])
+
+
+def start_mock_api(latency):
+    """Start the mock API with a constant latency, in a process of its own so that it does not compete
+    with the harness for the interpreter; returns the process along with the URL of the API spec."""
+    with socket.socket() as s:
+        s.bind(('localhost', 0))
+        port = s.getsockname()[1]
+
+    command = [sys.executable, os.path.join(script_dir, 'mock-api-server.py'),
+               f'--address=localhost:{port}', f'--latency={latency}']
+    if arguments['--config-file']:
+        command.append(f"--config-file={arguments['--config-file']}")
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+
+    url = f"http://localhost:{port}{mock_server_config.get('Spec_Path', '/api/v1/openapi')}"
+    deadline = time.monotonic() + 10
+    while True:
+        try:
+            requests.get(url, timeout=1).raise_for_status()
+            return process, url
+        except requests.exceptions.RequestException:
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.kill()
+                raise RuntimeError('The mock API could not be started')
+            time.sleep(0.1)
+
+
+def run_benchmark(latency, config, mode='sweep'):
+    """Run ApiPerformance against the mock API; returns the merged client-side and server-side response
+    time histograms, the number of requests made and the elapsed time (in seconds)."""
+    process, url = start_mock_api(latency)
+    try:
+        api_perf_tester = perf.ApiPerformance(work_dir, url, dict({'Headers': {}, 'Call_Plan_Cache': ''},
+                                                                  **config), logger=logger)
+        api_perf_tester.build_api_calls()
+        started = time.perf_counter()
+        if mode == 'load_test':
+            api_perf_tester.run_load_test()
+        else:
+            api_perf_tester.run()
+        elapsed = time.perf_counter() - started
+    finally:
+        process.terminate()
+        process.wait()
+
+    client_times = perf.histogram.LatencyHistogram()
+    server_times = perf.histogram.LatencyHistogram()
+    num_requests = 0
+    for metrics in api_perf_tester.call_metrics.values():
+        client_times.merge(metrics.client_times)
+        server_times.merge(metrics.server_times)
+        num_requests += metrics.client_times.count + sum(metrics.errors.values())
+    if not client_times.count:
+        raise RuntimeError('No request to the mock API succeeded')
+    return client_times, server_times, num_requests, elapsed
+
+
+arguments = docopt(__doc__, help=True)
+
+config_file_path = arguments.get('--config-file') or 'perf_config.json'
+try:
+    with open(config_file_path, 'r') as f:
+        config = json.load(f)
+except FileNotFoundError:
+    if arguments.get('--config-file'):
+        print(f'Could not find config file: {config_file_path} - exiting')
+        sys.exit(1)
+    config = {}
+mock_server_config = config.get('Mock_Server', {})
+
+script_dir = os.path.dirname(os.path.realpath(__file__))
+# nothing is written to the working directory of the benchmarked harness (call plan cache, reports...)
+work_dir = tempfile.mkdtemp()
+logger = perf.utils.get_logger(logging.WARNING, 'api_perf_benchmark_logger')
+
+latency = float(arguments['--latency'] or 5)
+passes = int(arguments['--passes'] or 100)
+results = collections.OrderedDict()
+
+# overhead and accuracy: requests are made one at a time against an API of known latency
+print(f'Measuring the overhead of the harness ({passes} passes, {latency} ms latency)...')
+client_times, server_times, num_requests, elapsed = run_benchmark(latency, {'Number_Of_Passes': passes})
+results['overhead_p50_ms'] = client_times.percentile(50) - server_times.percentile(50)
+results['overhead_p99_ms'] = client_times.percentile(99) - server_times.percentile(99)
+results['pass_overhead_ms'] = elapsed * 1000 / num_requests - client_times.mean()
+results['under_reported_pct'] = sum(count for value, count in client_times.get_buckets()
+                                    if value < latency) / client_times.count * 100
+
+# maximum throughput: the mock API responds at once
+concurrency = int(arguments['--concurrency'] or 8)
+print(f'Measuring the sweep throughput of the harness ({concurrency} concurrent API calls)...')
+_, _, num_requests, elapsed = run_benchmark(0, {'Number_Of_Passes': passes, 'Concurrency': concurrency})
+results['sweep_rps'] = num_requests / elapsed
+
+duration = float(arguments['--duration'] or 10)
+target_rps = float(arguments['--target-rps'] or 2000)
+print(f'Measuring the load test throughput of the harness ({target_rps} req/s for {duration} s)...')
+client_times, _, num_requests, elapsed = run_benchmark(
+    0, {'Load_Test': {'Duration': duration, 'Target_RPS': target_rps}}, mode='load_test')
+# requests the harness could not send in time are still made, later: the throughput is what was
+# achieved until the last response, and the latency shows the delay
+results['load_rps'] = num_requests / elapsed
+results['load_p99_ms'] = client_times.percentile(99)
+
+baseline = {}
+if arguments['--baseline']:
+    with open(arguments['--baseline'], 'r') as f:
+        baseline = json.load(f)
+
+tolerance = float(arguments['--tolerance'] or 0.2)
+table = prettytable.PrettyTable()
+table.field_names = ['Benchmark', 'Result', 'Baseline', 'Change', 'Status']
+table.align['Benchmark'] = 'l'
+regressed = False
+for name, (description, higher_is_better, min_change) in METRICS.items():
+    value = results[name]
+    if name not in baseline:
+        table.add_row([description, '%.2f' % value, 'N/A', 'N/A', 'OK'])
+        continue
+
+    change = value - baseline[name]
+    relative_change = change / abs(baseline[name]) if baseline[name] else float('inf') if change else 0
+    worse = -relative_change if higher_is_better else relative_change
+    status = 'REGRESSED' if worse > tolerance and abs(change) > min_change else 'OK'
+    regressed = regressed or status == 'REGRESSED'
+    table.add_row([description, '%.2f' % value, '%.2f' % baseline[name], '%+.1f%%' % (relative_change * 100),
+                   status])
+print(table)
+
+if arguments['--output']:
+    with open(arguments['--output'], 'w') as f:
+        json.dump(results, f, indent=2)
+
+sys.exit(1 if regressed else 0)
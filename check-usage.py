@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Usage:
+  check-usage.py [<script>...]
+  check-usage.py --help
+
+Check that every option of the usage (docopt) text of the scripts (by default, those of this
+repository) can be given on its own. docopt takes any help line starting with an option name for the
+definition of an option, so a wrapped help line such as "replayed with --replay" defines it twice and
+makes it unusable ("--replay is not a unique prefix").
+"""
+
+from docopt import docopt, DocoptExit
+
+import ast
+import os
+import re
+import sys
+
+SCRIPTS = ['benchmark-harness.py', 'measure-api-response-time.py', 'mock-api-server.py']
+
+# an option definition of the Options section, e.g. "  --config-file=path   Config file path..."
+OPTION_PATTERN = re.compile(r'^  (?:-\w[ ,]+)?(--[\w-]+)(=\S+)?(?:  |$)')
+
+
+def check_usage(script_path):
+    """Get the list of the problems of the usage text of a script (which is not executed)."""
+    with open(script_path, 'r') as f:
+        doc = ast.get_docstring(ast.parse(f.read()), clean=False)
+    options_section = doc[doc.index('Options:'):]
+
+    problems = []
+    for line in options_section.split('\n')[1:]:
+        if line.strip().startswith('-') and not OPTION_PATTERN.match(line):
+            problems.append(f'help line starting with an option: {line.strip()}')
+
+        match = OPTION_PATTERN.match(line)
+        if not match or match.group(1) == '--help':
+            continue
+        option, argument = match.groups()
+        try:
+            arguments = docopt(doc, argv=[option + ('=x' if argument else '')], help=False)
+        except (DocoptExit, SystemExit) as e:
+            problems.append(f'{option} cannot be given: {str(e).splitlines()[0]}')
+            continue
+        if not arguments.get(option):
+            problems.append(f'{option} is not parsed')
+    return problems
+
+
+arguments = docopt(__doc__, help=True)
+script_dir = os.path.dirname(os.path.realpath(__file__))
+scripts = arguments['<script>'] or [os.path.join(script_dir, script) for script in SCRIPTS]
+
+failed = False
+for script in scripts:
+    for problem in check_usage(script):
+        print(f'{os.path.basename(script)}: {problem}')
+        failed = True
+
+sys.exit(1 if failed else 0)
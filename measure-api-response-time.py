@@ -6,16 +6,87 @@ Usage:
 
 Options:
   -h --help                        Show this help screen
-  --api-spec-url=url               URL of the API spec
+  --adaptive                       Make each API call until its response time has converged (see
+                                       'Adaptive_Sampling') rather than 'Number_Of_Passes' times
+  --api-base-url=url               Base URL of the API calls, if not the value of 'Api_Base_Url' in
+                                       the config file or the URL described by the API spec
+  --api-spec-url=url               URL or local file path of the API spec
+  --baseline-run=id                Compare results with the given run of the results store rather
+                                       than the latest one (implies --compare-baseline)
+  --capacity-search                Capacity search mode: step up the request rate (or concurrency) of
+                                       each endpoint until its response times or errors exceed
+                                       their limits, and report its max sustainable request rate
+                                       (see 'Capacity_Search')
   --config-file                    Config file path, if not 'perf_config.json'
   --checkstyle                     Write checkstyle and HTML output files
+  --cold-vs-warm                   Also measure each API call with caching defeated by a unique query
+                                       parameter or header (see 'Cold_Cache')
+  --compare-baseline               Compare results with the latest run of the results store against
+                                       the same API; statistically significant regressions are
+                                       reported as checkstyle errors
+  --compare-payloads               Compare the response sizes and times of each endpoint across
+                                       content encodings (Accept-Encoding) and page sizes, and mark
+                                       the cheapest settings of each (see 'Payload_Comparison')
+  --coordinator=address            Address (host:port) on which the coordinator of a distributed run
+                                       listens, if not the value of 'Address' in the 'Distributed'
+                                       section of the config file (default: localhost:6000)
+  --concurrency=num                Number of API calls to execute in parallel, if not the value of
+                                       'Concurrency' in the config file (default: 1)
+  --coverage-strength=n            Test a covering array of query parameters in which every
+                                       combination of n parameter values appears at least once,
+                                       rather than every combination of all parameters
   --debug                          Debugging mode (outputs details regarding API call list
                                         construction)
+  --duration=seconds               Duration of the load test, if not the value of 'Duration' in the
+                                       'Load_Test' section of the config file
   --dry-run                        Build the list of API calls, but don't execute them. Most useful
                                        when used with '--debug'. Renders --checkstyle and --html
                                        inert.
-  --html                           Write HTML output file
+  --html                           Write the HTML report file
+  --local-workers=num              Number of the workers of a distributed run to start on this host
+  --load-test                      Sustained load mode: drive the API calls at a target request
+                                       rate for a fixed duration and report throughput and
+                                       latency percentiles rather than per-call averages
+  --metrics-address=address        Serve the metrics of the run in the Prometheus text format at
+                                       http://address/metrics while it is in progress, if not the
+                                       value of 'Metrics_Address' in the 'Live_Monitor' section of
+                                       the config file
+  --payload-profiling              Report the response sizes (as transferred and once decoded),
+                                       bytes per object and transfer throughput of each API call
   --print                          Print results table to stdout
+  --processes=num                  Number of client processes across which API calls are spread, if
+                                       not the value of 'Processes' in the config file (default: 1)
+  --profile                        Report the time spent by the harness itself on each API call
+                                       (preparing requests, decoding and recording responses,
+                                       updating the results) next to its response times, and warn
+                                       when it is a significant share of them (see 'Harness_Profiling')
+  --profile-output=path            Profile the harness with cProfile while making API calls and write
+                                       the profile (pstats) to this file; implies --profile
+  --progress                       Report the progress of the run (API calls done, request rate,
+                                       response time percentiles) to stderr while it is in progress
+  --record-plan=path               Record the API calls made (with the IDs pooled for path templates)
+                                       to a call plan file (JSON lines), to be replayed with --replay
+  --replay=path                    Make the API calls of a call plan file (JSON lines) rather than
+                                       those described by the API spec, which is not retrieved.
+                                       Requires the API base URL (--api-base-url or 'Api_Base_Url'
+                                       in the config file).
+  --store                          Append results to the results store (see 'Results_Store')
+  --stream                         Append results to a file as they come rather than keep them in
+                                       memory, for runs of any length (see 'Streaming')
+  --target-rps=rps                 Request rate of the load test, if not the value of 'Target_RPS'
+                                       in the 'Load_Test' section of the config file
+  --transport-timing               Report the time spent on each phase of the requests (DNS,
+                                       connect, TLS, time to first byte, download, JSON decode)
+  --validate                       Validate a sample of the responses against the responses of the
+                                       API spec (see 'Response_Validation')
+  --worker                         Run as a worker of a distributed run: connect to the coordinator
+                                       and make the API calls it hands out
+  --workers=num                    Distribute the API calls across this number of worker processes
+                                       (see 'Distributed')
+  --write-test                     Benchmark the write operations (POST, PUT, PATCH, DELETE) of the
+                                       resources of the API spec on fixtures created (and deleted)
+                                       for the purpose, and report their throughput and latency
+                                       percentiles (see 'Write_Test')
 """
 
 from docopt import docopt
@@ -27,7 +98,9 @@ import sys
 
 arguments = docopt(__doc__, help=True)
 api_spec_url = arguments.get('--api-spec-url')
-if not api_spec_url:
+if arguments['--replay']:
+    api_spec_url = None
+elif not api_spec_url:
     api_spec_url = 'http://localhost:8080/api/v1/openapi'
 
 config_file_path = arguments.get('--config-file')
@@ -43,7 +116,80 @@ except FileNotFoundError:
 
 script_dir = os.path.dirname(os.path.realpath(__file__))
 
-api_perf_tester = perf.ApiPerformance(script_dir, api_spec_url, config)
+distributed_config = config.get('Distributed', {})
+coordinator_address = arguments['--coordinator'] or distributed_config.get('Address', 'localhost:6000')
+
+if arguments['--worker']:
+    if not distributed_config.get('Auth_Key'):
+        print('Auth_Key must be set in the Distributed section of the config file - exiting')
+        sys.exit(1)
+    perf.distributed.run_worker(perf.distributed.parse_address(coordinator_address),
+                                distributed_config.get('Auth_Key', '').encode(), script_dir)
+    sys.exit(0)
+
+api_perf_tester = perf.ApiPerformance(script_dir, api_spec_url, config,
+                                      api_base_url=arguments.get('--api-base-url'))
+
+if arguments['--adaptive'] and api_perf_tester.adaptive_sampling is None:
+    api_perf_tester.adaptive_sampling = {}
+
+if arguments['--cold-vs-warm'] and api_perf_tester.cold_cache is None:
+    api_perf_tester.cold_cache = {}
+
+if arguments['--concurrency']:
+    api_perf_tester.concurrency = int(arguments['--concurrency'])
+
+if arguments['--coverage-strength']:
+    api_perf_tester.parameter_coverage = {'Strength': int(arguments['--coverage-strength'])}
+
+if arguments['--coordinator']:
+    api_perf_tester.coordinator_address = arguments['--coordinator']
+
+if arguments['--duration']:
+    api_perf_tester.load_test_config['Duration'] = float(arguments['--duration'])
+
+if arguments['--local-workers']:
+    api_perf_tester.num_local_workers = int(arguments['--local-workers'])
+
+if arguments['--metrics-address']:
+    api_perf_tester.metrics_address = arguments['--metrics-address']
+
+if arguments['--payload-profiling']:
+    api_perf_tester.payload_profiling = True
+
+if arguments['--processes']:
+    api_perf_tester.num_processes = int(arguments['--processes'])
+
+if (arguments['--profile'] or arguments['--profile-output']) and \
+        api_perf_tester.harness_profiling is None:
+    api_perf_tester.harness_profiling = {}
+
+if arguments['--profile-output']:
+    api_perf_tester.harness_profiling['Output'] = arguments['--profile-output']
+
+if arguments['--progress']:
+    api_perf_tester.live_progress = True
+
+if arguments['--record-plan']:
+    api_perf_tester.record_plan_file = arguments['--record-plan']
+
+if arguments['--replay']:
+    api_perf_tester.replay_file = arguments['--replay']
+
+if arguments['--stream'] and api_perf_tester.streaming is None:
+    api_perf_tester.streaming = {}
+
+if arguments['--target-rps']:
+    api_perf_tester.load_test_config['Target_RPS'] = float(arguments['--target-rps'])
+
+if arguments['--transport-timing']:
+    api_perf_tester.transport_timing = True
+
+if arguments['--validate'] and api_perf_tester.response_validation is None:
+    api_perf_tester.response_validation = {}
+
+if arguments['--workers']:
+    api_perf_tester.num_workers = int(arguments['--workers'])
 
 if arguments['--dry-run']:
     api_perf_tester.dry_run = True
@@ -53,7 +199,24 @@ if arguments['--debug']:
 
 api_perf_tester.init_summary_table()
 api_perf_tester.build_api_calls()
-api_perf_tester.run()
+
+if arguments['--capacity-search']:
+    api_perf_tester.run_capacity_search()
+elif arguments['--load-test']:
+    api_perf_tester.run_load_test()
+elif arguments['--compare-payloads']:
+    api_perf_tester.run_payload_comparison()
+elif arguments['--write-test']:
+    api_perf_tester.run_write_test()
+else:
+    api_perf_tester.run()
+
+if not arguments['--dry-run']:
+    if arguments['--compare-baseline'] or arguments['--baseline-run']:
+        api_perf_tester.compare_baseline(arguments['--baseline-run'])
+
+    if arguments['--store']:
+        api_perf_tester.store_results()
 
 if arguments['--print']:
     api_perf_tester.print_results_table()
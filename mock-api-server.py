@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Usage:
+  mock-api-server.py [options]
+  mock-api-server.py --help
+
+Options:
+  -h --help                        Show this help screen
+  --address=address                Address (host:port) on which the mock API listens, if not the value
+                                       of 'Address' in the 'Mock_Server' section of the config file
+                                       (default: localhost:8080)
+  --config-file=path               Config file path, if not 'perf_config.json'
+  --latency=ms                     Constant latency (in milliseconds) of every request, rather than the
+                                       'Latency' distribution of the 'Mock_Server' section of the
+                                       config file
+  --spec=path                      Local file path of the API spec (JSON) to serve, if not the value
+                                       of 'Spec' in the 'Mock_Server' section of the config file
+                                       (default: a small built-in API)
+"""
+
+from docopt import docopt
+import perf
+import perf.mock_server
+
+import json
+import sys
+
+arguments = docopt(__doc__, help=True)
+
+config_file_path = arguments.get('--config-file') or 'perf_config.json'
+try:
+    with open(config_file_path, 'r') as f:
+        config = json.load(f)
+except FileNotFoundError:
+    if arguments.get('--config-file'):
+        print(f'Could not find config file: {config_file_path} - exiting')
+        sys.exit(1)
+    config = {}
+
+mock_server_config = config.get('Mock_Server', {})
+if arguments['--latency']:
+    mock_server_config['Latency'] = {'Mean': float(arguments['--latency'])}
+
+spec = None
+spec_path = arguments['--spec'] or mock_server_config.get('Spec')
+if spec_path:
+    with open(spec_path, 'r') as f:
+        spec = json.load(f)
+
+address = perf.distributed.parse_address(
+    arguments['--address'] or mock_server_config.get('Address', 'localhost:8080'))
+
+logger = perf.utils.get_logger()
+mock_server = perf.mock_server.MockApiServer(spec, mock_server_config, address)
+logger.info('Serving the mock API spec at %s', mock_server.url)
+try:
+    mock_server.serve_forever()
+except KeyboardInterrupt:
+    mock_server.stop()
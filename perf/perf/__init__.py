@@ -1,25 +1,48 @@
 __version__ = "0.1.0"
 
+from perf import distributed
+from perf import histogram
+from perf import live
+from perf import report
+from perf import scheduler
+from perf import schema
+from perf import stats
+from perf import store
+from perf import stream
+from perf import transport
 from perf import utils
+from perf import validation
 from xml.etree import cElementTree
+from xml.sax import saxutils
 
-import numpy
 import prettytable
 import requests
+import urllib3
 
 import collections
+import concurrent.futures
+import cProfile
+import datetime
+import hashlib
 import importlib
+import inspect
 import itertools
+import json
 import logging
 import os
 import pkgutil
+import pstats
+import random
+import threading
+import time
 import urllib.parse
 import types
+import uuid
 
 
 class ApiPerformance(object):
 
-    def __init__(self, script_dir, api_spec_url, config, logger=None):
+    def __init__(self, script_dir, api_spec_url, config, logger=None, api_base_url=None):
         # process constructor inputs
         self._logger = logger if logger else utils.get_logger()
         self.api_spec_url = api_spec_url
@@ -39,9 +62,72 @@ class ApiPerformance(object):
 
         self.num_passes = self.config.get("Number_Of_Passes", 5)
 
-        self.api_base_url = ''
+        # passes made before measuring each API call, which are excluded from the results
+        self.warm_up_passes = self.config.get("Warm_Up_Passes", 0)
+
+        # if specified, each API call is also measured with caching defeated by a unique query
+        # parameter or header
+        self.cold_cache = self.config.get("Cold_Cache")
+        self.cold_call_metrics = collections.OrderedDict()
+
+        # if specified, each API call is made until its response time has converged rather than
+        # Number_Of_Passes times
+        self.adaptive_sampling = self.config.get("Adaptive_Sampling")
+
+        # if specified, a covering array of query parameters is tested rather than every combination
+        self.parameter_coverage = self.config.get("Parameter_Coverage")
+
+        # upper bound on the number of API calls generated for an endpoint; 0 means no limit
+        self.max_calls_per_endpoint = self.config.get("Max_Calls_Per_Endpoint", 0)
+
+        # number of API calls to be executed in parallel; 1 retains strictly serial execution
+        self.concurrency = self.config.get("Concurrency", 1)
+
+        # number of client processes across which API calls are spread, so that handling responses in
+        # one process does not hold up requests made by others
+        self.num_processes = self.config.get("Processes", 1)
+
+        # settings for the sustained load (throughput) mode
+        self.load_test_config = self.config.get("Load_Test", {})
+
+        # settings for the capacity search mode, which steps up the load on each endpoint (or on the
+        # load test mix) until it is no longer sustained; the latency / throughput curve of each is
+        # kept, keyed by label, for the HTML report
+        self.capacity_search = self.config.get("Capacity_Search", {})
+        self.capacity_curves = collections.OrderedDict()
+
+        # if a number of workers is specified, API calls are made by that many worker processes
+        # (possibly on other hosts) which connect to this instance, the coordinator
+        self.distributed_config = self.config.get("Distributed", {})
+        self.num_workers = self.distributed_config.get("Workers", 0)
+        self.num_local_workers = self.distributed_config.get("Local_Workers", 0)
+        self.coordinator_address = self.distributed_config.get("Address", 'localhost:6000')
+        self.auth_key = self.distributed_config.get("Auth_Key", '')
+
+        # if specified, API calls are made against this URL rather than the one described by the spec
+        self.api_base_url = api_base_url or self.config.get("Api_Base_Url", '')
         self.api_calls = []
         self.api_spec = {}
+        self.api_spec_digest = None
+
+        # functions of the api_call_generators module executed concurrently
+        self.generator_concurrency = self.config.get("Generator_Concurrency", 8)
+
+        # if specified, the API calls of the functions of the api_call_generators module are cached
+        self.generator_cache = self.config.get("Generator_Cache")
+        self.generator_cache_file = (self.generator_cache or {}).get(
+            'File', f'{script_dir}/../../api_call_generator_cache.json')
+        self._generator_cache_lock = threading.Lock()
+
+        # if specified, the API calls made are recorded to this call plan (JSON lines) file
+        self.record_plan_file = None
+
+        # if specified, the API calls are read from this call plan (JSON lines) file rather than built
+        # from the API spec
+        self.replay_file = None
+
+        # if specified, the API calls built from an unchanged API spec are cached in this file
+        self.call_plan_cache_file = self.config.get("Call_Plan_Cache", '')
 
         self._set_api_url()
 
@@ -61,71 +147,393 @@ class ApiPerformance(object):
         self.html_file_path = 'api_performance.html'
         self.html_output_file = f'{script_dir}/../../{self.html_file_path}'
 
-        # tracks paths for which we should index the UUID of the first returned object
-        self.indexable_paths = []
+        # results of every run may be appended to a local database, in order to detect regressions
+        # against a baseline run
+        self.results_store_file = self.config.get(
+            "Results_Store", f'{script_dir}/../../api_performance.sqlite')
+        self.regression_significance = self.config.get("Regression_Significance", 0.01)
+        self.regression_min_change = self.config.get("Regression_Min_Change", 0.1)
+        self.regressions = {}
+        self._results_store = None
+        self.run_id = None
+
+        # number of earlier runs of the results store whose response times are shown as trends in the
+        # HTML report
+        self.report_history_runs = self.config.get("Report_History_Runs", 20)
+
+        self.mode = 'sweep'
+        self.started_at = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
+
+        # tracks "listing" paths whose returned objects provide the IDs of path templates, e.g.
+        # {'/v1/widgets': ['/v1/widgets/{uuid}']}
+        self.indexable_paths = {}
 
         self.results = []
-        self.session = requests.Session()
-        self.session.headers = self.config['Headers']
-        self.session.verify = False
 
-        # tracks the API call path and UUID to be used for single object retrieval calls
-        self.single_object_index = {}
+        # if specified, results are appended to a file as they come (along with the metrics of their
+        # API call) rather than kept in memory, for runs of any length; see _add_result()
+        self.streaming = self.config.get("Streaming")
+        self.results_stream_file = (self.streaming or {}).get(
+            'File', f'{script_dir}/../../api_performance_results.jsonl')
+
+        # latency histograms and error counters of each API call, keyed by API call label
+        self.call_metrics = collections.OrderedDict()
+        self._call_metrics_lock = threading.Lock()
+        self.histogram_precision = self.config.get("Histogram_Significant_Digits", 3)
+
+        # HTTP transport settings
+        self.connection_pool_size = self.config.get("Connection_Pool_Size", 10)
+        self.connect_timeout = self.config.get("Connect_Timeout", 10)
+        self.read_timeout = self.config.get("Read_Timeout", 300)
+        self.keep_alive = self.config.get("Keep_Alive", True)
+        self.max_retries = self.config.get("Max_Retries", 0)
+
+        # if set, the time spent on each phase of every request is reported
+        self.transport_timing = self.config.get("Transport_Timing", False)
+        self.transport_phases = collections.OrderedDict([
+            ('dns', 'DNS'),
+            ('connect', 'Connect'),
+            ('tls', 'TLS'),
+            ('ttfb', 'TTFB'),
+            ('download', 'Download'),
+            ('decode', 'Decode')
+        ])
+
+        # if specified, the time spent by the harness itself on each API call (preparing requests,
+        # decoding and recording responses, updating the results) is reported along with the response
+        # times, and the run may be profiled with cProfile
+        self.harness_profiling = self.config.get("Harness_Profiling")
+        self.harness_phases = collections.OrderedDict([
+            ('prepare', 'Prepare'),
+            ('decode', 'Decode'),
+            ('validate', 'Validate'),
+            ('record', 'Record'),
+            ('table', 'Table')
+        ])
+        self._profilers = []
+        self._profilers_lock = threading.Lock()
+
+        # if set, the sizes of the responses (as transferred and once decoded) and the transfer
+        # throughput are reported
+        self.payload_profiling = self.config.get("Payload_Profiling", False)
+        self.response_size_fields = ['Transfer (KB)', 'Body (KB)', 'Bytes/Object', 'Throughput (MB/s)']
+
+        # settings of the comparison of content encodings and page sizes (see run_payload_comparison())
+        self.payload_comparison_config = self.config.get("Payload_Comparison", {})
+
+        # if specified, a sample of the responses is validated against the responses of the API spec
+        self.response_validation = self.config.get("Response_Validation")
+        self._response_validators = {}
+        self._validation_random = random.Random()
+
+        self.session = self._create_session()
+
+        # holds the requests session of each worker thread when running API calls concurrently
+        self._thread_local = threading.local()
+
+        # pools of the IDs (values of the parameters) with which path templates are resolved, keyed by
+        # path template; e.g. {'/a/{id}/b/{id2}': [{'id': 1, 'id2': 'x'}, {'id': 2, 'id2': 'y'}]}
+        self.id_pools = {}
+        self.id_pool_config = self.config.get("Id_Pool", {})
+        self.id_pool_size = self.id_pool_config.get("Size", 100)
+        self._id_pool_lock = threading.Lock()
+        self._id_pool_positions = collections.Counter()
+        self._id_random = random.Random(self.id_pool_config.get("Seed"))
+
+        # if specified, progress and metrics are reported while API calls are being made
+        self.live_monitor_config = self.config.get("Live_Monitor", {})
+        self.live_progress = self.live_monitor_config.get("Progress", False)
+        self.metrics_address = self.live_monitor_config.get("Metrics_Address")
+        self._live_monitor = None
+
+        # schedules the API calls of run() by their dependencies on ID pools (see _run_api_calls())
+        self._scheduler = None
+
+        # settings of the write benchmark (see run_write_test())
+        self.write_test_config = self.config.get("Write_Test", {})
 
         self.summary_table = prettytable.PrettyTable()
         self.summary_table.field_names = ['Key', 'Value']
         self.summary_table.align['Key'] = 'l'
         self.summary_table.align['Value'] = 'r'
 
-        self.table = prettytable.PrettyTable()
-        self.table.field_names = ['API Call', 'Description', 'Objects', 'Status',
-                                  'Avg (ms)', 'High (ms)', 'Low (ms)']
-        self.table.align['API Call'] = 'l'
-        self.table.align['Description'] = 'l'
-
-    def _set_api_url(self):
-        self._logger.info(f"Loading OpenAPI schema from {self.api_spec_url}")
-        api_spec_resp = requests.get(self.api_spec_url)
-        api_spec_resp.raise_for_status()
-        self.api_spec = api_spec_resp.json()
+        self._init_results_table(['API Call', 'Description', 'Objects', 'Status',
+                                  'Avg (ms)', 'High (ms)', 'Low (ms)'])
+
+    def _add_result(self, result_row, api_call=None):
+        """Add the result row of an API call to the results.
+
+        When streaming, the row is appended to the results stream along with the metrics of its API
+        call, which are then no longer kept in memory (nor is the row added to the results table, which
+        is rebuilt from the stream), and along with the API call itself when recording a call plan.
+        """
+        started = time.perf_counter()
+        api_call_label = result_row[self.table.field_names.index('API Call')]
+        if self.streaming is None:
+            self.results.append(result_row)
+            self.table.add_row(result_row)
+            self._record_harness_time(self.call_metrics.get(api_call_label), 'table', started)
+            return
+
+        with self._call_metrics_lock:
+            if not isinstance(self.results, stream.ResultStream):
+                self.results = stream.ResultStream(self.results_stream_file)
+            metrics = self.call_metrics.pop(api_call_label, None)
+            self.cold_call_metrics.pop(api_call_label, None)
+        self._record_harness_time(metrics, 'table', started)
+        if metrics and self._live_monitor:
+            self._live_monitor.add_finished(api_call_label, metrics)
+        self.results.append(result_row, metrics, api_call if self.record_plan_file else None)
+
+    def _close_results(self):
+        """Close the stream of results once a run is done, if streaming (see _add_result()); the results
+        can still be read back from it."""
+        if isinstance(self.results, stream.ResultStream):
+            self.results.close()
+
+    def _compare_payloads(self, api_call, variants):
+        """Make an API call with each (Accept-Encoding, page size) variant of the payload comparison.
+
+        Returns a list of the result rows of the variants, the variant with the lowest client-side
+        response time per object being marked as the cheapest.
+        """
+        session = self._get_session()
+        page_size_param = self.payload_comparison_config.get('Page_Size_Param')
+        num_passes = self.payload_comparison_config.get('Passes', self.num_passes)
+
+        result_rows = []
+        costs = []
+        for encoding, page_size in variants:
+            variant_call = dict(api_call)
+            if page_size is not None:
+                variant_call['params'] = dict(api_call.get('params') or {})
+                variant_call['params'][page_size_param] = page_size
+            prepared = self._prepare_api_call(variant_call, session)
+            if not prepared:
+                return []
+            api_prepared_request, api_call_label, api_call_description = prepared
+            api_call_label += f' [{encoding}]'
 
-        # assemble the base API URL based on parsing the original API spec URL and the basePath
-        # defined in the OpenAPI schema.
-        api_spec_url_parsed = urllib.parse.urlparse(self.api_spec_url)
-        self.api_base_url = f"{api_spec_url_parsed.scheme}://{api_spec_url_parsed.netloc}{self.api_spec['basePath']}"
-        self._logger.info('Using base URL: %s', self.api_base_url)
+            if self.dry_run:
+                result_rows.append([api_call_label, api_call_description, encoding,
+                                    page_size or 'default', 0, 'DRY RUN'] +
+                                   ['N/A'] * (len(self.table.field_names) - 6))
+                continue
 
-    def _should_process_path(self, path):
-        if path in self.path_blacklist:
-            self._logger.warning('%s is in blacklist', path)
-            return False
+            metrics = self._get_call_metrics(api_call_label)
+            api_call_object_count = 0
+            for x in range(0, num_passes):
+                if variant_call.get('ids'):
+                    api_prepared_request, _ = self._get_request(variant_call, session)
+                api_prepared_request.headers['Accept-Encoding'] = encoding
+                data, _ = self._make_pass(variant_call, session, api_prepared_request, metrics)
+                if x == 0:
+                    api_call_object_count = data.get('count', 1 if data else 0)
+
+            if metrics.errors['FAILED'] or metrics.errors['TIMEOUT']:
+                status = 'FAILED' if metrics.errors['FAILED'] else 'TIMEOUT'
+                avg_time = client_avg_time = -1
+            else:
+                avg_time = metrics.server_times.mean()
+                client_avg_time = metrics.client_times.mean()
+                status = self._get_latency_status(variant_call, api_prepared_request.url, avg_time)
+                costs.append((client_avg_time / max(api_call_object_count, 1), len(result_rows)))
+
+            response_sizes = metrics.get_response_sizes()
+            result_rows.append([
+                api_call_label,
+                api_call_description,
+                encoding,
+                page_size or 'default',
+                api_call_object_count,
+                status,
+                "%.2f" % avg_time,
+                "%.2f" % client_avg_time
+            ] + self._get_response_size_columns(metrics, api_call_object_count) + [
+                "%.2fx" % (response_sizes['body_bytes'] / response_sizes['transfer_bytes'])
+                if response_sizes and response_sizes['transfer_bytes'] else 'N/A',
+                ''
+            ])
+
+        if costs:
+            result_rows[min(costs)[1]][-1] = 'yes'
+        return result_rows
+
+    def _create_session(self):
+        session = requests.Session()
+        session.headers = dict(self.config['Headers'])
+        if not self.keep_alive:
+            session.headers['Connection'] = 'close'
+        session.verify = False
+
+        adapter = transport.TimedHTTPAdapter(pool_connections=self.connection_pool_size,
+                                             pool_maxsize=self.connection_pool_size,
+                                             max_retries=self.max_retries)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def _distribute(self, mode, jobs):
+        """Have the workers of a distributed run (or the client processes) execute a job each.
+
+        Besides its own fields, every job carries what a worker needs to make API calls the way this
+        instance would: the config, the base URL of the API and the settings overridden since this
+        instance was created (e.g. from command line arguments). Returns the responses of the jobs.
+        """
+        settings = {name: getattr(self, name) for name in distributed.WORKER_SETTINGS}
+        # workers classify (and validate) responses by the API spec, which they do not load themselves
+        settings['api_spec'] = self.api_spec
+        for job in jobs:
+            job.update({
+                'mode': mode,
+                'config': self.config,
+                'api_base_url': self.api_base_url,
+                'settings': dict(settings, **job.get('settings', {})),
+                'indexable_paths': self.indexable_paths,
+                'id_pools': self.id_pools
+            })
+
+        if not self.num_workers:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=len(jobs)) as executor:
+                return list(executor.map(distributed.execute_job, jobs,
+                                         itertools.repeat(self.script_dir)))
+
+        address = distributed.parse_address(self.coordinator_address)
+        self._logger.info('Waiting for %s worker(s) to connect to %s:%s', len(jobs), *address)
+        return distributed.distribute(jobs, address, self.auth_key.encode(),
+                                      num_local_workers=self.num_local_workers,
+                                      script_dir=self.script_dir)
+
+    def _drive_concurrency(self, load_calls, concurrency, duration):
+        """Issue requests on the mix of API calls from `concurrency` clients for `duration` seconds.
+
+        Requests are issued closed-loop: each client sends its next request as soon as it has the
+        response to its previous one, so the request rate is whatever the API sustains. Returns the
+        number of requests issued and the time (in seconds) it took.
+        """
+        results_lock = threading.Lock()
+        seed = self.load_test_config.get('Seed')
+        weights = [load_call['weight'] for load_call in load_calls]
+        num_requests = [0] * concurrency
+
+        def drive(x):
+            chooser = random.Random(None if seed is None else seed + x)
+            while time.perf_counter() < deadline:
+                load_call = chooser.choices(load_calls, weights=weights)[0]
+                self._send_load_request(load_call, time.perf_counter(), results_lock)
+                num_requests[x] += 1
+
+        start_time = time.perf_counter()
+        deadline = start_time + duration
+        with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(drive, range(concurrency)))
+        return sum(num_requests), time.perf_counter() - start_time
+
+    def _drive_load(self, load_calls, target_rps=None, duration=None):
+        """Issue requests on the mix of API calls at `target_rps` for `duration` seconds (by default,
+        the Target_RPS and Duration of Load_Test).
+
+        Returns the number of requests issued and the time (in seconds) it took.
+        """
+        target_rps = target_rps or self.load_test_config.get('Target_RPS', 10)
+        duration = duration or self.load_test_config.get('Duration', 60)
+
+        num_requests = int(target_rps * duration)
+        interval = 1.0 / target_rps
+        chooser = random.Random(self.load_test_config.get('Seed'))
+        selected_calls = chooser.choices(load_calls, weights=[c['weight'] for c in load_calls],
+                                         k=num_requests)
+
+        results_lock = threading.Lock()
+        workers = self.load_test_config.get('Workers', max(self.concurrency, 32))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            start_time = time.perf_counter()
+            for x, load_call in enumerate(selected_calls):
+                scheduled_time = start_time + x * interval
+                delay = scheduled_time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(self._send_load_request, load_call, scheduled_time, results_lock)
+        return num_requests, time.perf_counter() - start_time
+
+    def _generate_api_call_params(self, params_index):
+        """Generate the query string parameters of each API call to be made for an endpoint.
+
+        By default, every valid combination of parameters is generated along with every combination
+        of their values. Conflicting parameters are pruned while enumerating, so invalid combinations
+        are never built in the first place. When Parameter_Coverage is configured, a covering array is
+        generated instead: every combination of `Strength` parameter values is tested at least once.
+        """
+        param_conflicts = {param_name: param['x-param-conflicts-with']
+                           for param_name, param in params_index.items()}
+
+        if self.parameter_coverage is not None:
+            strength = self.parameter_coverage.get('Strength', 2)
+            self._logger.debug('Building %s-wise covering array of parameters', strength)
+            param_values = {param_name: param['values']
+                            for param_name, param in params_index.items()}
+            yield from utils.get_covering_array(param_values, param_conflicts, strength)
+            return
+
+        for param_combo in utils.get_compatible_subsets(params_index, param_conflicts):
+            self._logger.debug('Adding calls for param combo: %s', param_combo)
+
+            # add all combinations of values for this combination of parameters
+            for param_value_combo in itertools.product(
+                    *(params_index[key]['values'] for key in param_combo)):
+                yield dict(zip(param_combo, param_value_combo))
+
+    def _generate_api_calls(self):
+        """Generate the API calls described by the API spec and the api_call_generators module.
+
+        API calls are yielded one at a time as they are built, so that they may be executed while the
+        remaining API calls are still being generated. The API calls built from the API spec are
+        cached (see _get_call_plan_key()), so an unchanged API spec is not processed again.
+        """
+        call_plan_key = self._get_call_plan_key()
+        call_plan = self._load_call_plan(call_plan_key)
+        if call_plan is not None:
+            self._logger.info('Using cached API calls from %s', self.call_plan_cache_file)
+            self.indexable_paths.update(call_plan['indexable_paths'])
+            yield from call_plan['api_calls']
         else:
-            if not self.path_whitelist:
-                return True
+            yield from self._save_call_plan(call_plan_key, self._generate_spec_api_calls())
 
-            for whitelist_path in self.path_whitelist:
-                if path.startswith(whitelist_path):
-                    return True
-            self._logger.debug('%s is not in specified whitelist', path)
-            return False
-
-    def add_checkstyle_error(self, error):
-        """Add a checkstyle error to the given element."""
-        cElementTree.SubElement(self.check_file, "error", line=str(self.check_file_line),
-                                severity="error",
-                                message=error)
-
-    def analyze_results(self):
-        status_index = self.table.field_names.index('Status')
-        api_call_index = self.table.field_names.index('API Call')
-        for result in self.results:
-            self.check_file_line += 1
-            if result[status_index] != 'OK':
-                self.add_checkstyle_error(f'{result[api_call_index]} is {result[status_index]}')
+        # find all functions defined in the api_call_generators module and execute them, if any
+        generator_module = 'api_call_generators'
+        if pkgutil.find_loader(generator_module):
+            api_call_generators = importlib.import_module(generator_module)
+            generator_functions = []
+            for module_item in dir(api_call_generators):
+                module_item_instance = getattr(api_call_generators, module_item)
+                if isinstance(module_item_instance, types.FunctionType):
+                    generator_functions.append(module_item_instance)
+
+            # the functions are independent of each other, so they are executed concurrently; their
+            # API calls are still handed out in the order of the functions
+            generator_cache = self._load_generator_cache()
+            with concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.generator_concurrency) as executor:
+                futures = [executor.submit(self._run_api_call_generator, function, generator_cache)
+                           for function in generator_functions]
+                for function, future in zip(generator_functions, futures):
+                    api_calls = future.result()
+                    if not api_calls:
+                        self._logger.error('Could not generate API calls using %s.%s()',
+                                           generator_module, function.__name__)
+                        self._logger.error('Got: %s', api_calls)
+                        continue
 
-        self.checkfile_tree.write(os.path.join(self.script_dir, '../checkstyle-api-perf.log'))
+                    for api_call in api_calls:
+                        if self._should_process_path(api_call['path']):
+                            yield api_call
+                        else:
+                            self._logger.debug('skipping path %s from generated API call',
+                                               api_call['path'])
+            self._save_generator_cache(generator_cache)
 
-    def build_api_calls(self):
+    def _generate_spec_api_calls(self):
+        """Generate the API calls described by the API spec (OpenAPI 2.0 or 3.x)."""
         paths = collections.OrderedDict(sorted(self.api_spec['paths'].items()))
 
         for path, methods in paths.items():
@@ -147,325 +555,2015 @@ class ApiPerformance(object):
                     self._logger.warning('%s %s has been marked to skip upstream', method, path)
                     continue
 
-                # determine query string params supported by this endpoint, if any
+                # determine query string params supported by this endpoint, if any. parameters may
+                # be defined for the whole path and overridden by the operation, and may be references
+                params = collections.OrderedDict()
+                for param in itertools.chain(methods.get('parameters', []),
+                                             method_def.get('parameters', [])):
+                    param = utils.resolve_ref(self.api_spec, param)
+                    params[(param['name'], param['in'])] = param
+
                 params_index = {}
-                for param in method_def.get('parameters', []):
+                for param in params.values():
                     if param['in'] == 'query':
-                        if param['type'] == 'boolean':
+                        # OpenAPI 3.x describes the type of a parameter with its schema
+                        schema = utils.resolve_ref(self.api_spec, param.get('schema', {}))
+                        param_type = param.get('type', schema.get('type'))
+                        param_enum = param.get('enum', schema.get('enum'))
+                        if param_type == 'boolean':
                             params_index[param['name']] = {
                                 'x-param-conflicts-with': param.get(
                                     'x-param-conflicts-with', []),
                                 'values': ['false', 'true']
                             }
-                        elif 'enum' in param:
+                        elif param_enum:
                             params_index[param['name']] = {
                                 'x-param-conflicts-with': param.get(
                                     'x-param-conflicts-with', []),
-                                'values': param['enum']
+                                'values': param_enum
                             }
 
-                # iterate through query string params and build a list of possible parameters
+                # check if complementary "single object retrieval paths" (e.g. path + '/{uuid}')
+                # exist in the API spec. if so, we'll pool the IDs of the objects retrieved so we
+                # have references to work with downrange. this must be known before the calls for
+                # this path are handed out.
+                single_object_paths = [
+                    single_object_path for single_object_path in paths
+                    if single_object_path.startswith(path + '/{') and
+                    single_object_path.count('/') == path.count('/') + 1 and
+                    single_object_path.endswith('}') and 'get' in paths[single_object_path]]
+                if single_object_paths:
+                    self.indexable_paths[path] = single_object_paths
+
+                # iterate through query string params and generate the combinations of
+                # parameters and their values to be tested
                 if params_index:
+                    param_sets = self._generate_api_call_params(params_index)
+                    if self.max_calls_per_endpoint:
+                        param_sets = itertools.islice(param_sets, self.max_calls_per_endpoint)
+
+                    for api_call_params in param_sets:
+                        api_call = {
+                            'path': path,
+                            'method': method,
+                            'params': api_call_params}
 
-                    # get the sorted set of param names (dict keys)
-                    param_names_sorted = sorted(params_index)
-
-                    # compile a list of compatible query parameter sets
-                    param_sets = list()
-
-                    # create sets using each parameter as a "base"
-                    # with which all other applicable parameters could be used.
-                    for param_name in param_names_sorted:
-
-                        # drop any parameters which conflict with the base parameter
-                        # simple logic provided the param is not listed as conflicting
-                        # with itself...
-                        param_set = {param for param in param_names_sorted
-                                     if param not in
-                                     params_index[param_name]['x-param-conflicts-with']}
-
-                        # order the parameter set (transforming to list) for consistency and
-                        # deduplication
-                        param_set = sorted(param_set)
-
-                        # track this parameter set if unique
-                        if param_set not in param_sets:
-                            param_sets.append(param_set)
-
-                    # process the power sets of these parameter sets, yielding a list of all
-                    # possible parameter combinations
-                    self._logger.debug('Building parameter power sets')
-
-                    param_combos = list()
-                    for param_set in param_sets:
-                        for param_combo in utils.get_power_set(param_set):
-                            param_combo = sorted(param_combo)
-                            if param_combo not in param_combos:
-                                self._logger.debug('Adding parameter combo for evaluation: %s', param_combo)
-                                param_combos.append(param_combo)
-
-                    # walk through each param set and eliminate any which contain conflicting
-                    # parameters. this will leave us with the list of valid parameter combos.
-                    self._logger.debug('Building a list of valid parameter combos')
-
-                    valid_param_combos = []
-                    for param_combo in param_combos:
-                        has_conflict = False
-                        for param in param_combo:
-                            for param_to_compare in param_combo:
-                                if (param_to_compare in
-                                        params_index[param]['x-param-conflicts-with']):
-                                    has_conflict = True
-                        if param_combo and not has_conflict:
-                            self._logger.debug('Adding valid parameter combo: %s',
-                                               ','.join(param_combo))
-                            valid_param_combos.append(param_combo)
-
-                    # Finally, add all combinations of values for each combination of
-                    # parameters.
-                    for param_combo in valid_param_combos:
-                        self._logger.debug('Adding calls for param combo: %s', param_combo)
-
-                        # generate the combos of possible values of parameters
-                        param_values_combos = list(itertools.product(
-                            *(params_index[key]['values']
-                              for key in param_combo)))
-
-                        for param_value_combo in param_values_combos:
-
-                            api_call_params = {}
-                            for x, param in enumerate(param_combo):
-                                api_call_params[param] = param_value_combo[x]
-
-                            api_call = {
-                                'path': path,
-                                'method': method,
-                                'params': api_call_params}
-
-                            self._logger.debug('Adding call %s', api_call)
-                            self.api_calls.append(api_call)
+                        self._logger.debug('Adding call %s', api_call)
+                        yield api_call
 
                 # This endpoint has no parameters, so just add it as-is
                 else:
-                    self.api_calls.append({
+                    yield {
                         'path': path,
                         'method': method
-                    })
+                    }
+
+    def _generate_write_resources(self):
+        """Find the resources of the API spec whose write operations can be benchmarked.
+
+        A resource is a path with a POST operation (e.g. /v1/widgets) whose single object path (e.g.
+        /v1/widgets/{uuid}) has a DELETE operation, so that the objects created can be deleted; the
+        PUT and PATCH operations of the latter are benchmarked too. Returns a dict per resource, holding
+        its `path`, `object_path` and the request body schema of each of its operations, keyed by
+        method (`operations`).
+        """
+        paths = self.api_spec.get('paths', {})
+        methods = self.write_test_config.get('Methods', ['POST', 'PUT', 'PATCH', 'DELETE'])
+
+        resources = []
+        for path, path_def in sorted(paths.items()):
+            if 'post' not in path_def or 'POST' not in methods or not self._should_process_path(path):
+                continue
+            if path_def['post'].get('x-skip-perf-test'):
+                self._logger.warning('POST %s has been marked to skip upstream', path)
+                continue
 
-                # check if a complementary "single object retrieval path" exists in the API
-                # spec. if so, we'll cache the UUID of the first object retrieved so we have
-                # a reference to work with downrange.
-                single_object_path = path + '/{uuid}'
-                if ('{uuid}' not in path and
-                        single_object_path in paths and
-                        'get' in paths[single_object_path]):
-                    self.indexable_paths.append(path)
+            object_paths = [
+                object_path for object_path in paths
+                if object_path.startswith(path + '/{') and
+                object_path.count('/') == path.count('/') + 1 and
+                object_path.endswith('}') and 'delete' in paths[object_path]]
+            if not object_paths:
+                self._logger.warning('Skipping POST %s: the objects it creates cannot be deleted', path)
+                continue
+            object_path = object_paths[0]
+
+            operations = collections.OrderedDict()
+            operations['POST'] = self._get_request_body_schema(path_def, path_def['post'])
+            for method in ['PUT', 'PATCH', 'DELETE']:
+                method_def = paths[object_path].get(method.lower())
+                if method_def is not None and method in methods and not method_def.get('x-skip-perf-test'):
+                    operations[method] = self._get_request_body_schema(paths[object_path], method_def)
+
+            self._logger.debug('Adding write operations %s of %s', list(operations), path)
+            resources.append({'path': path, 'object_path': object_path, 'operations': operations})
+        return resources
+
+    def _get_api_call_dependencies(self, api_call):
+        """Get the ID pool (path template) required by an API call, if any, along with the list of the ID
+        pools it fills (see _index_objects())."""
+        requires = None
+        if utils.get_path_params(api_call['path']) and not api_call.get('ids') and not self.dry_run:
+            # a nested "listing" path (e.g. /v1/widgets/{uuid}/parts) uses the ID pool of the template
+            # it extends, see _prepare_api_call()
+            requires = api_call['path'][:api_call['path'].rindex('}') + 1]
+
+        produces = []
+        if api_call['method'] in ['GET', 'POST'] and not self.dry_run:
+            produces = self.indexable_paths.get(api_call['path'], [])
+        return requires, produces
+
+    def _get_cache_busting_request(self, api_prepared_request):
+        """Get a copy of a prepared request made unique by the configured query parameter or header."""
+        cache_busting_request = api_prepared_request.copy()
+        cache_buster = uuid.uuid4().hex
+        if 'Header' in self.cold_cache:
+            cache_busting_request.headers[self.cold_cache['Header']] = cache_buster
+        else:
+            cache_busting_request.prepare_url(
+                cache_busting_request.url, {self.cold_cache.get('Query_Param', '_'): cache_buster})
+        return cache_busting_request
+
+    def _get_call_metrics(self, api_call_label):
+        """Get the (possibly new) latency histograms and error counters of an API call."""
+        with self._call_metrics_lock:
+            if api_call_label not in self.call_metrics:
+                self.call_metrics[api_call_label] = histogram.CallMetrics(self.histogram_precision)
+            return self.call_metrics[api_call_label]
+
+    def _get_call_plan_key(self):
+        """Get the key of the API calls built from the API spec.
+
+        The key is a digest of the API spec, the settings which determine the API calls built from it
+        and the code which builds them, so that a change to any of these invalidates cached API calls.
+        """
+        call_plan_inputs = {
+            'api_spec': self.api_spec_digest,
+            'code': [utils.get_file_digest(__file__), utils.get_file_digest(utils.__file__)],
+            'max_calls_per_endpoint': self.max_calls_per_endpoint,
+            'parameter_coverage': self.parameter_coverage,
+            'path_blacklist': self.path_blacklist,
+            'path_whitelist': self.path_whitelist
+        }
+        return hashlib.sha256(json.dumps(call_plan_inputs, sort_keys=True).encode()).hexdigest()
+
+    def _get_capacity_knee(self, step, previous_step=None):
+        """Get the reason why a step of the capacity search (see _get_capacity_step()) did not sustain
+        its load, or None if it did.
+
+        A load is not sustained if its error rate exceeds Max_Error_Rate, its p99 response time exceeds
+        Max_P99 or the throughput stopped scaling with the load: the throughput gained over the
+        previous step must be at least Min_Throughput_Gain of the load added, in proportion.
+        """
+        if not step['latencies'].count:
+            return 'no successful response at %s' % step['load']
+        if step['error_rate'] > self.capacity_search.get('Max_Error_Rate', 0):
+            return 'errors %.2f%% at %s' % (step['error_rate'] * 100, step['load'])
+        max_p99 = self.capacity_search.get('Max_P99', 1000)
+        if step['p99'] > max_p99:
+            return 'p99 %.2f ms > %s ms at %s' % (step['p99'], max_p99, step['load'])
+        if previous_step:
+            expected_gain = previous_step['rps'] * (step['load'] / previous_step['load'] - 1)
+            if step['rps'] - previous_step['rps'] < \
+                    self.capacity_search.get('Min_Throughput_Gain', 0.5) * expected_gain:
+                return 'throughput saturated at %s (%.2f RPS)' % (step['load'], step['rps'])
+        return None
+
+    def _get_capacity_loads(self):
+        """Generate the loads of the steps of the capacity search: request rates or, if Load is
+        'concurrency', numbers of concurrent clients, from Start to Max."""
+        concurrency = self.capacity_search.get('Load', 'rate') == 'concurrency'
+        load = self.capacity_search.get('Start', 1 if concurrency else 10)
+        max_load = self.capacity_search.get('Max', 64 if concurrency else 1000)
+        step = self.capacity_search.get('Step')
+        step_factor = self.capacity_search.get('Step_Factor', 2)
+        if step is not None and step <= 0 or step is None and step_factor <= 1:
+            raise ValueError('Capacity_Search must increase the load: Step must be positive, '
+                             'Step_Factor greater than 1')
+
+        while load <= max_load:
+            yield load
+            next_load = load + step if step is not None else load * step_factor
+            load = max(int(next_load), load + 1) if concurrency else next_load
+
+    def _get_capacity_step(self, metrics_list, load, elapsed):
+        """Summarize the CallMetrics of a step of the capacity search, made at `load` in `elapsed`
+        seconds."""
+        metrics = histogram.CallMetrics(self.histogram_precision)
+        for call_metrics in metrics_list:
+            metrics.merge(call_metrics)
+        latencies = metrics.client_times
+        num_errors = sum(metrics.errors.values())
+        num_sent = latencies.count + num_errors
+        return {
+            'load': load,
+            'metrics': metrics,
+            'latencies': latencies,
+            'rps': num_sent / elapsed if elapsed else 0,
+            'p50': latencies.percentile(50) if latencies.count else -1,
+            'p99': latencies.percentile(99) if latencies.count else -1,
+            'error_rate': num_errors / num_sent if num_sent else 0
+        }
+
+    def _get_created_id(self, param, data):
+        """Get the ID of the object created by a POST API call from its response data, if any."""
+        created = data.get('result', data)
+        if isinstance(created, list):
+            created = created[0] if created else None
+        id_field = self._get_id_field(param, created)
+        return None if id_field is None else created[id_field]
+
+    def _get_harness_overhead(self, metrics_list):
+        """Get the time (in milliseconds) spent by the harness on each phase of the given CallMetrics,
+        per request, along with the average client-side response time; returns None if no request
+        was made."""
+        num_requests = 0
+        client_time = 0.0
+        phase_times = collections.OrderedDict((phase, 0.0) for phase in self.harness_phases)
+        for metrics in metrics_list:
+            num_requests += metrics.client_times.count + sum(metrics.errors.values())
+            client_time += metrics.client_times.total
+            for phase in self.harness_phases:
+                harness_times = metrics.phase_times.get(f'harness_{phase}')
+                if harness_times:
+                    phase_times[phase] += harness_times.total
+        if not num_requests:
+            return None
+        return ({phase: total / num_requests for phase, total in phase_times.items()},
+                client_time / num_requests)
+
+    def _get_harness_overhead_columns(self, api_call_label, metrics):
+        """Get the harness overhead columns of the results of an API call (see Harness_Profiling);
+        warns if the overhead is a significant share of the client-side response time."""
+        harness_overhead = self._get_harness_overhead([metrics])
+        if not harness_overhead:
+            return ['N/A'] * 3
+        phase_times, client_time = harness_overhead
+        overhead = sum(phase_times.values())
+        share = overhead / client_time if client_time else 0
+        if share > self.harness_profiling.get('Warn_Share', 0.1):
+            self._logger.warning('The harness spends %.2f ms per request of %s, %.0f%% of its client-side '
+                                 'response time (%s)', overhead, api_call_label, share * 100,
+                                 ', '.join('%s %.2f ms' % (name, phase_times[phase])
+                                           for phase, name in self.harness_phases.items()))
+        return ["%.2f" % client_time, "%.3f" % overhead, "%.1f" % (share * 100)]
+
+    def _get_id_field(self, param, item):
+        """Get the name of the property of an object which provides the value of a path parameter."""
+        if not isinstance(item, dict):
+            return None
+        id_field = self.id_pool_config.get('Fields', {}).get(param)
+        if id_field is not None:
+            return id_field if id_field in item else None
+        for id_field in [param, 'id', 'uuid']:
+            if id_field in item:
+                return id_field
+        return None
+
+    def _get_ids(self, api_call):
+        """Choose the IDs with which the path template of an API call is resolved from its ID pool.
+
+        When replaying a call plan, the IDs of an API call are taken in order, as those of a recorded
+        call plan are the IDs of its requests, in the order in which they were made (see
+        _write_call_plan()).
+        """
+        id_pool = api_call['ids']
+        distribution = self.id_pool_config.get('Distribution', 'uniform')
+        with self._id_pool_lock:
+            if self.replay_file:
+                position = api_call.get('id_position', 0)
+                api_call['id_position'] = position + 1
+                return id_pool[position % len(id_pool)]
+            if distribution == 'sequential':
+                position = self._id_pool_positions[api_call['path']]
+                self._id_pool_positions[api_call['path']] += 1
+                return id_pool[position % len(id_pool)]
+            elif distribution == 'zipfian':
+                # the n-th ID is chosen with a probability proportional to 1 / n ^ exponent
+                exponent = self.id_pool_config.get('Zipf_Exponent', 1.0)
+                return self._id_random.choices(
+                    id_pool, weights=[1 / rank ** exponent for rank in range(1, len(id_pool) + 1)])[0]
+            return self._id_random.choice(id_pool)
+
+    def _get_latency_histogram(self, metrics):
+        """Get the histogram used to judge an API call: server-side times, if it has any."""
+        return metrics.server_times if metrics.server_times.count else metrics.client_times
+
+    def _get_latency_status(self, api_call, url, avg_time):
+        """Determine whether the average response time of an API call is 'OK' or 'SLOW'."""
+        return 'OK' if avg_time <= self._get_latency_threshold(api_call, url) else 'SLOW'
+
+    def _get_latency_threshold(self, api_call, url):
+        """Get the highest average response time of an API call which is not 'SLOW'."""
+        if api_call['type'] == 'object_list':
+            threshold = self.avg_threshold_for_list
+        else:
+            threshold = self.avg_threshold_for_object
 
-        # find all functions defined in the api_call_generators module and execute them, if any
-        generator_module = 'api_call_generators'
-        if pkgutil.find_loader(generator_module):
-            api_call_generators = importlib.import_module(generator_module)
-            for module_item in dir(api_call_generators):
-                module_item_instance = getattr(api_call_generators, module_item)
-                if isinstance(module_item_instance, types.FunctionType):
-                    api_call = module_item_instance()
-                    if not api_call:
-                        self._logger.error('Could not generate API calls using %s.%s()',
-                                           generator_module, module_item_instance.__name__)
-                        self._logger.error('Got: %s', api_call)
-                        continue
+        # an exception may only raise the threshold
+        return max(threshold, self.avg_threshold_exceptions.get(url, threshold))
 
-                    if self._should_process_path(api_call['path']):
-                        self.api_calls.append(api_call)
-                    else:
-                        self._logger.debug('skipping path %s from generated API call', api_call['path'])
+    def _get_num_shards(self):
+        """Get the number of workers (or client processes) across which API calls are spread."""
+        return self.num_workers or max(self.num_processes, 1)
 
-        # this buys us free order of operations where "listing" calls are made first,
-        # thus single object retrieval has a defined identifier to work with.
-        self.api_calls = sorted(self.api_calls, key=lambda k: k['path'])
+    def _get_report_history(self):
+        """Get the median response time of each API call in the latest runs of the results store.
 
-    def init_summary_table(self):
-        self.summary_table.add_row(['API URL', self.api_base_url])
-        self.summary_table.add_row(['Number of requests per API call', self.num_passes])
-        self.summary_table.add_row(['Skipped API endpoints', '\n'.join(self.path_blacklist)])
+        The runs are those against the same API in the same mode, followed by this run; see
+        report.write_report(). Returns None if there is no earlier run.
+        """
+        if not self.report_history_runs or not os.path.exists(self.results_store_file):
+            return None
 
-    def print_results_table(self):
-        """Output the results of the performance test."""
-        print(self.summary_table)
-        print(self.table)
+        results_store = self._get_results_store()
+        runs = [run for run in results_store.get_runs(self.api_base_url, self.mode,
+                                                      self.report_history_runs + 1)
+                if run['id'] != self.run_id][-self.report_history_runs:]
+        if not runs:
+            return None
 
-    def run(self):
+        def get_median(metrics):
+            latency_histogram = self._get_latency_histogram(metrics)
+            return round(latency_histogram.percentile(50), 3) if latency_histogram.count else None
+
+        api_call_index = self.table.field_names.index('API Call')
+        medians = {result[api_call_index]: [] for result, metrics in self._get_results() if metrics}
+        for run in runs:
+            results = results_store.get_results(run['id'])
+            for label, label_medians in medians.items():
+                label_medians.append(get_median(results[label]['metrics']) if label in results else None)
+        for result, metrics in self._get_results():
+            if metrics:
+                medians[result[api_call_index]].append(get_median(metrics))
+
+        return {'runs': [run['started_at'] for run in runs] + [self.started_at], 'medians': medians}
+
+    def _get_request(self, api_call, session):
+        """Build the prepared request of an API call.
+
+        If the API call has an ID pool, its path template is resolved with IDs chosen from the pool
+        (see _get_ids()), which differ from one request to the next; when recording a call plan, the
+        IDs of every request are kept, in order, in the `ids_used` of the API call. Returns the prepared
+        request along with the IDs.
+        """
+        path = api_call['path']
+        ids = {}
+        if api_call.get('ids'):
+            ids = self._get_ids(api_call)
+            if self.record_plan_file:
+                api_call.setdefault('ids_used', []).append(ids)
+            for param, value in ids.items():
+                path = path.replace('{%s}' % param, urllib.parse.quote(str(value), safe=''))
+
+        # use a prepared request so we can save some overhead as well as get the formatted
+        # URL before sending it
+        api_endpoint = f"{self.api_base_url}{path}"
+        api_request = requests.Request(api_call['method'], api_endpoint,
+                                       params=api_call.get('params'), data=api_call.get('data', None),
+                                       json=api_call.get('json'), headers=session.headers)
+        return api_request.prepare(), ids
+
+    def _get_request_body_schema(self, path_def, method_def):
+        """Get the schema of the JSON request body of an operation of the API spec, if any."""
+        # OpenAPI 3.x
+        if 'requestBody' in method_def:
+            content = utils.resolve_ref(self.api_spec, method_def['requestBody']).get('content', {})
+            for media_type in sorted(content, key=lambda media_type: media_type != 'application/json'):
+                if 'json' in media_type:
+                    return content[media_type].get('schema', {})
+            return None
+
+        # OpenAPI 2.0; parameters of the operation override those of the path
+        for param in itertools.chain(method_def.get('parameters', []), path_def.get('parameters', [])):
+            param = utils.resolve_ref(self.api_spec, param)
+            if param.get('in') == 'body':
+                return param.get('schema', {})
+        return None
+
+    def _get_response_size_columns(self, metrics, num_objects):
+        """Get the response size columns (see response_size_fields) of the results of an API call."""
+        response_sizes = metrics.get_response_sizes()
+        if not response_sizes:
+            return ['N/A'] * len(self.response_size_fields)
+        return [
+            "%.2f" % (response_sizes['transfer_bytes'] / 1024),
+            "%.2f" % (response_sizes['body_bytes'] / 1024),
+            "%.0f" % (response_sizes['body_bytes'] / num_objects) if num_objects > 0 else 'N/A',
+            "%.2f" % (response_sizes['throughput'] / 1000000)
+            if response_sizes['throughput'] is not None else 'N/A'
+        ]
+
+    def _get_response_validator(self, api_call):
+        """Get the validator of the responses of the operation of an API call (see
+        perf.validation.OperationValidator), or None if the API spec does not describe the operation.
+
+        Validators are created once per operation and cached.
+        """
+        key = (api_call['method'], api_call['path'])
+        if key not in self._response_validators:
+            operation = self.api_spec.get('paths', {}).get(api_call['path'], {}).get(
+                api_call['method'].lower())
+            validation_config = self.response_validation or {}
+            self._response_validators[key] = validation.OperationValidator(
+                self.api_spec, operation, validation_config.get('Max_Items', 100),
+                validation_config.get('Max_Errors', 10)) if isinstance(operation, dict) else None
+        return self._response_validators[key]
+
+    def _get_results(self):
+        """Generate the results of the run, as (result row, CallMetrics) tuples; the CallMetrics is None
+        for rows without metrics of their own."""
+        if isinstance(self.results, stream.ResultStream):
+            for record in self.results.records():
+                yield record.row, record.metrics
+            return
+
+        api_call_index = self.table.field_names.index('API Call')
+        for result_row in self.results:
+            yield result_row, self.call_metrics.get(result_row[api_call_index])
+
+    def _get_results_store(self):
+        if not self._results_store:
+            self._results_store = store.ResultStore(self.results_store_file)
+        return self._results_store
+
+    def _get_results_table_lines(self):
+        """Generate the lines of the text of the results table; when streaming, the table is rebuilt
+        from the results stream a chunk of rows at a time (see stream.get_table_lines())."""
+        if isinstance(self.results, stream.ResultStream):
+            yield from stream.get_table_lines(self.table, self.results)
+        else:
+            yield from str(self.table).split('\n')
+
+    def _get_session(self):
+        """Get the requests session to be used by the current thread.
+
+        requests.Session is not guaranteed to be thread-safe, so each worker thread gets its own
+        session (and thus connection pool) configured identically to self.session.
+        """
+        if threading.current_thread() is threading.main_thread():
+            return self.session
+
+        session = getattr(self._thread_local, 'session', None)
+        if session is None:
+            session = self._create_session()
+            self._thread_local.session = session
+        return session
+
+    def _get_timeout(self):
+        return self.connect_timeout, self.read_timeout
+
+    def _index_objects(self, api_call, ids, data):
+        """Pool the IDs of the objects returned by a "listing" API call, if applicable.
+
+        `ids` are the values of the parameters with which the path of the API call was resolved; the
+        IDs of the objects are pooled along with those, for nested path templates.
+        """
+        if api_call['method'] in ['GET', 'POST'] and api_call['path'] in self.indexable_paths:
+            result = data.get('result')
+            if api_call['method'] == 'POST' and isinstance(result, dict):
+                # the object created
+                result = [result]
+            if result and isinstance(result, list) and data.get('count', len(result)) > 0:
+                for single_object_path in self.indexable_paths[api_call['path']]:
+                    param = utils.get_path_params(single_object_path)[-1]
+                    with self._id_pool_lock:
+                        id_pool = self.id_pools.setdefault(single_object_path, [])
+                        for item in result:
+                            if len(id_pool) >= self.id_pool_size:
+                                break
+                            id_field = self._get_id_field(param, item)
+                            if id_field is None:
+                                continue
+                            object_ids = dict(ids, **{param: item[id_field]})
+                            if object_ids not in id_pool:
+                                id_pool.append(object_ids)
+                    self._logger.debug('Pooled %s ID(s) for %s', len(id_pool), single_object_path)
+                    if id_pool and self._scheduler:
+                        self._scheduler.provide(single_object_path)
+
+    def _init_results_table(self, field_names):
+        self.table = prettytable.PrettyTable()
+        self.table.field_names = field_names
+        self.table.align['API Call'] = 'l'
+        self.table.align['Description'] = 'l'
+
+    def _init_run(self):
+        """Log how run() will execute the API calls and add the columns of enabled options to the table."""
         qualifier = 'would' if self.dry_run else 'will'
-        self._logger.info('Each API call %s be executed %s time(s)', qualifier, self.num_passes)
+        if self.adaptive_sampling is None:
+            self._logger.info('Each API call %s be executed %s time(s)', qualifier, self.num_passes)
+        else:
+            self._logger.info('Each API call %s be executed until its response time has converged',
+                              qualifier)
+            self._init_results_table(self.table.field_names + ['Passes'])
+
+        if self.warm_up_passes:
+            self._logger.info('Each API call %s be preceded by %s warm-up pass(es)', qualifier,
+                              self.warm_up_passes)
+        if self.cold_cache is not None:
+            self._init_results_table(self.table.field_names + ['Cold Avg (ms)', 'Cache Speedup'])
+        if self.transport_timing:
+            self._init_results_table(self.table.field_names + [
+                f'{phase} (ms)' for phase in self.transport_phases.values()])
+        if self.payload_profiling:
+            self._init_results_table(self.table.field_names + self.response_size_fields)
+        if self.harness_profiling is not None:
+            self._init_results_table(self.table.field_names + ['Client (ms)', 'Overhead (ms)',
+                                                               'Overhead (%)'])
+        if self.response_validation is not None:
+            self._logger.info('%s%% of the responses %s be validated against the API spec',
+                              self.response_validation.get('Sample_Rate', 0.1) * 100, qualifier)
+            self._init_results_table(self.table.field_names + ['Invalid', 'Item Failures'])
+        if self.concurrency > 1:
+            self._logger.info('Up to %s API calls %s be executed concurrently', self.concurrency,
+                              qualifier)
+
+    def _is_success(self, api_call, status_code):
+        """Determine whether a response to an API call succeeded: its status code is one of the success
+        status codes declared by the operation in the API spec or, if the spec does not describe the
+        operation, one of validation.DEFAULT_SUCCESS_STATUSES."""
+        response_validator = self._get_response_validator(api_call)
+        if response_validator:
+            return response_validator.is_success(status_code)
+        return status_code in validation.DEFAULT_SUCCESS_STATUSES
+
+    def _load_call_plan(self, call_plan_key):
+        """Load the cached API calls built from the API spec, if they were cached under the given key."""
+        if not self.call_plan_cache_file:
+            return None
+
+        try:
+            with open(self.call_plan_cache_file, 'r') as f:
+                call_plan = json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            self._logger.warning('Ignoring invalid API call cache %s', self.call_plan_cache_file)
+            return None
+
+        return call_plan if call_plan.get('key') == call_plan_key else None
+
+    def _load_generator_cache(self):
+        """Load the cached API calls of the functions of the api_call_generators module, if enabled."""
+        if self.generator_cache is None:
+            return {}
+
+        try:
+            with open(self.generator_cache_file, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            self._logger.warning('Ignoring invalid generator cache %s', self.generator_cache_file)
+            return {}
+
+    def _make_pass(self, api_call, session, api_prepared_request, metrics=None, index_objects=False,
+                   ids=None, full_response=False):
+        """Make an API call once, recording its response time to metrics (if given).
+
+        If `index_objects` is set, the IDs of the objects returned are pooled (see _index_objects()),
+        along with the `ids` with which the path of the API call was resolved. If `full_response` is
+        set, the whole response body is decoded rather than the members used here.
+
+        Returns the response data along with the response time of the API call, which is None if the
+        API call failed.
+        """
+        transport.reset_phase_timings()
+        start = time.perf_counter()
+        try:
+            # stream the response so the time to the first byte and the time spent downloading
+            # the response body can be told apart
+            result = session.send(api_prepared_request, stream=True, timeout=self._get_timeout())
+            headers_received = time.perf_counter()
+            result.content  # reads the whole response body
+            downloaded = time.perf_counter()
+            # bytes read off the connection, i.e. before the content encoding (e.g. gzip) is decoded
+            transfer_bytes = result.raw.tell()
+        except requests.exceptions.RequestException as e:
+            error = 'TIMEOUT' if isinstance(e, requests.exceptions.Timeout) else 'FAILED'
+            self._logger.error('API call failed: %s %s: %s', api_call['method'],
+                               api_prepared_request.url, e)
+            if metrics:
+                metrics.errors[error] += 1
+            return {'count': -1, 'result': error, 'time': '-1mS'}, None
+        decoded = validated = downloaded
+
+        # if auth fails for some reason, log a warning
+        if result.status_code == requests.codes.unauthorized:
+            self._logger.warning('Got Unauthorized response for: %s',
+                                 api_prepared_request.url)
+
+        response_validator = self._get_response_validator(api_call)
+        is_success = self._is_success(api_call, result.status_code)
+
+        if is_success and result.status_code != requests.codes.no_content:
+            # validating a response and looking for the failed items of a multi-status response need
+            # the whole response body, which is then decoded once for everything
+            validate = metrics is not None and response_validator is not None and \
+                self._should_validate(metrics)
+            is_multi_status = result.status_code == requests.codes.multi_status
+            full_response = full_response or validate or is_multi_status
+
+            # only the members of the response body needed here are decoded, as decoding a large
+            # list would take longer than retrieving it (see utils.get_json_fields())
+            text = result.content.decode(
+                result.encoding or requests.utils.guess_json_utf(result.content) or 'utf-8')
+            index_objects = index_objects and api_call['path'] in self.indexable_paths
+            if full_response:
+                body = json.loads(text) if text.strip() else {}
+                data = body if isinstance(body, dict) else {'result': body}
+            else:
+                data = utils.get_json_fields(text, ['count', 'time'], ['result'],
+                                             self.id_pool_size if index_objects else 1)
+                if data is None:
+                    data = json.loads(text)
+            decoded = time.perf_counter()
+            self._record_harness_time(metrics, 'decode', downloaded, decoded)
+
+            # validation happens once the response has been timed, so that it does not count towards
+            # the response time
+            if validate:
+                metrics.record_validation(response_validator.validate(result.status_code, body))
+            if is_multi_status and metrics:
+                metrics.record_item_failures(validation.get_failed_items(body))
+            validated = time.perf_counter()
+            self._record_harness_time(metrics, 'validate', decoded, validated)
+
+            if index_objects:
+                self._index_objects(api_call, ids or {}, data)
+
+        elif is_success:
+            milliseconds = result.elapsed.total_seconds() * 1000
+            data = {
+                'count': 1,
+                'result': {},
+                'time': f'{milliseconds}mS'
+            }
+
+        # the webserver timed out, so we must process a synthetic / assumed result.
+        elif result.status_code == requests.codes.gateway_timeout:
+            data = {
+                'count': -1,
+                'result': 'TIMEOUT',
+                'time': '-1mS'
+            }
+        else:
+            self._logger.error('API call failed: %s %s: %s',
+                               api_call['method'], result.url, result.text)
+            data = {
+                'count': -1,
+                'result': 'FAILED',
+                'time': '-1mS'
+            }
+
+        if 'time' in data:
+            api_call_response_time = float(data['time'].replace('mS', ''))
+        else:  # support "non-conforming" response structures
+            api_call_response_time = result.elapsed.total_seconds() * 1000
+
+        response_result = data.get('result', None)
+        if response_result in ['FAILED', 'TIMEOUT']:
+            if metrics:
+                metrics.errors[response_result] += 1
+            return data, None
+
+        if metrics:
+            metrics.server_times.record(api_call_response_time)
+            metrics.client_times.record(result.elapsed.total_seconds() * 1000)
+
+            if self.transport_timing:
+                phase_times = transport.get_phase_timings()
+                phase_times['ttfb'] = (headers_received - start) * 1000 - sum(phase_times.values())
+                phase_times['download'] = (downloaded - headers_received) * 1000
+                phase_times['decode'] = (decoded - downloaded) * 1000
+                metrics.record_phase_times(phase_times)
+
+            metrics.record_response_size(transfer_bytes, len(result.content),
+                                         (downloaded - headers_received) * 1000)
+            self._record_harness_time(metrics, 'record', validated)
+
+        return data, api_call_response_time
+
+    def _merge_call_metrics(self, call_metrics, call_metrics_dicts):
+        """Merge serialized CallMetrics, keyed by API call label, into the given CallMetrics."""
+        for api_call_label, metrics_dict in call_metrics_dicts.items():
+            metrics = histogram.CallMetrics.from_dict(metrics_dict)
+            if api_call_label in call_metrics:
+                call_metrics[api_call_label].merge(metrics)
+            else:
+                call_metrics[api_call_label] = metrics
+
+    def _needs_another_pass(self, passes, samples, metrics, threshold):
+        """Determine whether an API call should be made (at least) once more.
+
+        Without adaptive sampling, each API call is made Number_Of_Passes times. Otherwise, API calls
+        are made until the confidence interval of the sampled statistic is narrow enough, unless
+        the API call failed or is clearly (Slow_Factor times its threshold) slow.
+        """
+        if self.adaptive_sampling is None:
+            return passes < self.num_passes
+
+        if passes < self.adaptive_sampling.get('Min_Passes', 5):
+            return True
+        if passes >= self.adaptive_sampling.get('Max_Passes', 100) or sum(metrics.errors.values()):
+            return False
+
+        statistic = self.adaptive_sampling.get('Statistic', 'mean')
+        interval = stats.get_confidence_interval(
+            samples, self.adaptive_sampling.get('Confidence', 0.95),
+            None if statistic == 'mean' else float(statistic))
+        if not interval:
+            return True
+
+        low, estimate, high = interval
+        if low > threshold * self.adaptive_sampling.get('Slow_Factor', 2):
+            self._logger.debug('Stopping after %s passes: %s is at least %.2f ms', passes,
+                               statistic, low)
+            return False
+
+        return high - low > self.adaptive_sampling.get('Relative_Width', 0.1) * estimate
+
+    def _prepare_api_call(self, api_call, session):
+        """Resolve the path of an API call and build its prepared request.
+
+        The path of an API call may be a template (e.g. /v1/widgets/{uuid}), whose parameters are
+        resolved with IDs chosen from the ID pool of the template for every request (see
+        _get_request()); the pool is kept in the `ids` of the API call. The label and the prepared
+        request of such an API call are based on the unresolved template.
+
+        Returns a tuple of the prepared request, the API call label and its description, or None
+        if the API call cannot be made (i.e. no IDs are known for a path template).
+        """
+        if utils.get_path_params(api_call['path']):
+            api_call['type'] = 'single_object' if api_call['path'].endswith('}') else 'object_list'
+            if not self.dry_run and not api_call.get('ids'):
+                # a nested "listing" path (e.g. /v1/widgets/{uuid}/parts) uses the ID pool of the
+                # template it extends
+                id_pool_path = api_call['path'][:api_call['path'].rindex('}') + 1]
+                with self._id_pool_lock:
+                    api_call['ids'] = list(self.id_pools.get(id_pool_path, []))
+                if not api_call['ids']:
+                    self._logger.warning('Could not get an ID for %s; skipping', api_call['path'])
+                    return None
+        else:
+            api_call['type'] = 'object_list'
+
+        # no IDs are drawn (nor recorded in a call plan) for this request, which is never sent as is
+        api_prepared_request, _ = self._get_request(dict(api_call, ids=None), session)
+
+        # set the API call metadata
+
+        # determine the API call path and parameter string (URL minus the protocol, domain name,
+        # and port)
+        api_call_parsed = urllib.parse.urlparse(api_prepared_request.url)
+        if '{' in api_call['path']:
+            api_call_path_and_params = f"{urllib.parse.urlparse(self.api_base_url).path}{api_call['path']}"
+        else:
+            api_call_path_and_params = f'{api_call_parsed.path}'
+        if api_call_parsed.query:
+            api_call_path_and_params += f'?{api_call_parsed.query}'
+        api_call_label = f"{api_call['method']} {api_call_path_and_params}"
+        api_call_description = api_call.get('description', '')
+
+        if api_call_path_and_params in self.avg_threshold_exceptions:
+            api_call_description += '\n' if api_call_description else ''
+            api_call_description += f'Threshold: {self.avg_threshold_exceptions[api_call_path_and_params]}'
 
+        self._logger.debug('Processing calls to %s', api_call_label)
+
+        return api_prepared_request, api_call_label, api_call_description
+
+    def _prepare_load_calls(self, register_metrics=True):
+        """Prepare the weighted mix of API calls of the load test.
+
+        The metrics of each API call are those reported for it (see _get_call_metrics()), unless
+        `register_metrics` is false.
+        """
+        mix = self.load_test_config.get('Mix', {})
+
+        if not self.dry_run:
+            self._prime_id_pools()
+
+        # build the mix of API calls. when a mix is configured, only calls on the paths it lists
+        # are made, each being weighted accordingly.
+        load_calls = []
         for api_call in self.api_calls:
+            weight = mix.get(api_call['path'], 0) if mix else 1
+            if not weight:
+                continue
+            api_call = dict(api_call)
+            prepared = self._prepare_api_call(api_call, self.session)
+            if prepared:
+                load_calls.append({'api_call': api_call,
+                                   'request': prepared[0],
+                                   'label': prepared[1],
+                                   'description': prepared[2],
+                                   'weight': weight,
+                                   'metrics': self._get_call_metrics(prepared[1]) if register_metrics
+                                   else histogram.CallMetrics(self.histogram_precision)})
+        return load_calls
+
+    def _prime_id_pools(self):
+        """Make each "listing" API call once, so that calls on path templates have IDs to work with.
+
+        Listing calls are made by number of path parameters, thus the IDs of nested templates are pooled
+        once those of their parent template are.
+        """
+        listing_calls = sorted(
+            (api_call for api_call in self.api_calls
+             if api_call['method'] == 'GET' and api_call['path'] in self.indexable_paths and
+             any(path not in self.id_pools for path in self.indexable_paths[api_call['path']])),
+            key=lambda api_call: len(utils.get_path_params(api_call['path'])))
+        for api_call in listing_calls:
+            api_call = dict(api_call)
+            if self._prepare_api_call(api_call, self.session):
+                prepared, ids = self._get_request(api_call, self.session)
+                self._make_pass(api_call, self.session, prepared, index_objects=True, ids=ids)
+
+    def _read_call_plan(self, call_plan_file):
+        """Generate the API calls of a call plan file, as recorded by _write_call_plan().
+
+        Every line of the file is a JSON object describing an API call like the functions of the
+        api_call_generators module do: `method` (default: GET), `path` (relative to the base URL of
+        the API, possibly with a query string), `params`, `data` and `description`. Lines derived from
+        access logs may give the `url` of the request instead of its path, in which case the path of
+        the base URL is stripped from it. The file is read one line at a time, so it may be larger than
+        the available memory.
+        """
+        base_path = urllib.parse.urlparse(self.api_base_url).path
+        with open(call_plan_file, 'r') as f:
+            for line_number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError as e:
+                    self._logger.error('Skipping line %s of %s: %s', line_number, call_plan_file, e)
+                    continue
 
-            api_call_object_count = 0
-            api_call_data = api_call.get('data', None)
+                if 'path' in entry:
+                    url = urllib.parse.urlsplit(entry['path'])
+                    path = url.path
+                else:
+                    url = urllib.parse.urlsplit(entry['url'])
+                    path = url.path
+                    if base_path and (path == base_path or path.startswith(base_path + '/')):
+                        path = path[len(base_path):]
+
+                api_call = {'path': path, 'method': entry.get('method', 'GET').upper()}
+                params = urllib.parse.parse_qsl(url.query, keep_blank_values=True)
+                if params or 'params' in entry:
+                    api_call['params'] = dict(params, **entry.get('params', {}))
+                for key in ['data', 'description', 'ids']:
+                    if key in entry:
+                        api_call[key] = entry[key]
+
+                if self._should_process_path(api_call['path']):
+                    yield api_call
+
+    def _record_harness_time(self, metrics, phase, started, ended=None):
+        """Record the time spent by the harness on a phase of an API call (see harness_phases), from
+        `started` until `ended` or now, if profiling the harness."""
+        if self.harness_profiling is not None and metrics:
+            metrics.record_phase_times(
+                {f'harness_{phase}': ((ended or time.perf_counter()) - started) * 1000})
+
+    def _report_harness_overhead(self):
+        """Add the time spent by the harness per request, over all API calls, to the summary table and
+        write the cProfile profile of the run, if requested (see Harness_Profiling)."""
+        harness_overhead = self._get_harness_overhead(
+            metrics for _, metrics in self._get_results() if metrics)
+        if harness_overhead:
+            phase_times, client_time = harness_overhead
+            overhead = sum(phase_times.values())
+            share = overhead / client_time if client_time else 0
+            self.summary_table.add_row(['Harness overhead per request (ms)', '%.3f (%s)' % (
+                overhead, ', '.join('%s %.3f' % (name, phase_times[phase])
+                                    for phase, name in self.harness_phases.items()))])
+            self.summary_table.add_row(['Harness overhead share of client time', '%.1f%%' % (share * 100)])
+            if share > self.harness_profiling.get('Warn_Share', 0.1):
+                # the harness holds the interpreter lock while it works, delaying the threads timing
+                # concurrent requests, and it cannot send requests as fast as the API responds
+                self._logger.warning('The harness spends %.0f%% of the client-side response time of the '
+                                     'requests on its own work; concurrent response times may be '
+                                     'inflated and request rates limited by the harness', share * 100)
+
+        profile_file = self.harness_profiling.get('Output')
+        if profile_file and self._profilers:
+            stats = pstats.Stats(*self._profilers)
+            stats.dump_stats(profile_file)
+            self._logger.info('Wrote the profile of the harness to %s (see the pstats module)', profile_file)
+
+    def _run_api_call(self, api_call):
+        """Execute (or simulate, in dry run mode) all passes of a single API call.
+
+        Returns the result row, or None if the API call had to be skipped.
+        """
+        session = self._get_session()
+
+        api_call_object_count = 0
+
+        started = time.perf_counter()
+        prepared = self._prepare_api_call(api_call, session)
+        if not prepared:
+            return None
+        api_prepared_request, api_call_label, api_call_description = prepared
+        prepared_at = time.perf_counter()
+
+        # compile the results table with dummy data so we can see the table output / make sure
+        # the appropriate calls are represented
+        if self.dry_run:
+            result_row = [
+                api_call_label,
+                api_call_description,
+                api_call_object_count,
+                'DRY RUN',
+                'N/A',
+                'N/A',
+                'N/A'
+            ]
+            return result_row + ['N/A'] * (len(self.table.field_names) - len(result_row))
+
+        # API calls on path templates are made with different IDs from one pass to the next, so
+        # they do not all retrieve the same (cached) object
+        ids = {}
+        is_template = bool(api_call.get('ids'))
+
+        # warm-up passes (connection setup, server-side caches...) are excluded from the results
+        for x in range(0, self.warm_up_passes):
+            if is_template:
+                api_prepared_request, ids = self._get_request(api_call, session)
+            self._make_pass(api_call, session, api_prepared_request, index_objects=x == 0, ids=ids)
+
+        # iterative execution of the API call
+        metrics = self._get_call_metrics(api_call_label)
+        self._record_harness_time(metrics, 'prepare', started, prepared_at)
+        threshold = self._get_latency_threshold(api_call, api_prepared_request.url)
+        samples = []
+
+        x = 0
+        while self._needs_another_pass(x, samples, metrics, threshold):
+            if is_template:
+                started = time.perf_counter()
+                api_prepared_request, ids = self._get_request(api_call, session)
+                self._record_harness_time(metrics, 'prepare', started)
+            data, api_call_response_time = self._make_pass(
+                api_call, session, api_prepared_request, metrics,
+                index_objects=x == 0 and not self.warm_up_passes, ids=ids)
+
+            # set the API call metadata by looking at the first response
+            if x == 0:
+                api_call_object_count = data.get('count', 1 if data else 0)
+
+            if api_call_response_time is not None:
+                samples.append(api_call_response_time)
+
+            x += 1
+
+        # "cold" passes defeat caching by making every request unique
+        if self.cold_cache is not None:
+            cold_metrics = histogram.CallMetrics(self.histogram_precision)
+            self.cold_call_metrics[api_call_label] = cold_metrics
+            for _ in range(0, self.cold_cache.get('Passes', self.num_passes)):
+                if is_template:
+                    api_prepared_request, ids = self._get_request(api_call, session)
+                self._make_pass(api_call, session,
+                                self._get_cache_busting_request(api_prepared_request),
+                                cold_metrics)
+
+        if metrics.errors['FAILED']:
+            status = 'FAILED'
+            avg_time = max_time = min_time = -1
+        elif metrics.errors['TIMEOUT']:
+            status = 'TIMEOUT'
+            avg_time = max_time = min_time = -1
+        else:
+            avg_time = metrics.server_times.mean()
+            max_time = metrics.server_times.max
+            min_time = metrics.server_times.min
+
+            status = self._get_latency_status(api_call, api_prepared_request.url, avg_time)
+
+        result_row = [
+            api_call_label,
+            api_call_description,
+            api_call_object_count,
+            status,
+            "%.2f" % avg_time,
+            "%.2f" % max_time,
+            "%.2f" % min_time
+        ]
+        if self.adaptive_sampling is not None:
+            result_row.append(x)
+        if self.cold_cache is not None:
+            cold_avg_time = cold_metrics.server_times.mean()
+            result_row.append("%.2f" % cold_avg_time if cold_avg_time is not None else 'N/A')
+            result_row.append("%.2fx" % (cold_avg_time / avg_time)
+                              if cold_avg_time is not None and avg_time > 0 else 'N/A')
+        if self.transport_timing:
+            for phase in self.transport_phases:
+                phase_times = metrics.phase_times.get(phase)
+                result_row.append("%.2f" % phase_times.mean() if phase_times else 'N/A')
+        if self.payload_profiling:
+            result_row += self._get_response_size_columns(metrics, api_call_object_count)
+        if self.harness_profiling is not None:
+            result_row += self._get_harness_overhead_columns(api_call_label, metrics)
+        if self.response_validation is not None:
+            result_row.append(f'{metrics.num_invalid}/{metrics.num_validated}')
+            result_row.append(metrics.num_item_failures)
+        self._logger.debug(result_row)
+        return result_row
+
+    def _run_api_call_generator(self, function, generator_cache):
+        """Execute a function of the api_call_generators module; returns the list of its API calls.
+
+        A function may return a single API call, or return or yield any number of them. If the
+        generator cache is enabled, the API calls of a function are cached for the configured TTL (or
+        the `cache_ttl` attribute of the function, if set) keyed by the source code of the function.
+        Returns None if the function failed.
+        """
+        cache_ttl = getattr(function, 'cache_ttl', (self.generator_cache or {}).get('TTL', 3600))
+        cache_key = None
+        if self.generator_cache is not None and cache_ttl:
+            try:
+                function_source = inspect.getsource(function)
+            except (OSError, TypeError):
+                function_source = None
+            if function_source is not None:
+                cache_key = hashlib.sha256(
+                    f'{function.__module__}.{function.__qualname__}\n{function_source}'.encode()
+                ).hexdigest()
+                cached = generator_cache.get(cache_key)
+                if cached and time.time() - cached['created'] < cache_ttl:
+                    self._logger.debug('Using cached API calls of %s()', function.__name__)
+                    return cached['api_calls']
+
+        try:
+            api_calls = function()
+            if isinstance(api_calls, dict):
+                api_calls = [api_calls]
+            elif api_calls:
+                api_calls = list(api_calls)
+        except Exception:
+            self._logger.exception('%s() failed', function.__name__)
+            return None
+
+        if cache_key and api_calls:
+            with self._generator_cache_lock:
+                generator_cache[cache_key] = {
+                    'created': time.time(),
+                    'ttl': cache_ttl,
+                    'api_calls': api_calls
+                }
+        return api_calls
+
+    def _run_api_calls(self, indexed_api_calls, on_result=None):
+        """Execute API calls, given as (index, API call) tuples.
+
+        Returns (index, result row) tuples ordered by index, i.e. in API call order regardless of the
+        order in which they completed; API calls which had to be skipped are left out. If `on_result`
+        is given, it is called instead with each result row and its API call as soon as the API call
+        is done (i.e. in the order in which they complete), and only a bounded number of API calls
+        (Max_In_Flight of Streaming) is taken from `indexed_api_calls` ahead of those done.
+        """
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+
+            # API calls are submitted as they are generated, except for calls on path templates: those
+            # wait until the ID pool of their template has IDs, i.e. until one of its producers (the
+            # "listing" calls of self.indexable_paths, or calls creating objects) has pooled the IDs
+            # of the objects of its first response. If every producer of a pool finishes without
+            # pooling any ID, only the calls depending on that pool are skipped.
+            def skip_api_call(api_call):
+                self._logger.warning('Could not get an ID for %s; skipping', api_call['path'])
+                if self._live_monitor:
+                    self._live_monitor.api_call_done()
+
+            def add_result(api_call, result_row):
+                if result_row:
+                    on_result(result_row, api_call)
+
+            self._scheduler = scheduler.DependencyScheduler(
+                lambda api_call: self._submit_api_call(executor, api_call), skip_api_call,
+                add_result if on_result else None,
+                (self.streaming or {}).get('Max_In_Flight', self.concurrency * 2) if on_result else None)
+            with self._id_pool_lock:
+                for id_pool_path, id_pool in self.id_pools.items():
+                    if id_pool:
+                        self._scheduler.provide(id_pool_path)
+
+            indexes = []
+            for x, api_call in indexed_api_calls:
+                indexes.append(x)
+                self._scheduler.add(api_call, *self._get_api_call_dependencies(api_call))
+            results = self._scheduler.wait()
+            self._scheduler = None
+
+        return [(x, result_row) for x, result_row in sorted(zip(indexes, results)) if result_row]
+
+    def _run_distributed_api_calls(self, indexed_api_calls):
+        """Execute API calls, given as (index, API call) tuples, on the workers of a distributed run.
+
+        Every worker is given the API calls on a share of the paths (see distributed.get_shards()).
+        Returns (index, result row) tuples ordered by index, like _run_api_calls().
+        """
+        shards = distributed.get_shards(indexed_api_calls, self._get_num_shards())
+        responses = self._distribute('sweep', [{'api_calls': shard} for shard in shards])
+
+        # API calls are resolved (e.g. their UUID, and the IDs of their requests when recording a call
+        # plan) by the workers
+        api_calls = dict(indexed_api_calls)
+        indexed_result_rows = []
+        for response in responses:
+            for x, api_call in response['api_calls']:
+                api_calls[x].update(api_call)
+            indexed_result_rows.extend(response['results'])
+            self._merge_call_metrics(self.call_metrics, response['call_metrics'])
+            self._merge_call_metrics(self.cold_call_metrics, response['cold_call_metrics'])
+        return sorted(indexed_result_rows, key=lambda indexed_result_row: indexed_result_row[0])
+
+    def _run_profiled(self, function, *args):
+        """Call a function under the cProfile profiler of the current thread (see Harness_Profiling)."""
+        profiler = getattr(self._thread_local, 'profiler', None)
+        if profiler is None:
+            profiler = self._thread_local.profiler = cProfile.Profile()
+            with self._profilers_lock:
+                self._profilers.append(profiler)
+        return profiler.runcall(function, *args)
+
+    def _run_write_resource(self, resource):
+        """Benchmark the write operations of a resource (see _generate_write_resources()).
+
+        Fixtures are created with the POST operation, then updated with the PUT and PATCH operations
+        and deleted with the DELETE operation, each operation being made once on every fixture. Fixtures
+        which are left (e.g. because their deletion failed) are deleted afterwards, unmeasured.
+
+        Returns an (API call, label, description, CallMetrics, elapsed seconds) tuple per operation; the
+        metrics are None in dry run mode.
+        """
+        session = self._get_session()
+        num_fixtures = self.write_test_config.get('Fixtures', self.num_passes)
+        param = utils.get_path_params(resource['object_path'])[-1]
+        operation_names = {'POST': 'Create', 'PUT': 'Replace', 'PATCH': 'Update', 'DELETE': 'Delete'}
+
+        operations = []
+        fixtures = []
+        num_unidentified = 0
+        try:
+            for method, body_schema in resource['operations'].items():
+                is_create = method == 'POST'
+                api_call = {'path': resource['path'] if is_create else resource['object_path'],
+                            'method': method}
+                if not is_create:
+                    if not fixtures and not self.dry_run:
+                        self._logger.warning('Skipping %s %s: no fixture was created', method,
+                                             resource['object_path'])
+                        continue
+                    # only ever update or delete the objects created here
+                    api_call['ids'] = list(fixtures)
+                if body_schema is not None:
+                    api_call['json'] = schema.get_example(self.api_spec, body_schema)
 
-            if '{uuid}' in api_call['path']:
+                prepared = self._prepare_api_call(api_call, session)
+                if not prepared:
+                    continue
+                api_prepared_request, api_call_label, api_call_description = prepared
+                # every write operation concerns a single object
                 api_call['type'] = 'single_object'
+                api_call_description = operation_names[method] + (
+                    '\n' + api_call_description if api_call_description else '')
+
                 if self.dry_run:
-                    api_call['path'] = api_call['path'].replace('{uuid}', '_uuid_')
-                else:
-                    if api_call['path'] in self.single_object_index:
-                        api_call['path'] = api_call['path'].replace(
-                            '{uuid}', self.single_object_index[api_call['path']])
-                    else:
-                        self._logger.warning('Could not get a UUID for %s; skipping', api_call['path'])
+                    operations.append((api_call, api_call_label, api_call_description, None, 0.0))
+                    continue
+
+                metrics = self._get_call_metrics(api_call_label)
+                start = time.perf_counter()
+                for fixture in [None] * num_fixtures if is_create else list(fixtures):
+                    if fixture is not None:
+                        api_call['ids'] = [fixture]
+                    if body_schema is not None:
+                        # unique bodies, so that fixtures do not conflict with each other
+                        api_call['json'] = schema.get_example(self.api_spec, body_schema)
+                    api_prepared_request, ids = self._get_request(api_call, session)
+                    data, api_call_response_time = self._make_pass(
+                        api_call, session, api_prepared_request, metrics, full_response=is_create)
+                    if api_call_response_time is None:
                         continue
+
+                    if is_create:
+                        object_id = self._get_created_id(param, data)
+                        if object_id is None:
+                            num_unidentified += 1
+                        else:
+                            fixtures.append(dict(ids, **{param: object_id}))
+                    elif method == 'DELETE':
+                        fixtures.remove(fixture)
+                operations.append((api_call, api_call_label, api_call_description, metrics,
+                                   time.perf_counter() - start))
+        finally:
+            for fixture in fixtures:
+                api_call = {'path': resource['object_path'], 'method': 'DELETE', 'ids': [fixture]}
+                _, api_call_response_time = self._make_pass(
+                    api_call, session, self._get_request(api_call, session)[0])
+                if api_call_response_time is None:
+                    self._logger.error('Could not delete fixture %s of %s', fixture, resource['path'])
+            if num_unidentified:
+                self._logger.error('%s object(s) created with POST %s could not be identified, thus '
+                                   'were not deleted', num_unidentified, resource['path'])
+        return operations
+
+    def _save_call_plan(self, call_plan_key, api_calls):
+        """Cache the API calls built from the API spec under the given key, yielding them as they are
+        built.
+
+        API calls are written to the cache one at a time rather than collected, and the cache is only
+        replaced once every API call was built.
+        """
+        if not self.call_plan_cache_file:
+            yield from api_calls
+            return
+
+        temp_file = f'{self.call_plan_cache_file}.tmp'
+        try:
+            f = open(temp_file, 'w')
+            f.write('{"key":%s,"api_calls":[' % json.dumps(call_plan_key))
+        except OSError as e:
+            self._logger.warning('Could not cache API calls in %s: %s', self.call_plan_cache_file, e)
+            f = None
+
+        for x, api_call in enumerate(api_calls):
+            if f:
+                try:
+                    f.write((',' if x else '') + json.dumps(api_call))
+                except OSError as e:
+                    self._logger.warning('Could not cache API calls in %s: %s',
+                                         self.call_plan_cache_file, e)
+                    f.close()
+                    f = None
+            yield api_call
+
+        if f:
+            try:
+                with f:
+                    f.write('],"indexable_paths":%s}' % json.dumps(self.indexable_paths))
+                os.replace(temp_file, self.call_plan_cache_file)
+            except OSError as e:
+                self._logger.warning('Could not cache API calls in %s: %s', self.call_plan_cache_file, e)
+
+    def _save_generator_cache(self, generator_cache):
+        """Save the cached API calls of the functions of the api_call_generators module, if enabled."""
+        if self.generator_cache is None:
+            return
+
+        # drop expired entries, e.g. those of functions whose source code has since changed
+        now = time.time()
+        generator_cache = {key: cached for key, cached in generator_cache.items()
+                           if now - cached['created'] < cached['ttl']}
+        try:
+            with open(self.generator_cache_file, 'w') as f:
+                json.dump(generator_cache, f)
+        except (OSError, TypeError) as e:
+            self._logger.warning('Could not cache generated API calls in %s: %s',
+                                 self.generator_cache_file, e)
+
+    def _search_capacity(self, load_calls, groups):
+        """Step up the load on the load calls until it is no longer sustained (see
+        _get_capacity_knee()), or Max is reached.
+
+        Every step is made for Step_Duration seconds with fresh CallMetrics; whether a step sustains
+        its load is determined over all of the load calls, while its throughput and response times are
+        also summarized for each group of them (`groups` being lists of load calls keyed by label).
+        Returns the steps of each group (see _get_capacity_step()), the index of the last step which
+        sustained its load (None if none did) and the reason why the search stopped.
+        """
+        concurrency = self.capacity_search.get('Load', 'rate') == 'concurrency'
+        duration = self.capacity_search.get('Step_Duration', 10)
+        group_steps = collections.OrderedDict((label, []) for label in groups)
+        sustained = None
+        knee = 'not reached (Max)'
+        previous_step = None
+        for x, load in enumerate(self._get_capacity_loads()):
+            for load_call in load_calls:
+                load_call['metrics'] = histogram.CallMetrics(self.histogram_precision)
+            if concurrency:
+                _, elapsed = self._drive_concurrency(load_calls, load, duration)
             else:
-                api_call['type'] = 'object_list'
+                _, elapsed = self._drive_load(load_calls, load, duration)
+
+            step = self._get_capacity_step([load_call['metrics'] for load_call in load_calls], load,
+                                           elapsed)
+            for label, group_calls in groups.items():
+                group_steps[label].append(self._get_capacity_step(
+                    [load_call['metrics'] for load_call in group_calls], load, elapsed))
+            self._logger.info('Capacity search of %s at %s: %.2f RPS, p99 %.2f ms, %.2f%% errors',
+                              ', '.join(groups), load, step['rps'], step['p99'], step['error_rate'] * 100)
+
+            step_knee = self._get_capacity_knee(step, previous_step)
+            if step_knee:
+                knee = step_knee
+                # beyond as many requests in flight as the load test has Workers, requests wait for
+                # a worker, which then limits the request rate rather than the API
+                workers = self.load_test_config.get('Workers', max(self.concurrency, 32))
+                p50 = (previous_step or step)['p50']
+                if not concurrency and load * max(p50, 0) / 1000 >= workers:
+                    self._logger.warning('The capacity of %s may be limited by the %s workers of the '
+                                         'load test; see Workers of Load_Test', ', '.join(groups), workers)
+                break
+            sustained = x
+            previous_step = step
+        return group_steps, sustained, knee
+
+    def _send_load_request(self, load_call, scheduled_time, results_lock):
+        """Send a single load test request and record its latency relative to its scheduled time."""
+        error = None
+        try:
+            session = self._get_session()
+            request = load_call['request']
+            if load_call['api_call'].get('ids'):
+                request = self._get_request(load_call['api_call'], session)[0]
+            result = session.send(request, timeout=self._get_timeout())
+            if not self._is_success(load_call['api_call'], result.status_code):
+                error = 'TIMEOUT' if result.status_code == requests.codes.gateway_timeout else 'FAILED'
+        except requests.exceptions.Timeout as e:
+            self._logger.debug('Load test request to %s timed out: %s', load_call['label'], e)
+            error = 'TIMEOUT'
+        except requests.exceptions.RequestException as e:
+            self._logger.debug('Load test request to %s failed: %s', load_call['label'], e)
+            error = 'FAILED'
+
+        latency = (time.perf_counter() - scheduled_time) * 1000
+        with results_lock:
+            if error:
+                load_call['metrics'].errors[error] += 1
+            else:
+                load_call['metrics'].client_times.record(latency)
 
-            # use a prepared request so we can save some overhead as well as get the formatted
-            # URL before sending it
-            api_endpoint = f"{self.api_base_url}{api_call['path']}"
-            api_request = requests.Request(api_call['method'], api_endpoint,
-                                           params=api_call.get('params'), data=api_call_data,
-                                           headers=self.session.headers)
-            api_prepared_request = api_request.prepare()
+    def _set_api_url(self):
+        if self.api_spec_url is None:
+            # API calls are provided by other means (e.g. by the coordinator of a distributed run),
+            # so only the base URL of the API is needed
+            if not self.api_base_url:
+                raise ValueError('Api_Base_Url must be specified when no API spec is used')
+            self.api_base_url = self.api_base_url.rstrip('/')
+            return
 
-            # set the API call metadata
+        self._logger.info(f"Loading OpenAPI schema from {self.api_spec_url}")
+        api_spec_url_parsed = urllib.parse.urlparse(self.api_spec_url)
+        is_spec_remote = api_spec_url_parsed.scheme in ('http', 'https')
+        if is_spec_remote:
+            api_spec_resp = requests.get(self.api_spec_url)
+            api_spec_resp.raise_for_status()
+            api_spec_content = api_spec_resp.content
+        else:
+            # a local file, given as a path or a file:// URL
+            api_spec_path = (urllib.parse.unquote(api_spec_url_parsed.path)
+                             if api_spec_url_parsed.scheme == 'file' else self.api_spec_url)
+            with open(api_spec_path, 'rb') as f:
+                api_spec_content = f.read()
+
+        self.api_spec_digest = hashlib.sha256(api_spec_content).hexdigest()
+        self.api_spec = json.loads(api_spec_content)
+
+        if not self.api_base_url:
+            if 'servers' in self.api_spec:
+                # OpenAPI 3.x: the (first) server URL, which may be relative to the API spec URL
+                server_url = utils.get_server_url(self.api_spec['servers'][0])
+                if is_spec_remote:
+                    server_url = urllib.parse.urljoin(self.api_spec_url, server_url)
+                if urllib.parse.urlparse(server_url).scheme in ('http', 'https'):
+                    self.api_base_url = server_url
+            elif is_spec_remote:
+                # assemble the base API URL based on parsing the original API spec URL and the
+                # basePath defined in the OpenAPI schema.
+                self.api_base_url = f"{api_spec_url_parsed.scheme}://{api_spec_url_parsed.netloc}{self.api_spec.get('basePath', '')}"
+            elif 'host' in self.api_spec:
+                scheme = self.api_spec.get('schemes', ['https'])[0]
+                self.api_base_url = f"{scheme}://{self.api_spec['host']}{self.api_spec.get('basePath', '')}"
+
+        if not self.api_base_url:
+            raise ValueError(f'Could not determine the base URL of the API from {self.api_spec_url}; '
+                             f'please specify Api_Base_Url')
+
+        self.api_base_url = self.api_base_url.rstrip('/')
+        self._logger.info('Using base URL: %s', self.api_base_url)
 
-            # determine the API call path and parameter string (URL minus the protocol, domain name,
-            # and port)
-            api_call_parsed = urllib.parse.urlparse(api_prepared_request.url)
-            api_call_path_and_params = f'{api_call_parsed.path}'
-            if api_call_parsed.query:
-                api_call_path_and_params += f'?{api_call_parsed.query}'
-            api_call_label = f"{api_call['method']} {api_call_path_and_params}"
-            api_call_description = api_call.get('description', '')
+    def _should_process_path(self, path):
+        if path in self.path_blacklist:
+            self._logger.warning('%s is in blacklist', path)
+            return False
+        else:
+            if not self.path_whitelist:
+                return True
 
-            if api_call_path_and_params in self.avg_threshold_exceptions:
-                api_call_description += '\n' if api_call_description else ''
-                api_call_description += f'Threshold: {self.avg_threshold_exceptions[api_call_path_and_params]}'
+            for whitelist_path in self.path_whitelist:
+                if path.startswith(whitelist_path):
+                    return True
+            self._logger.debug('%s is not in specified whitelist', path)
+            return False
 
-            self._logger.debug('Processing calls to %s', api_call_label)
+    def _should_validate(self, metrics):
+        """Determine whether a response of an API call is to be validated: the first response of each
+        API call is, then a sample of them (Sample_Rate of Response_Validation)."""
+        if self.response_validation is None:
+            return False
+        return not metrics.num_validated or \
+            self._validation_random.random() < self.response_validation.get('Sample_Rate', 0.1)
+
+    def _start_live_monitor(self, num_api_calls=None, duration=None):
+        """Start reporting progress and metrics while API calls are being made, if enabled.
+
+        See perf.live; the monitor is to be stopped with _stop_live_monitor().
+        """
+        if self.dry_run or not (self.live_progress or self.metrics_address):
+            return
+        self._live_monitor = live.LiveMonitor(
+            self.call_metrics, num_api_calls=num_api_calls, duration=duration,
+            interval=self.live_monitor_config.get('Interval', 1.0), progress=self.live_progress,
+            address=distributed.parse_address(self.metrics_address) if self.metrics_address else None)
+        self._live_monitor.start()
+        if self.metrics_address:
+            self._logger.info('Serving metrics at http://%s/metrics', self.metrics_address)
+
+    def _stop_live_monitor(self):
+        if self._live_monitor:
+            self._live_monitor.stop()
+            self._live_monitor = None
+
+    def _submit_api_call(self, executor, api_call):
+        if (self.harness_profiling or {}).get('Output'):
+            future = executor.submit(self._run_profiled, self._run_api_call, api_call)
+        else:
+            future = executor.submit(self._run_api_call, api_call)
+        if self._live_monitor:
+            future.add_done_callback(self._live_monitor.api_call_done)
+        return future
+
+    def _write_call_plan(self, api_calls):
+        """Record API calls, as made, to the call plan file; see _read_call_plan().
+
+        The `ids` recorded for an API call on a path template are those of its requests, in order,
+        rather than its ID pool, so that replaying the call plan makes the same requests.
+        """
+        if self.dry_run:
+            self._logger.warning('Not recording the call plan of a dry run')
+            return
+
+        num_api_calls = 0
+        with open(self.record_plan_file, 'w') as f:
+            for api_call in api_calls:
+                # API calls on path templates for which no ID was pooled were not made
+                if '{' in api_call['path'] and not api_call.get('ids'):
+                    continue
+                entry = {key: api_call[key] for key in ['method', 'path', 'params', 'data', 'description']
+                         if key in api_call}
+                if api_call.get('ids'):
+                    entry['ids'] = api_call.get('ids_used') or api_call['ids']
+                f.write(json.dumps(entry) + '\n')
+                num_api_calls += 1
+        self._logger.info('Recorded %s API call(s) to %s', num_api_calls, self.record_plan_file)
+
+    def add_checkstyle_error(self, error):
+        """Add a checkstyle error to the given element."""
+        cElementTree.SubElement(self.check_file, "error", line=str(self.check_file_line),
+                                severity="error",
+                                message=error)
+
+    def analyze_results(self):
+        """Add a checkstyle error for every result which is not OK, and write the checkstyle log.
+
+        When streaming, the errors of each result are written to the log as they are found rather than
+        kept in the checkstyle tree until the end.
+        """
+        status_index = self.table.field_names.index('Status')
+        api_call_index = self.table.field_names.index('API Call')
+        checkstyle_log_file = os.path.join(self.script_dir, '../checkstyle-api-perf.log')
+        if self.streaming is not None:
+            checkstyle_log = open(checkstyle_log_file, 'w')
+            checkstyle_log.write('<checkstyle version=%s><file name=%s>' % (
+                saxutils.quoteattr(self.checkstyle.get('version')),
+                saxutils.quoteattr(self.check_file_path)))
+
+        for result, metrics in self._get_results():
+            self.check_file_line += 1
+            if result[status_index] != 'OK':
+                self.add_checkstyle_error(f'{result[api_call_index]} is {result[status_index]}')
+            if result[api_call_index] in self.regressions:
+                self.add_checkstyle_error(self.regressions[result[api_call_index]])
+
+            if metrics and metrics.num_invalid:
+                self.add_checkstyle_error(
+                    f'{result[api_call_index]} returned {metrics.num_invalid} of {metrics.num_validated} '
+                    f'validated responses not matching the API spec: '
+                    f"{'; '.join(metrics.validation_errors)}")
+            if metrics and metrics.num_item_failures:
+                self.add_checkstyle_error(f'{result[api_call_index]} returned {metrics.num_item_failures} '
+                                          f'failed items in multi-status responses')
+
+            if self.streaming is not None:
+                for error in list(self.check_file):
+                    checkstyle_log.write(cElementTree.tostring(error, encoding='unicode'))
+                    self.check_file.remove(error)
+
+        if self.streaming is not None:
+            checkstyle_log.write('</file></checkstyle>')
+            checkstyle_log.close()
+        else:
+            self.checkfile_tree.write(checkstyle_log_file)
+
+    def build_api_calls(self):
+        """Build the stream of API calls to be made.
 
-            # compile the results table with dummy data so we can see the table output / make sure
-            # the appropriate calls are represented
+        API calls are generated lazily as they are consumed by run(); see _generate_api_calls(), or
+        _read_call_plan() when replaying a call plan.
+        """
+        if self.replay_file:
+            self.api_calls = self._read_call_plan(self.replay_file)
+        else:
+            self.api_calls = self._generate_api_calls()
+
+    def compare_baseline(self, baseline_run_id=None):
+        """Flag API calls whose response times are significantly worse than in a baseline run.
+
+        The baseline is the given run of the results store or, by default, the latest stored run
+        against the same API in the same mode. Response time distributions are compared with a
+        one-sided Mann-Whitney U test; an API call regressed if the test is significant at the
+        Regression_Significance level and its median response time grew by at least
+        Regression_Min_Change (a fraction of the baseline median). Regressions are reported by
+        analyze_results().
+        """
+        results_store = self._get_results_store()
+        if baseline_run_id:
+            baseline_run = results_store.get_run(baseline_run_id)
+        else:
+            baseline_run = results_store.get_latest_run(self.api_base_url, self.mode)
+
+        if not baseline_run:
+            self._logger.warning('No baseline run found in %s', self.results_store_file)
+            return
+
+        self._logger.info('Comparing results with baseline run %s (%s)', baseline_run['id'],
+                          baseline_run['started_at'])
+        baseline_results = results_store.get_results(baseline_run['id'])
+
+        api_call_index = self.table.field_names.index('API Call')
+        for result, metrics in self._get_results():
+            api_call_label = result[api_call_index]
+            if metrics is None or api_call_label not in baseline_results:
+                continue
+
+            baseline_times = self._get_latency_histogram(baseline_results[api_call_label]['metrics'])
+            times = self._get_latency_histogram(metrics)
+            if not baseline_times.count or not times.count:
+                continue
+
+            _, p_value = stats.mann_whitney_u(baseline_times.get_buckets(), times.get_buckets())
+            baseline_median = baseline_times.percentile(50)
+            median = times.percentile(50)
+            change = (median - baseline_median) / baseline_median if baseline_median else 0
+
+            if p_value < self.regression_significance and change >= self.regression_min_change:
+                self.regressions[api_call_label] = (
+                    f'{api_call_label} regressed from {baseline_median:.2f} ms to {median:.2f} ms '
+                    f'(median) since run {baseline_run["id"]} (p={p_value:.4f})')
+                self._logger.warning(self.regressions[api_call_label])
+
+        self.summary_table.add_row(['Baseline run', f"{baseline_run['id']} ({baseline_run['started_at']})"])
+        self.summary_table.add_row(['Regressions vs. baseline', len(self.regressions)])
+
+    def init_summary_table(self):
+        self.summary_table.add_row(['API URL', self.api_base_url])
+        if self.replay_file:
+            self.summary_table.add_row(['Replayed call plan', self.replay_file])
+        if self.adaptive_sampling is None:
+            self.summary_table.add_row(['Number of requests per API call', self.num_passes])
+        else:
+            self.summary_table.add_row(['Number of requests per API call', 'adaptive (%s - %s)' % (
+                self.adaptive_sampling.get('Min_Passes', 5),
+                self.adaptive_sampling.get('Max_Passes', 100))])
+        self.summary_table.add_row(['Warm-up requests per API call', self.warm_up_passes])
+        self.summary_table.add_row(['Concurrent API calls', self.concurrency])
+        if self.num_workers:
+            self.summary_table.add_row(['Distributed workers', self.num_workers])
+        elif self.num_processes > 1:
+            self.summary_table.add_row(['Client processes', self.num_processes])
+        if self.parameter_coverage is not None:
+            self.summary_table.add_row(['Query parameter coverage',
+                                        f"{self.parameter_coverage.get('Strength', 2)}-wise"])
+        self.summary_table.add_row(['Skipped API endpoints', '\n'.join(self.path_blacklist)])
+
+    def print_results_table(self):
+        """Output the results of the performance test."""
+        print(self.summary_table)
+        for line in self._get_results_table_lines():
+            print(line)
+
+    def run(self):
+        self._init_run()
+
+        indexed_api_calls = enumerate(self.api_calls)
+        if (self.record_plan_file or self.live_progress) and self.streaming is None:
+            # API calls are resolved (e.g. their IDs) in place as they are made; progress is reported
+            # against the number of API calls
+            indexed_api_calls = list(indexed_api_calls)
+
+        if (self.num_workers or self.num_processes > 1) and not self.dry_run:
+            indexed_api_calls = list(indexed_api_calls)
+            indexed_result_rows = self._run_distributed_api_calls(indexed_api_calls)
+        else:
+            self._start_live_monitor(
+                len(indexed_api_calls) if isinstance(indexed_api_calls, list) else None)
+            try:
+                # when streaming, API calls are taken from the stream of API calls as they are made,
+                # and their results are added as they come
+                indexed_result_rows = self._run_api_calls(
+                    indexed_api_calls, self._add_result if self.streaming is not None else None)
+            finally:
+                self._stop_live_monitor()
+
+        api_calls = dict(indexed_api_calls) if isinstance(indexed_api_calls, list) else {}
+        for x, result_row in indexed_result_rows:
+            self._add_result(result_row, api_calls.get(x))
+
+        if self.harness_profiling is not None:
+            self._report_harness_overhead()
+
+        if self.record_plan_file:
+            if isinstance(self.results, stream.ResultStream):
+                self._write_call_plan(record.api_call for record in self.results.records()
+                                      if record.api_call)
+            else:
+                self._write_call_plan(api_call for _, api_call in indexed_api_calls)
+
+        self._close_results()
+
+    def run_capacity_search(self):
+        """Find the maximum request rate which each endpoint (or the load test mix) sustains.
+
+        The load on the API calls of each endpoint (see Mix of Load_Test) is stepped up, by request
+        rate (open-loop, as in run_load_test()) or by number of concurrent clients (closed-loop, see
+        Load), until a step no longer sustains it (see _search_capacity()). The max sustainable RPS of
+        an endpoint is the throughput of its last step which did; its response times at that step
+        are its metrics. Unless Per_Endpoint is false, endpoints are searched one after the other on
+        their own, otherwise together as the mix, whose share of each endpoint is also reported.
+        """
+        concurrency = self.capacity_search.get('Load', 'rate') == 'concurrency'
+        load_field = 'Concurrency' if concurrency else 'Target RPS'
+        self._init_results_table(['API Call', 'Description', 'Status', 'Max Sustainable RPS', load_field,
+                                  'p50 (ms)', 'p99 (ms)', 'Errors (%)', 'Steps', 'Knee'])
+        self.mode = 'capacity'
+
+        loads = list(self._get_capacity_loads())
+        qualifier = 'would' if self.dry_run else 'will'
+        self._logger.info('The %s of API calls %s be stepped through %s for %s second(s) each',
+                          'concurrency' if concurrency else 'request rate', qualifier,
+                          ', '.join(str(load) for load in loads),
+                          self.capacity_search.get('Step_Duration', 10))
+        self.summary_table.add_row(['Capacity search load', '%s: %s' % (
+            'concurrent clients' if concurrency else 'requests/second',
+            ', '.join(str(load) for load in loads))])
+        self.summary_table.add_row(['Capacity search limits', 'p99 <= %s ms, errors <= %.2f%%' % (
+            self.capacity_search.get('Max_P99', 1000), self.capacity_search.get('Max_Error_Rate', 0) * 100)])
+        if self.num_workers or self.num_processes > 1:
+            self._logger.warning('The capacity search is not distributed; the API calls are made by this '
+                                 'process only')
+
+        self.api_calls = list(self.api_calls)
+        # the metrics reported are those of the groups of API calls, at their last sustained step
+        load_calls = self._prepare_load_calls(register_metrics=False)
+        if not load_calls:
+            self._logger.error('No API calls to make; check the configured load test mix')
+            return
+
+        # API calls are grouped by endpoint, i.e. by method and path template
+        endpoints = collections.OrderedDict()
+        for load_call in load_calls:
+            endpoints.setdefault(f"{load_call['api_call']['method']} {load_call['api_call']['path']}",
+                                 []).append(load_call)
+
+        if self.capacity_search.get('Per_Endpoint', True):
+            searches = [(endpoint_calls, {label: endpoint_calls})
+                        for label, endpoint_calls in endpoints.items()]
+        else:
+            groups = collections.OrderedDict([('Mix', load_calls)])
+            groups.update(endpoints)
+            searches = [(load_calls, groups)]
+
+        for search_calls, groups in searches:
             if self.dry_run:
+                for label, group_calls in groups.items():
+                    self._add_result([label, f'{len(group_calls)} API call(s)', 'DRY RUN'] + ['N/A'] * 7)
+                continue
+
+            group_steps, sustained, knee = self._search_capacity(search_calls, groups)
+            for label, steps in group_steps.items():
+                step = steps[sustained if sustained is not None else 0]
+                self.call_metrics[label] = step['metrics']
+                self.capacity_curves[label] = {
+                    'sustained': sustained,
+                    'knee': knee,
+                    'steps': [[step['load'], round(step['rps'], 2), round(step['p50'], 2),
+                               round(step['p99'], 2), round(step['error_rate'] * 100, 2)] for step in steps]
+                }
+                max_rps = step['rps'] if sustained is not None else 0
+                self.summary_table.add_row([f'Max sustainable RPS ({label})', '%.2f' % max_rps])
 
                 result_row = [
-                    api_call_label,
-                    api_call_description,
-                    api_call_object_count,
-                    'DRY RUN',
-                    'N/A',
-                    'N/A',
-                    'N/A'
+                    label,
+                    f'{len(groups[label])} API call(s)',
+                    'OK' if sustained is not None else 'FAILED',
+                    '%.2f' % max_rps,
+                    step['load'] if sustained is not None else 'N/A',
+                    '%.2f' % step['p50'],
+                    '%.2f' % step['p99'],
+                    '%.2f' % (step['error_rate'] * 100),
+                    len(steps),
+                    knee
                 ]
-                self.results.append(result_row)
-                self.table.add_row(result_row)
+                self._add_result(result_row)
+                self._logger.debug(result_row)
+
+        # the IDs of the requests are only known once they have been made
+        if self.record_plan_file:
+            self._write_call_plan(load_call['api_call'] for load_call in load_calls)
+
+        self._close_results()
+
+    def run_job(self, job):
+        """Execute a job of a distributed run, as sent by its coordinator; returns the response.
+
+        See perf.distributed.
+        """
+        for name, value in job['settings'].items():
+            setattr(self, name, value)
+        self.indexable_paths = dict(job['indexable_paths'])
+        self.id_pools = dict(job['id_pools'])
+
+        if job['mode'] == 'load_test':
+            self.api_calls = job['api_calls']
+            load_calls = self._prepare_load_calls()
+            num_requests, elapsed = self._drive_load(load_calls) if load_calls else (0, 0.0)
+            return {
+                'num_requests': num_requests,
+                'elapsed': elapsed,
+                'call_metrics': {label: metrics.to_dict()
+                                 for label, metrics in self.call_metrics.items()},
+                'ids_used': {load_call['label']: load_call['api_call'].get('ids_used', [])
+                             for load_call in load_calls}
+            }
+
+        self._init_run()
+        return {
+            'results': self._run_api_calls(job['api_calls']),
+            'api_calls': job['api_calls'],
+            'call_metrics': {label: metrics.to_dict()
+                             for label, metrics in self.call_metrics.items()},
+            'cold_call_metrics': {label: metrics.to_dict()
+                                  for label, metrics in self.cold_call_metrics.items()}
+        }
+
+    def run_load_test(self):
+        """Drive a weighted mix of the built API calls at a target request rate for a fixed duration.
+
+        Requests are issued open-loop: each one is scheduled at a fixed point in time regardless of
+        whether earlier requests have completed, and its latency is measured from that scheduled
+        time. A slow response therefore cannot delay (and hide) the requests queued behind it.
+        """
+        target_rps = self.load_test_config.get('Target_RPS', 10)
+        duration = self.load_test_config.get('Duration', 60)
+
+        self._init_results_table(['API Call', 'Description', 'Requests', 'Status', 'RPS',
+                                  'Avg (ms)', 'p50 (ms)', 'p90 (ms)', 'p99 (ms)', 'p99.9 (ms)',
+                                  'Errors (%)'])
+
+        qualifier = 'would' if self.dry_run else 'will'
+        self._logger.info('API calls %s be made at %s requests/second for %s second(s)',
+                          qualifier, target_rps, duration)
+
+        self.mode = 'load_test'
+
+        # the whole mix of API calls is needed up front
+        self.api_calls = list(self.api_calls)
+
+        load_calls = self._prepare_load_calls()
+        if not load_calls:
+            self._logger.error('No API calls to make; check the configured load test mix')
+            return
+
+        if self.dry_run:
+            for load_call in load_calls:
+                result_row = [load_call['label'], load_call['description'], 0, 'DRY RUN'] + ['N/A'] * 7
+                self._add_result(result_row)
+            self._close_results()
+            return
+
+        if self.num_workers or self.num_processes > 1:
+            num_shards = self._get_num_shards()
+            # every worker drives its share of the target request rate
+            seed = self.load_test_config.get('Seed')
+            jobs = [{'api_calls': self.api_calls,
+                     'settings': {'load_test_config': dict(
+                         self.load_test_config, Target_RPS=target_rps / num_shards,
+                         Seed=None if seed is None else seed + x)}}
+                    for x in range(num_shards)]
+            responses = self._distribute('load_test', jobs)
+            num_requests = sum(response['num_requests'] for response in responses)
+            elapsed = max(response['elapsed'] for response in responses)
+            # the IDs of the requests on path templates are drawn by the workers
+            load_calls_by_label = {load_call['label']: load_call for load_call in load_calls}
+            for response in responses:
+                self._merge_call_metrics(self.call_metrics, response['call_metrics'])
+                for label, ids_used in response['ids_used'].items():
+                    if ids_used and label in load_calls_by_label:
+                        load_calls_by_label[label]['api_call'].setdefault('ids_used', []).extend(ids_used)
+        else:
+            self._start_live_monitor(duration=duration)
+            try:
+                num_requests, elapsed = self._drive_load(load_calls)
+            finally:
+                self._stop_live_monitor()
+
+        # the IDs of the requests are only known once they have been made
+        if self.record_plan_file:
+            self._write_call_plan(load_call['api_call'] for load_call in load_calls)
+
+        self.summary_table.add_row(['Load test target RPS', target_rps])
+        self.summary_table.add_row(['Load test achieved RPS', '%.2f' % (num_requests / elapsed)])
+        self.summary_table.add_row(['Load test duration (s)', '%.2f' % elapsed])
+
+        for load_call in load_calls:
+            latencies = load_call['metrics'].client_times
+            num_errors = sum(load_call['metrics'].errors.values())
+            num_sent = latencies.count + num_errors
+            if not num_sent:
+                continue
+            error_rate = num_errors / num_sent
 
-            # iterative execution of the API call
+            if latencies.count:
+                avg_time = latencies.mean()
+                percentiles = [latencies.percentile(percentile) for percentile in [50, 90, 99, 99.9]]
             else:
+                avg_time = -1
+                percentiles = [-1] * 4
 
-                result_times = []
-
-                for x in range(0, self.num_passes):
-                    result = self.session.send(api_prepared_request)
-
-                    # if auth fails for some reason, log a warning
-                    if result.status_code == requests.codes.unauthorized:
-                        self._logger.warning('Got Unauthorized response for: %s',
-                                             api_prepared_request.url)
-
-                    # TODO: update this logic to leverage the acceptable responses defined by the
-                    # OpenAPI schema!
-                    if result.status_code in [requests.codes.ok,
-                                              requests.codes.created,
-                                              requests.codes.multi_status]:
-
-                        # TODO: process multi_status in distinct fashion and look for one or more
-                        # failures...
-                        data = result.json()
-
-                        if (x == 0 and api_call['method'] == 'GET' and
-                                api_call['path'] in self.indexable_paths):
-                            result = data.get('result')
-                            if result and isinstance(result, list) and data['count'] > 0:
-                                object_uuid = data['result'][0]['uuid']
-                                single_object_path = api_call['path'] + '/{uuid}'
-                                self.single_object_index[single_object_path] = object_uuid
-                                self._logger.debug('Cached UUID for %s: %s',
-                                                   single_object_path, object_uuid)
-
-                    elif result.status_code in [requests.codes.no_content]:
-                        milliseconds = result.elapsed.total_seconds() * 1000
-                        data = {
-                            'count': 1,
-                            'result': {},
-                            'time': f'{milliseconds}mS'
-                        }
-
-                    # the webserver timed out, so we must process a synthetic / assumed result.
-                    elif result.status_code == requests.codes.gateway_timeout:
-                        data = {
-                            'count': -1,
-                            'result': 'TIMEOUT',
-                            'time': '-1mS'
-                        }
-                    else:
-                        self._logger.error('API call failed: %s %s: %s',
-                                           api_call['method'], result.url, result.text)
-                        data = {
-                            'count': -1,
-                            'result': 'FAILED',
-                            'time': '-1mS'
-                        }
-
-                    # set the API call metadata by looking at the first response
-                    if x == 0:
-                        api_call_object_count = data.get('count', 1 if data else 0)
-
-                    if 'time' in data:
-                        api_call_response_time = float(data['time'].replace('mS', ''))
-                    else:  # support "non-conforming" response structures
-                        api_call_response_time = result.elapsed.total_seconds() * 1000
-
-                    response_result = data.get('result', None)
-                    if response_result == 'FAILED':
-                        result_times.append('FAILED')
-                    elif response_result == 'TIMEOUT':
-                        result_times.append('TIMEOUT')
-                    else:
-                        result_times.append(api_call_response_time)
-
-                if 'FAILED' in result_times:
-                    status = 'FAILED'
-                    avg_time = max_time = min_time = -1
-                elif 'TIMEOUT' in result_times:
-                    status = 'TIMEOUT'
-                    avg_time = max_time = min_time = -1
-                else:
-                    avg_time = numpy.mean(result_times)
-                    max_time = numpy.max(result_times)
-                    min_time = numpy.min(result_times)
-
-                    if ((api_prepared_request.url in self.avg_threshold_exceptions and
-                         avg_time <=
-                            self.avg_threshold_exceptions[api_prepared_request.url]) or
-                        (api_call['type'] == 'object_list' and
-                         avg_time <= self.avg_threshold_for_list) or
-                        (api_call['type'] == 'single_object' and
-                         avg_time <= self.avg_threshold_for_object)):
-                        status = 'OK'
+            if error_rate > self.load_test_config.get('Max_Error_Rate', 0):
+                status = 'FAILED'
+            else:
+                status = self._get_latency_status(load_call['api_call'], load_call['request'].url,
+                                                  avg_time)
+
+            result_row = [
+                load_call['label'],
+                load_call['description'],
+                num_sent,
+                status,
+                "%.2f" % (num_sent / elapsed),
+                "%.2f" % avg_time
+            ] + ["%.2f" % percentile for percentile in percentiles] + ["%.2f" % (error_rate * 100)]
+            self._add_result(result_row)
+            self._logger.debug(result_row)
+
+        self._close_results()
+
+    def run_payload_comparison(self):
+        """Compare the response sizes and times of each endpoint across content encodings and page sizes.
+
+        The first GET API call of each endpoint is made Passes (by default, Number_Of_Passes) times with
+        each of the Encodings of Payload_Comparison as its Accept-Encoding and, for listing endpoints,
+        with each of the Page_Sizes as the value of the Page_Size_Param query parameter (see
+        _compare_payloads()). Encodings which the HTTP client cannot decode (e.g. br without the
+        brotli package) are skipped. Endpoints are compared concurrently (see Concurrency), in a run of
+        its own ('payload' mode).
+        """
+        self._init_results_table(['API Call', 'Description', 'Encoding', 'Page Size', 'Objects',
+                                  'Status', 'Avg (ms)', 'Client Avg (ms)'] +
+                                 self.response_size_fields + ['Compression', 'Cheapest'])
+        self.mode = 'payload'
+
+        encodings = []
+        for encoding in self.payload_comparison_config.get('Encodings', ['identity', 'gzip', 'br']):
+            if encoding == 'identity' or encoding in urllib3.util.request.ACCEPT_ENCODING.split(','):
+                encodings.append(encoding)
+            else:
+                self._logger.warning('Responses encoded with %s cannot be decoded; skipping it',
+                                     encoding)
+        page_size_param = self.payload_comparison_config.get('Page_Size_Param')
+        page_sizes = self.payload_comparison_config.get('Page_Sizes', []) if page_size_param else []
+
+        # one API call per endpoint; parameter combinations are irrelevant to the size of a page
+        self.api_calls = list(self.api_calls)
+        endpoint_calls = collections.OrderedDict()
+        for api_call in self.api_calls:
+            if api_call['method'] == 'GET':
+                endpoint_calls.setdefault(api_call['path'], api_call)
+
+        qualifier = 'would' if self.dry_run else 'will'
+        self._logger.info('Responses of %s endpoint(s) %s be compared with encodings %s and page '
+                          'sizes %s', len(endpoint_calls), qualifier, ', '.join(encodings),
+                          ', '.join(str(page_size) for page_size in page_sizes) or 'default')
+        self.summary_table.add_row(['Payload comparison encodings', ', '.join(encodings)])
+        if page_sizes:
+            self.summary_table.add_row(['Payload comparison page sizes',
+                                        ', '.join(str(page_size) for page_size in page_sizes)])
+
+        if not self.dry_run:
+            self._prime_id_pools()
+
+        def compare_payloads(api_call):
+            # only listing calls are paginated, provided the API spec (if any) documents the parameter
+            paginated = not api_call['path'].endswith('}')
+            if paginated and self.api_spec:
+                methods = self.api_spec['paths'].get(api_call['path'], {})
+                paginated = any(
+                    utils.resolve_ref(self.api_spec, param).get('name') == page_size_param
+                    for param in itertools.chain(methods.get('parameters', []),
+                                                 methods.get('get', {}).get('parameters', [])))
+            variants = [(encoding, page_size)
+                        for page_size in [None] + (page_sizes if paginated else [])
+                        for encoding in encodings]
+            return self._compare_payloads(dict(api_call), variants)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for result_rows in executor.map(compare_payloads, endpoint_calls.values()):
+                for result_row in result_rows:
+                    self._add_result(result_row)
+                    self._logger.debug(result_row)
+
+        self._close_results()
+
+    def run_write_test(self):
+        """Benchmark the write operations (POST, PUT, PATCH and DELETE) of the resources of the API spec.
+
+        See _generate_write_resources() and _run_write_resource(); resources are benchmarked
+        concurrently (see Concurrency). The results table reports the throughput and response time
+        percentiles of each operation, in a run of its own ('write' mode), so that they are never
+        mixed with (nor compared with) the results of the read path.
+        """
+        self._init_results_table(['API Call', 'Description', 'Requests', 'Status',
+                                  'Throughput (req/s)', 'Avg (ms)', 'p50 (ms)', 'p90 (ms)', 'p99 (ms)',
+                                  'Errors (%)'])
+        self.mode = 'write'
+
+        if not self.api_spec:
+            self._logger.error('Write operations can only be benchmarked from the API spec')
+            return
+
+        resources = self._generate_write_resources()
+        num_fixtures = self.write_test_config.get('Fixtures', self.num_passes)
+        qualifier = 'would' if self.dry_run else 'will'
+        self._logger.info('Write operations of %s resource(s) %s be benchmarked with %s fixture(s) '
+                          'each', len(resources), qualifier, num_fixtures)
+        self.summary_table.add_row(['Write test fixtures per resource', num_fixtures])
+
+        # the objects of nested resources (e.g. /v1/widgets/{uuid}/parts) are created within
+        # existing objects
+        if not self.dry_run:
+            self.api_calls = list(self.api_calls)
+            self._prime_id_pools()
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for operations in executor.map(self._run_write_resource, resources):
+                for api_call, api_call_label, api_call_description, metrics, elapsed in operations:
+                    if metrics is None:
+                        result_row = [api_call_label, api_call_description, 0, 'DRY RUN'] + ['N/A'] * 6
+                        self._add_result(result_row)
+                        continue
+
+                    latencies = self._get_latency_histogram(metrics)
+                    num_errors = sum(metrics.errors.values())
+                    num_sent = latencies.count + num_errors
+                    if not num_sent:
+                        continue
+
+                    if latencies.count:
+                        avg_time = latencies.mean()
+                        percentiles = [latencies.percentile(percentile) for percentile in [50, 90, 99]]
                     else:
-                        status = 'SLOW'
+                        avg_time = -1
+                        percentiles = [-1] * 3
 
-                result_row = [
-                    api_call_label,
-                    api_call_description,
-                    api_call_object_count,
-                    status,
-                    "%.2f" % avg_time,
-                    "%.2f" % max_time,
-                    "%.2f" % min_time
-                ]
-                self.results.append(result_row)
-                self.table.add_row(result_row)
-                self._logger.debug(result_row)
+                    if metrics.errors['FAILED']:
+                        status = 'FAILED'
+                    elif metrics.errors['TIMEOUT']:
+                        status = 'TIMEOUT'
+                    else:
+                        status = self._get_latency_status(api_call, api_call_label.split(' ', 1)[1],
+                                                          avg_time)
+
+                    result_row = [
+                        api_call_label,
+                        api_call_description,
+                        num_sent,
+                        status,
+                        "%.2f" % (num_sent / elapsed),
+                        "%.2f" % avg_time
+                    ] + ["%.2f" % percentile for percentile in percentiles] + [
+                        "%.2f" % (num_errors / num_sent * 100)]
+                    self._add_result(result_row)
+                    self._logger.debug(result_row)
+
+        self._close_results()
 
     def set_debug(self):
         self._logger.info('Setting debug level logging')
@@ -473,6 +2571,33 @@ class ApiPerformance(object):
         for handler in self._logger.handlers:
             handler.setLevel(logging.DEBUG)
 
+    def store_results(self):
+        """Append the results of this run to the results store."""
+        results_store = self._get_results_store()
+        run_id = results_store.add_run(self.started_at, self.api_base_url, self.mode,
+                                       git_commit=utils.get_git_commit(),
+                                       build_tag=os.environ.get('BUILD_TAG'),
+                                       metadata={'num_passes': self.num_passes,
+                                                 'concurrency': self.concurrency,
+                                                 'load_test': self.load_test_config,
+                                                 'capacity_search': self.capacity_search})
+
+        field_names = self.table.field_names
+        api_call_index = field_names.index('API Call')
+        description_index = field_names.index('Description')
+        status_index = field_names.index('Status')
+        object_count_index = field_names.index('Objects') if 'Objects' in field_names else None
+
+        results_store.add_results(run_id, (
+            (result[api_call_index],
+             result[description_index],
+             result[object_count_index] if object_count_index is not None else None,
+             result[status_index],
+             metrics)
+            for result, metrics in self._get_results() if metrics))
+        self.run_id = run_id
+        self._logger.info('Stored results as run %s in %s', run_id, self.results_store_file)
+
     def write_results_table(self):
         self.summary_table.add_row(['SLOW threshold (object list)',
                                     self.avg_threshold_for_list])
@@ -484,35 +2609,23 @@ class ApiPerformance(object):
             if not os.path.exists(directory):
                 os.makedirs(directory)
 
-        html_header = """
-<!DOCTYPE html>
-<html>
-    <head>
-        <title>API Performance Test Results</title>
-        <style>
-            body {font-family: monospace;
-                  font-size: 11pt;}
-            table tr:hover {background: blue;
-                            color: white;}
-        </style>
-    </head>
-    <body>
-    <div>API Performance Test Results</div>
-"""
-
-        html_footer = """
-    </body>
-</html>
-"""
-
         # write checkstyle (XML) formatted output
         with open(self.checkstyle_output_file, 'w') as text_file:
-            text_file.write(str(self.table))
-
-        # write HTML formatted output
-        with open(self.html_output_file, 'w') as html_file:
-            html_file.write(html_header)
-            html_file.write(self.summary_table.get_html_string())
-            html_file.write('<br />\n')
-            html_file.write(self.table.get_html_string())
-            html_file.write(html_footer)
+            for x, line in enumerate(self._get_results_table_lines()):
+                text_file.write(('\n' if x else '') + line)
+
+        # write the HTML report; when streaming, the metrics of the API calls are read back along with
+        # their results
+        call_metrics = self.call_metrics
+        if isinstance(self.results, stream.ResultStream):
+            api_call_index = self.table.field_names.index('API Call')
+            call_metrics = ((result[api_call_index], metrics)
+                            for result, metrics in self._get_results() if metrics)
+        capacity = None
+        if self.capacity_curves:
+            concurrency = self.capacity_search.get('Load', 'rate') == 'concurrency'
+            capacity = {'load': 'Concurrency' if concurrency else 'Target RPS',
+                        'curves': self.capacity_curves}
+        report.write_report(self.html_output_file, 'API Performance Test Results',
+                            self.summary_table.rows, self.table.field_names, self.results,
+                            call_metrics, self._get_report_history(), capacity)
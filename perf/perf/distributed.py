@@ -0,0 +1,130 @@
+"""Distribution of API calls across worker processes, which may run on other hosts.
+
+The coordinator (an ApiPerformance instance with a number of workers configured) listens on an
+address which every worker connects to. It sends each worker a job - e.g. a share of the API calls, or
+a share of the target request rate of a load test - and waits for their responses, which carry the
+result rows and the serialized latency histograms (see histogram.CallMetrics) of the API calls made
+by the worker. Connections are authenticated with a shared key, which must be configured for workers
+on other hosts; workers started by the coordinator itself share a random key of their own by default.
+
+The same jobs are executed by the client processes of a local run spread across processes, see
+execute_job().
+"""
+from multiprocessing import connection
+
+import collections
+import multiprocessing
+import secrets
+import traceback
+
+# attributes of the coordinator which are copied to the ApiPerformance instance of every worker, as
+# they may have been overridden after the coordinator was created (e.g. from command line arguments)
+WORKER_SETTINGS = [
+    'adaptive_sampling',
+    'cold_cache',
+    'concurrency',
+    'dry_run',
+    'harness_profiling',
+    'load_test_config',
+    'num_passes',
+    'payload_profiling',
+    'record_plan_file',
+    'replay_file',
+    'response_validation',
+    'transport_timing',
+    'warm_up_passes'
+]
+
+
+def distribute(jobs, address, auth_key, num_local_workers=0, script_dir=None):
+    """Send each job to a worker and return their responses, in job order.
+
+    Waits for as many workers to connect to `address` as there are jobs, `num_local_workers` of which
+    are started here as child processes. Workers on other hosts require `auth_key`; when every worker
+    is local, a random key is used unless one is given.
+    """
+    if not auth_key:
+        if num_local_workers < len(jobs):
+            raise ValueError('Auth_Key must be set in the Distributed section of the config file for '
+                             'workers on other hosts to connect')
+        auth_key = secrets.token_bytes(32)
+
+    with connection.Listener(address, authkey=auth_key) as listener:
+        processes = [multiprocessing.Process(target=run_worker,
+                                             args=(listener.address, auth_key, script_dir),
+                                             daemon=True)
+                     for _ in range(num_local_workers)]
+        for process in processes:
+            process.start()
+
+        connections = [listener.accept() for _ in jobs]
+        try:
+            for worker_connection, job in zip(connections, jobs):
+                worker_connection.send(job)
+            responses = [worker_connection.recv() for worker_connection in connections]
+        finally:
+            for worker_connection in connections:
+                worker_connection.close()
+            for process in processes:
+                process.join()
+
+    for x, response in enumerate(responses):
+        if 'error' in response:
+            raise RuntimeError(f'Worker {x} failed:\n{response["error"]}')
+    return responses
+
+
+def execute_job(job, script_dir=None):
+    """Execute a job sent by the coordinator; returns the response to be sent back."""
+    import perf
+
+    try:
+        api_perf_tester = perf.ApiPerformance(script_dir, None, job['config'],
+                                              api_base_url=job['api_base_url'])
+        return api_perf_tester.run_job(job)
+    except Exception:
+        return {'error': traceback.format_exc()}
+
+
+def get_shards(indexed_api_calls, num_shards):
+    """Split API calls, given as (index, API call) tuples, into shards of similar size.
+
+    API calls on path templates (e.g. `/v1/widgets/{uuid}`) are kept together with the "listing" API
+    calls on the path their template starts with, which fill the ID pools of the templates.
+    """
+    indexed_api_calls = list(indexed_api_calls)
+    listing_paths = {api_call['path'][:api_call['path'].index('/{')]
+                     for _, api_call in indexed_api_calls if '/{' in api_call['path']}
+
+    groups = collections.OrderedDict()
+    for indexed_api_call in indexed_api_calls:
+        x, api_call = indexed_api_call
+        path = api_call['path']
+        if '/{' in path:
+            group = path[:path.index('/{')]
+        elif path in listing_paths:
+            group = path
+        else:
+            group = x
+        groups.setdefault(group, []).append(indexed_api_call)
+
+    shards = [[] for _ in range(num_shards)]
+    for group in sorted(groups.values(), key=len, reverse=True):
+        min(shards, key=len).extend(group)
+    return [sorted(shard, key=lambda indexed_api_call: indexed_api_call[0]) for shard in shards]
+
+
+def parse_address(address):
+    """Parse a 'host:port' address."""
+    host, _, port = address.rpartition(':')
+    return host or 'localhost', int(port)
+
+
+def run_worker(address, auth_key, script_dir=None):
+    """Connect to the coordinator at `address`, then execute the job it sends."""
+    if not auth_key:
+        raise ValueError('Auth_Key must be set in the Distributed section of the config file to connect '
+                         'to a coordinator')
+    with connection.Client(address, authkey=auth_key) as coordinator_connection:
+        job = coordinator_connection.recv()
+        coordinator_connection.send(execute_job(job, script_dir))
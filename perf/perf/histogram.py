@@ -0,0 +1,273 @@
+import collections
+
+# number of the validation errors kept by CallMetrics, so that a broken API does not fill the memory
+MAX_VALIDATION_ERRORS = 10
+
+
+class LatencyHistogram(object):
+    """HDR-style histogram of latencies (in milliseconds).
+
+    Values are recorded as integer microseconds into log-linear buckets: every power of two range is
+    split into enough linear sub-buckets to keep `significant_digits` decimal digits of precision. The
+    number of buckets (and thus memory use) is bounded regardless of the number of values recorded;
+    values above `highest_trackable_value` are recorded as that value. Histograms of the same
+    precision can be merged, and serialized with to_dict() / from_dict().
+    """
+
+    def __init__(self, significant_digits=3, highest_trackable_value=3600000):
+        if not 1 <= significant_digits <= 5:
+            raise ValueError('significant_digits must be between 1 and 5')
+
+        self.significant_digits = significant_digits
+        self.highest_trackable_value = highest_trackable_value
+
+        # number of (linear) sub-buckets within each power of two range of values
+        self._sub_bucket_bits = (2 * 10 ** significant_digits - 1).bit_length()
+        self._sub_bucket_count = 1 << self._sub_bucket_bits
+        self._sub_bucket_half_count = self._sub_bucket_count // 2
+        self._highest_trackable_units = int(highest_trackable_value * 1000)
+
+        # sparse: bucket index -> count
+        self._counts = collections.defaultdict(int)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def __len__(self):
+        return self.count
+
+    def _get_index(self, units):
+        bucket = max(units.bit_length() - self._sub_bucket_bits, 0)
+        sub_bucket = units >> bucket
+        if not bucket:
+            return sub_bucket
+        return (bucket + 1) * self._sub_bucket_half_count + sub_bucket - self._sub_bucket_half_count
+
+    def _get_value(self, index):
+        """Get the value (in milliseconds) represented by a bucket index, i.e. the middle of its range."""
+        if index < self._sub_bucket_count:
+            return index / 1000
+        bucket = (index - self._sub_bucket_count) // self._sub_bucket_half_count + 1
+        sub_bucket = (index - self._sub_bucket_count) % self._sub_bucket_half_count
+        lowest = (sub_bucket + self._sub_bucket_half_count) << bucket
+        return (lowest + (1 << bucket) // 2) / 1000
+
+    def copy(self):
+        """Get a copy of this histogram.
+
+        The counts are copied at once, so a copy may be taken while values are being recorded by
+        another thread (e.g. to report them while a run is in progress).
+        """
+        histogram = type(self)(self.significant_digits, self.highest_trackable_value)
+        histogram._counts.update(self._counts)
+        histogram.count = sum(histogram._counts.values())
+        histogram.total = self.total
+        histogram.min = self.min
+        histogram.max = self.max
+        return histogram
+
+    def get_buckets(self):
+        """Get a list of (value, count) tuples of all non-empty buckets, ordered by value."""
+        return [(self._get_value(index), self._counts[index]) for index in sorted(self._counts)]
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def merge(self, other):
+        """Add the values recorded by another histogram of the same precision to this histogram."""
+        if other.significant_digits != self.significant_digits:
+            raise ValueError('Cannot merge histograms of different precision')
+
+        for index, count in other._counts.items():
+            self._counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    def percentile(self, percentile):
+        """Get the value (in milliseconds) below which `percentile` percent of the values fall."""
+        if not self.count:
+            return None
+
+        # rank of the value, rounding up so that e.g. the p50 of 2 values is the first one
+        rank = max(1, -(-self.count * percentile // 100))
+        seen = 0
+        for index in sorted(self._counts):
+            seen += self._counts[index]
+            if seen >= rank:
+                # the extremes are known exactly
+                return min(max(self._get_value(index), self.min), self.max)
+        return self.max
+
+    def record(self, value, count=1):
+        """Record a value (in milliseconds) `count` times."""
+        units = min(max(int(round(value * 1000)), 0), self._highest_trackable_units)
+        self._counts[self._get_index(units)] += count
+        self.count += count
+        self.total += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def to_dict(self):
+        return {
+            'significant_digits': self.significant_digits,
+            'highest_trackable_value': self.highest_trackable_value,
+            'count': self.count,
+            'total': self.total,
+            'min': self.min,
+            'max': self.max,
+            'counts': [[index, self._counts[index]] for index in sorted(self._counts)]
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls(data['significant_digits'], data['highest_trackable_value'])
+        histogram._counts.update(dict(data['counts']))
+        histogram.count = data['count']
+        histogram.total = data['total']
+        histogram.min = data['min']
+        histogram.max = data['max']
+        return histogram
+
+
+class CallMetrics(object):
+    """Latency histograms and error counters of a single API call.
+
+    Server-side response times (the `time` property of the response body) and client-side response
+    times (elapsed time of the HTTP request) are recorded separately; failed requests are only counted
+    in `errors`, keyed by the kind of failure (e.g. 'FAILED' or 'TIMEOUT'). The time spent on each
+    phase of a request (e.g. 'connect' or 'download') may be recorded to `phase_times`, the sizes
+    of the responses with record_response_size() and the outcome of validating responses with
+    record_validation() and record_item_failures().
+    """
+
+    def __init__(self, significant_digits=3):
+        self.significant_digits = significant_digits
+        self.server_times = LatencyHistogram(significant_digits)
+        self.client_times = LatencyHistogram(significant_digits)
+        self.errors = collections.Counter()
+        self.phase_times = collections.OrderedDict()
+
+        # totals of the sizes (in bytes) of the response bodies, as transferred (i.e. compressed, if
+        # so encoded) and once decoded, and of the time (in milliseconds) spent downloading them
+        self.num_responses = 0
+        self.transfer_bytes = 0
+        self.body_bytes = 0
+        self.download_time = 0.0
+
+        # numbers of the responses validated against the API spec and of those found invalid, along
+        # with the first distinct errors found, and number of the failed items of multi-status responses
+        self.num_validated = 0
+        self.num_invalid = 0
+        self.validation_errors = []
+        self.num_item_failures = 0
+
+    def _add_validation_errors(self, errors):
+        for error in errors:
+            if len(self.validation_errors) >= MAX_VALIDATION_ERRORS:
+                break
+            if error not in self.validation_errors:
+                self.validation_errors.append(error)
+
+    def get_response_sizes(self):
+        """Get the average transferred and decoded sizes (in bytes) of the responses and the transfer
+        throughput (in bytes per second), or None if no response size was recorded."""
+        if not self.num_responses:
+            return None
+        return {
+            'transfer_bytes': self.transfer_bytes / self.num_responses,
+            'body_bytes': self.body_bytes / self.num_responses,
+            'throughput': self.transfer_bytes / self.download_time * 1000 if self.download_time else None
+        }
+
+    def merge(self, other):
+        self.server_times.merge(other.server_times)
+        self.client_times.merge(other.client_times)
+        self.errors.update(other.errors)
+        for phase, phase_times in other.phase_times.items():
+            if phase in self.phase_times:
+                self.phase_times[phase].merge(phase_times)
+            else:
+                self.phase_times[phase] = LatencyHistogram(
+                    phase_times.significant_digits,
+                    phase_times.highest_trackable_value).merge(phase_times)
+        self.num_responses += other.num_responses
+        self.transfer_bytes += other.transfer_bytes
+        self.body_bytes += other.body_bytes
+        self.download_time += other.download_time
+        self.num_validated += other.num_validated
+        self.num_invalid += other.num_invalid
+        self._add_validation_errors(other.validation_errors)
+        self.num_item_failures += other.num_item_failures
+        return self
+
+    def record_item_failures(self, failed_items):
+        """Record the failed items, as (index, status) tuples, of a multi-status response."""
+        self.num_item_failures += len(failed_items)
+
+    def record_phase_times(self, phase_times):
+        """Record the time (in milliseconds) spent on each phase of a request."""
+        for phase, value in phase_times.items():
+            if phase not in self.phase_times:
+                self.phase_times[phase] = LatencyHistogram(self.significant_digits)
+            self.phase_times[phase].record(value)
+
+    def record_response_size(self, transfer_bytes, body_bytes, download_time):
+        """Record the size (in bytes) of a response body as transferred and once decoded, along with
+        the time (in milliseconds) spent downloading it."""
+        self.num_responses += 1
+        self.transfer_bytes += transfer_bytes
+        self.body_bytes += body_bytes
+        self.download_time += download_time
+
+    def record_validation(self, errors):
+        """Record the errors found validating a response (none if the response is valid)."""
+        self.num_validated += 1
+        if errors:
+            self.num_invalid += 1
+            self._add_validation_errors(errors)
+
+    def to_dict(self):
+        return {
+            'server_times': self.server_times.to_dict(),
+            'client_times': self.client_times.to_dict(),
+            'errors': dict(self.errors),
+            'phase_times': {phase: phase_times.to_dict()
+                            for phase, phase_times in self.phase_times.items()},
+            'response_sizes': {
+                'num_responses': self.num_responses,
+                'transfer_bytes': self.transfer_bytes,
+                'body_bytes': self.body_bytes,
+                'download_time': self.download_time
+            },
+            'validation': {
+                'num_validated': self.num_validated,
+                'num_invalid': self.num_invalid,
+                'errors': self.validation_errors,
+                'num_item_failures': self.num_item_failures
+            }
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        metrics = cls(data['server_times']['significant_digits'])
+        metrics.server_times = LatencyHistogram.from_dict(data['server_times'])
+        metrics.client_times = LatencyHistogram.from_dict(data['client_times'])
+        metrics.errors.update(data['errors'])
+        for phase, phase_times in data.get('phase_times', {}).items():
+            metrics.phase_times[phase] = LatencyHistogram.from_dict(phase_times)
+        response_sizes = data.get('response_sizes', {})
+        metrics.num_responses = response_sizes.get('num_responses', 0)
+        metrics.transfer_bytes = response_sizes.get('transfer_bytes', 0)
+        metrics.body_bytes = response_sizes.get('body_bytes', 0)
+        metrics.download_time = response_sizes.get('download_time', 0.0)
+        validation = data.get('validation', {})
+        metrics.num_validated = validation.get('num_validated', 0)
+        metrics.num_invalid = validation.get('num_invalid', 0)
+        metrics.validation_errors = list(validation.get('errors', []))
+        metrics.num_item_failures = validation.get('num_item_failures', 0)
+        return metrics
@@ -0,0 +1,231 @@
+from http import server
+
+import collections
+import sys
+import threading
+import time
+
+# upper bounds (in seconds) of the buckets of the response time histograms exported to Prometheus
+PROMETHEUS_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+
+def _escape_label_value(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f'{hours:02}:{minutes:02}:{seconds:02}'
+
+
+class LiveMonitor(object):
+    """Report the progress and metrics of a run while it is in progress.
+
+    The monitor reads the CallMetrics (see perf.histogram) recorded by the API calls of the run, keyed
+    by API call label, from a background thread: every `interval` seconds, it writes a progress line
+    (API calls done, requests made, request rate, response time percentiles and the average response
+    time over the last interval) to `stream`; if `address` (a (host, port) tuple) is given, it serves
+    the metrics in the Prometheus text format at /metrics. Nothing is done on the path of the requests
+    themselves, so monitoring does not disturb the measurements.
+    """
+
+    def __init__(self, call_metrics, num_api_calls=None, duration=None, interval=1.0,
+                 progress=True, address=None, stream=sys.stderr):
+        self.call_metrics = call_metrics
+        self.num_api_calls = num_api_calls
+        self.num_api_calls_done = 0
+        self.duration = duration
+        self.interval = interval
+        self.progress = progress
+        self.address = address
+        self.stream = stream
+
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._server = None
+        self._started_at = None
+        self._last_count = 0
+        self._last_total = 0.0
+
+        # client-side response times and errors of the API calls whose metrics were taken out of
+        # `call_metrics` once done (see add_finished()); errors are also kept by API call label, as
+        # the exported error counters must not go down
+        self._finished_client_times = None
+        self._finished_errors = collections.Counter()
+        self._finished_errors_by_label = collections.defaultdict(collections.Counter)
+
+    def _get_client_times(self, include_finished=False):
+        """Get a copy of the client-side response time histogram of every API call, keyed by label;
+        the API calls taken out of `call_metrics` are included, as one, if `include_finished` is set."""
+        histograms = [(label, metrics.client_times.copy(), dict(metrics.errors))
+                      for label, metrics in list(self.call_metrics.items())]
+        if include_finished:
+            with self._lock:
+                if self._finished_client_times is not None:
+                    histograms.append((None, self._finished_client_times.copy(),
+                                       dict(self._finished_errors)))
+        return histograms
+
+    def _report(self):
+        while not self._stopped.wait(self.interval):
+            self._write_progress()
+
+    def _write_progress(self, final=False):
+        line = self.get_progress_line()
+        if self.stream.isatty():
+            # keep rewriting the same line
+            self.stream.write('\r\033[K' + line + ('\n' if final else ''))
+        else:
+            self.stream.write(line + '\n')
+        self.stream.flush()
+
+    def add_finished(self, label, metrics):
+        """Account for the CallMetrics of an API call which is done and taken out of `call_metrics`
+        (e.g. when streaming results); they count towards the progress and the exported error counters,
+        but their response times are no longer served."""
+        with self._lock:
+            if self._finished_client_times is None:
+                self._finished_client_times = metrics.client_times.copy()
+            else:
+                self._finished_client_times.merge(metrics.client_times)
+            self._finished_errors.update(metrics.errors)
+            errors = {error: num_errors for error, num_errors in metrics.errors.items() if num_errors}
+            if errors:
+                self._finished_errors_by_label[label].update(errors)
+
+    def api_call_done(self, *_):
+        """Count an API call as done; may be used as a callback of concurrent.futures.Future."""
+        with self._lock:
+            self.num_api_calls_done += 1
+
+    def get_progress_line(self):
+        elapsed = time.perf_counter() - self._started_at
+        histograms = self._get_client_times(include_finished=True)
+        count = sum(client_times.count for _, client_times, _ in histograms)
+        total = sum(client_times.total for _, client_times, _ in histograms)
+        num_errors = sum(sum(errors.values()) for _, _, errors in histograms)
+
+        parts = []
+        if self.num_api_calls is not None:
+            parts.append(f'{self.num_api_calls_done}/{self.num_api_calls} API calls')
+        parts.append(f'{count + num_errors} requests ({num_errors} errors)')
+        parts.append('%.1f req/s' % ((count + num_errors) / elapsed if elapsed else 0))
+
+        if count:
+            merged = histograms[0][1]
+            for _, client_times, _ in histograms[1:]:
+                merged.merge(client_times)
+            parts.append('p50 %.2f ms, p99 %.2f ms' % (merged.percentile(50), merged.percentile(99)))
+        if count > self._last_count:
+            # a rising average over the last interval is the first sign of the API degrading
+            parts.append('last %ss avg %.2f ms' % (
+                self.interval, (total - self._last_total) / (count - self._last_count)))
+        self._last_count = count
+        self._last_total = total
+
+        remaining = None
+        if self.duration is not None:
+            remaining = max(self.duration - elapsed, 0)
+        elif self.num_api_calls and self.num_api_calls_done:
+            remaining = elapsed * (self.num_api_calls / self.num_api_calls_done - 1)
+        parts.append(f'elapsed {_format_duration(elapsed)}')
+        if remaining is not None:
+            parts.append(f'ETA {_format_duration(remaining)}')
+        return ' | '.join(parts)
+
+    def get_prometheus_metrics(self):
+        """Get the metrics of the run in the Prometheus text exposition format."""
+        lines = [
+            '# HELP api_perf_api_calls_done API calls of the run which are done.',
+            '# TYPE api_perf_api_calls_done gauge',
+            f'api_perf_api_calls_done {self.num_api_calls_done}'
+        ]
+        if self.num_api_calls is not None:
+            lines += [
+                '# HELP api_perf_api_calls API calls of the run.',
+                '# TYPE api_perf_api_calls gauge',
+                f'api_perf_api_calls {self.num_api_calls}'
+            ]
+
+        histograms = self._get_client_times()
+        with self._lock:
+            label_errors = {label: collections.Counter(errors)
+                            for label, errors in self._finished_errors_by_label.items()}
+        for label, _, errors in histograms:
+            label_errors.setdefault(label, collections.Counter()).update(errors)
+        lines += [
+            '# HELP api_perf_errors_total Failed requests, by API call and kind of failure.',
+            '# TYPE api_perf_errors_total counter'
+        ]
+        for label, errors in label_errors.items():
+            for error, num_errors in errors.items():
+                lines.append('api_perf_errors_total{api_call="%s",error="%s"} %s' % (
+                    _escape_label_value(label), error, num_errors))
+
+        lines += [
+            '# HELP api_perf_response_time_seconds Client-side response time, by API call.',
+            '# TYPE api_perf_response_time_seconds histogram'
+        ]
+        for label, client_times, _ in histograms:
+            label = _escape_label_value(label)
+            buckets = client_times.get_buckets()
+            x = 0
+            cumulative_count = 0
+            for upper_bound in PROMETHEUS_BUCKETS:
+                while x < len(buckets) and buckets[x][0] <= upper_bound * 1000:
+                    cumulative_count += buckets[x][1]
+                    x += 1
+                lines.append('api_perf_response_time_seconds_bucket{api_call="%s",le="%s"} %s' % (
+                    label, upper_bound, cumulative_count))
+            lines.append('api_perf_response_time_seconds_bucket{api_call="%s",le="+Inf"} %s' % (
+                label, client_times.count))
+            lines.append('api_perf_response_time_seconds_sum{api_call="%s"} %s' % (
+                label, client_times.total / 1000))
+            lines.append('api_perf_response_time_seconds_count{api_call="%s"} %s' % (
+                label, client_times.count))
+        return '\n'.join(lines) + '\n'
+
+    def start(self):
+        self._started_at = time.perf_counter()
+        self._stopped.clear()
+
+        if self.address:
+            monitor = self
+
+            class MetricsHandler(server.BaseHTTPRequestHandler):
+
+                def do_GET(self):
+                    if self.path.split('?')[0] != '/metrics':
+                        self.send_error(404)
+                        return
+                    body = monitor.get_prometheus_metrics().encode('utf-8')
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, *args):
+                    pass
+
+            self._server = server.ThreadingHTTPServer(self.address, MetricsHandler)
+            self._server.daemon_threads = True
+            threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+        if self.progress:
+            self._thread = threading.Thread(target=self._report, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+            self._write_progress(final=True)
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
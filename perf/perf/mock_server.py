@@ -0,0 +1,435 @@
+from perf import schema
+from perf import utils
+from http import HTTPStatus
+from http import server
+
+import gzip
+import json
+import math
+import random
+import re
+import threading
+import time
+import urllib.parse
+import uuid
+
+# API spec served when none is given: a small API whose responses are in the format expected by
+# ApiPerformance, with query parameters, path templates (including a nested one) and write operations
+DEFAULT_SPEC = {
+    'swagger': '2.0',
+    'info': {'title': 'Mock API', 'version': '1.0'},
+    'basePath': '/api',
+    'paths': {
+        '/v1/widgets': {
+            'get': {
+                'parameters': [
+                    {'in': 'query', 'name': 'color', 'type': 'string', 'enum': ['red', 'blue']},
+                    {'in': 'query', 'name': 'shiny', 'type': 'boolean'},
+                    {'in': 'query', 'name': 'limit', 'type': 'integer'}
+                ],
+                'responses': {'200': {'schema': {'$ref': '#/definitions/WidgetList'}}}
+            },
+            'post': {
+                'parameters': [{'in': 'body', 'name': 'widget', 'schema': {'$ref': '#/definitions/Widget'}}],
+                'responses': {'201': {'schema': {'$ref': '#/definitions/Widget'}}}
+            }
+        },
+        '/v1/widgets/{uuid}': {
+            'get': {'responses': {'200': {'schema': {'$ref': '#/definitions/Widget'}}}},
+            'put': {
+                'parameters': [{'in': 'body', 'name': 'widget', 'schema': {'$ref': '#/definitions/Widget'}}],
+                'responses': {'200': {'schema': {'$ref': '#/definitions/Widget'}}}
+            },
+            'patch': {
+                'parameters': [{'in': 'body', 'name': 'widget', 'schema': {'$ref': '#/definitions/Widget'}}],
+                'responses': {'200': {'schema': {'$ref': '#/definitions/Widget'}}}
+            },
+            'delete': {'responses': {'204': {}}},
+            'parameters': [{'in': 'path', 'name': 'uuid', 'type': 'string', 'required': True}]
+        },
+        '/v1/widgets/{uuid}/parts': {
+            'get': {
+                'parameters': [{'in': 'path', 'name': 'uuid', 'type': 'string', 'required': True}],
+                'responses': {'200': {'schema': {'$ref': '#/definitions/PartList'}}}
+            }
+        },
+        '/v1/gadgets': {
+            'get': {
+                'parameters': [{'in': 'query', 'name': 'limit', 'type': 'integer'}],
+                'responses': {'200': {'schema': {'$ref': '#/definitions/GadgetList'}}}
+            }
+        }
+    },
+    'definitions': {
+        'Widget': {
+            'type': 'object',
+            'properties': {
+                'uuid': {'type': 'string', 'format': 'uuid', 'readOnly': True},
+                'name': {'type': 'string'},
+                'color': {'type': 'string', 'enum': ['red', 'blue']},
+                'shiny': {'type': 'boolean'},
+                'created': {'type': 'string', 'format': 'date-time', 'readOnly': True}
+            }
+        },
+        'WidgetList': {
+            'type': 'object',
+            'properties': {
+                'count': {'type': 'integer'},
+                'result': {'type': 'array', 'items': {'$ref': '#/definitions/Widget'}},
+                'time': {'type': 'string'}
+            }
+        },
+        'PartList': {
+            'type': 'object',
+            'properties': {
+                'count': {'type': 'integer'},
+                'result': {'type': 'array', 'items': {
+                    'type': 'object',
+                    'properties': {'uuid': {'type': 'string', 'format': 'uuid'},
+                                   'name': {'type': 'string'},
+                                   'weight': {'type': 'number', 'minimum': 0.5}}}},
+                'time': {'type': 'string'}
+            }
+        },
+        'GadgetList': {
+            'type': 'object',
+            'properties': {
+                'count': {'type': 'integer'},
+                'result': {'type': 'array', 'items': {
+                    'type': 'object',
+                    'properties': {'uuid': {'type': 'string', 'format': 'uuid'},
+                                   'name': {'type': 'string'},
+                                   'description': {'type': 'string', 'minLength': 64}}}},
+                'time': {'type': 'string'}
+            }
+        }
+    }
+}
+
+
+def get_base_path(spec):
+    """Get the path of the base URL of the API described by a spec (OpenAPI 2.0 or 3.x)."""
+    if spec.get('servers'):
+        return urllib.parse.urlparse(utils.get_server_url(spec['servers'][0])).path.rstrip('/')
+    return spec.get('basePath', '').rstrip('/')
+
+
+def get_latency_sampler(latency_config, rng=random):
+    """Get a function returning latencies (in milliseconds) drawn from the configured distribution.
+
+    `Distribution` is one of 'constant' (the default), 'uniform', 'normal', 'lognormal' or
+    'exponential', of the given `Mean` and `Stddev` (standard deviation, by default half the mean;
+    ignored by 'constant' and 'exponential'). Latencies are clamped to [`Min`, `Max`].
+    """
+    distribution = latency_config.get('Distribution', 'constant')
+    mean = latency_config.get('Mean', 0)
+    stddev = latency_config.get('Stddev', mean / 2)
+    minimum = latency_config.get('Min', 0)
+    maximum = latency_config.get('Max')
+
+    if distribution == 'constant':
+        def draw():
+            return mean
+    elif distribution == 'uniform':
+        # the half-width of a uniform distribution is sqrt(3) times its standard deviation
+        def draw():
+            return rng.uniform(mean - stddev * math.sqrt(3), mean + stddev * math.sqrt(3))
+    elif distribution == 'normal':
+        def draw():
+            return rng.gauss(mean, stddev)
+    elif distribution == 'lognormal':
+        # parameters of the underlying normal distribution yielding the given mean and deviation
+        sigma = math.sqrt(math.log(1 + (stddev / mean) ** 2)) if mean else 0
+        mu = math.log(mean) - sigma ** 2 / 2 if mean else 0
+
+        def draw():
+            return rng.lognormvariate(mu, sigma) if mean else 0
+    elif distribution == 'exponential':
+        def draw():
+            return rng.expovariate(1 / mean) if mean else 0
+    else:
+        raise ValueError(f'Unknown latency distribution: {distribution}')
+
+    def get_latency():
+        latency = max(draw(), minimum)
+        return min(latency, maximum) if maximum is not None else latency
+
+    return get_latency
+
+
+class MockApiServer(object):
+    """Local stand-in for the API described by an OpenAPI spec, e.g. to test or benchmark ApiPerformance.
+
+    The spec is served (as JSON) at `Spec_Path`, and the operations of its paths below the path of its
+    base URL. Every "listing" path (e.g. /v1/widgets) has a collection of `Objects` objects, built from
+    the schema of the `result` items of its GET response (see perf.schema.get_example()) with a unique
+    ID - named after the parameter of the single object path (e.g. /v1/widgets/{uuid}), `uuid` by
+    default - and padded to at least `Object_Size` bytes. Collections are built on first use, including
+    those of nested paths (e.g. /v1/widgets/{uuid}/parts, one per widget). GET, POST, PUT, PATCH and
+    DELETE operate on the collections, so objects created by a write benchmark can be read back.
+
+    Responses are in the format expected by ApiPerformance (`count`, `result` and `time`, the time
+    spent handling the request). Each request is delayed by a latency drawn from the `Latency`
+    distribution (see get_latency_sampler()), and fails with the status codes of `Error_Rates` (e.g.
+    {"504": 0.01, "401": 0.001}) at the given rates. Responses are gzip-encoded when accepted, unless
+    `Compression` is false.
+    """
+
+    def __init__(self, spec=None, config=None, address=('localhost', 8080)):
+        self.spec = spec or DEFAULT_SPEC
+        self.config = config or {}
+        self.address = address
+
+        self.spec_path = self.config.get('Spec_Path', '/api/v1/openapi')
+        self.base_path = get_base_path(self.spec)
+        self.num_objects = self.config.get('Objects', 20)
+        self.object_size = self.config.get('Object_Size', 0)
+        self.page_size_param = self.config.get('Page_Size_Param', 'limit')
+        self.compression = self.config.get('Compression', True)
+        self.error_rates = {int(status): rate
+                            for status, rate in self.config.get('Error_Rates', {}).items()}
+
+        self._random = random.Random(self.config.get('Seed'))
+        self._get_latency = get_latency_sampler(self.config.get('Latency', {}), self._random)
+
+        # path templates of the spec as regular expressions matching the paths of requests; static
+        # paths (e.g. /v1/widgets/count) take precedence over templates (e.g. /v1/widgets/{uuid})
+        self._routes = []
+        for path in sorted(self.spec.get('paths', {}),
+                           key=lambda path: len(utils.get_path_params(path))):
+            parts = re.split(r'{[^{}/]+}', path)
+            self._routes.append((re.compile('^' + '([^/]+)'.join(re.escape(part) for part in parts) + '$'),
+                                 path))
+
+        # objects of each collection, keyed by the (resolved) path of the collection, then by ID
+        self._collections = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    def _create_object(self, path, x):
+        item_schema = self._get_item_schema(path)
+        item = (schema.get_example(self.spec, item_schema, unique=f'{x:06}')
+                if item_schema is not None else {'name': f'object {x}'})
+        if not isinstance(item, dict):
+            item = {'value': item}
+        item[self._get_id_field(path)] = str(uuid.UUID(int=self._random.getrandbits(128), version=4))
+
+        if self.object_size:
+            size = len(json.dumps(item))
+            if size < self.object_size:
+                item['padding'] = 'x' * (self.object_size - size - len(', "padding": ""'))
+        return item
+
+    def _create_server(self):
+        mock_server = self
+
+        class MockApiHandler(server.BaseHTTPRequestHandler):
+            # keep connections alive, like an actual API
+            protocol_version = 'HTTP/1.1'
+            # write the headers and body of a response at once, so that they are not held up by Nagle's
+            # algorithm (waiting for the client's delayed ACK)
+            wbufsize = -1
+            disable_nagle_algorithm = True
+
+            def do_DELETE(self):
+                mock_server._handle(self, 'DELETE')
+
+            def do_GET(self):
+                mock_server._handle(self, 'GET')
+
+            def do_PATCH(self):
+                mock_server._handle(self, 'PATCH')
+
+            def do_POST(self):
+                mock_server._handle(self, 'POST')
+
+            def do_PUT(self):
+                mock_server._handle(self, 'PUT')
+
+            def log_message(self, *args):
+                pass
+
+        self._server = server.ThreadingHTTPServer(self.address, MockApiHandler)
+        self._server.daemon_threads = True
+
+    def _get_collection(self, path, collection_path):
+        """Get the objects of a collection (resolved path of a "listing" path), built on first use."""
+        with self._lock:
+            if collection_path not in self._collections:
+                collection = {}
+                id_field = self._get_id_field(path)
+                for x in range(self.num_objects):
+                    item = self._create_object(path, x)
+                    collection[item[id_field]] = item
+                self._collections[collection_path] = collection
+            return self._collections[collection_path]
+
+    def _get_id_field(self, path):
+        """Get the name of the ID of the objects of a "listing" path."""
+        for single_object_path in self.spec.get('paths', {}):
+            if single_object_path.startswith(path + '/{') and single_object_path.endswith('}') and \
+                    single_object_path.count('/') == path.count('/') + 1:
+                return utils.get_path_params(single_object_path)[-1]
+        return 'uuid'
+
+    def _get_item_schema(self, path):
+        """Get the schema of the objects returned by a "listing" path, if the spec describes it."""
+        method_def = self.spec['paths'].get(path, {}).get('get', {})
+        for status in ['200', 200, 'default']:
+            response = utils.resolve_ref(self.spec, method_def.get('responses', {}).get(status, {}))
+            if not response:
+                continue
+            response_schema = response.get('schema')
+            if response_schema is None:
+                # OpenAPI 3.x
+                content = response.get('content', {})
+                media_type = next((media_type for media_type in content if 'json' in media_type), None)
+                response_schema = content[media_type].get('schema') if media_type else None
+            response_schema = utils.resolve_ref(self.spec, response_schema or {})
+            if 'result' in response_schema.get('properties', {}):
+                response_schema = utils.resolve_ref(self.spec, response_schema['properties']['result'])
+            if response_schema.get('type') == 'array':
+                return response_schema.get('items', {})
+            return response_schema or None
+        return None
+
+    def _get_route(self, path):
+        """Get the path template of the spec matching the path of a request, along with the values of its
+        parameters; returns None if no path of the spec matches."""
+        if not path.startswith(self.base_path):
+            return None
+        path = path[len(self.base_path):]
+        for pattern, template in self._routes:
+            match = pattern.match(path)
+            if match:
+                return template, [urllib.parse.unquote(value) for value in match.groups()]
+        return None
+
+    def _handle(self, handler, method):
+        started = time.perf_counter()
+        url = urllib.parse.urlparse(handler.path)
+        request_body = handler.rfile.read(int(handler.headers.get('Content-Length') or 0))
+
+        if method == 'GET' and url.path == self.spec_path:
+            self._send(handler, HTTPStatus.OK, self.spec)
+            return
+
+        route = self._get_route(url.path)
+        if not route:
+            self._send(handler, HTTPStatus.NOT_FOUND, {'message': 'Not Found'})
+            return
+        path, _ = route
+        if method.lower() not in self.spec['paths'][path]:
+            self._send(handler, HTTPStatus.METHOD_NOT_ALLOWED, {'message': 'Method Not Allowed'})
+            return
+
+        # the latency is spent before any failure, like an API waiting for a backend
+        time.sleep(self._get_latency() / 1000)
+
+        draw = self._random.random()
+        for status, rate in self.error_rates.items():
+            if draw < rate:
+                self._send(handler, status, {'message': 'Injected failure'})
+                return
+            draw -= rate
+
+        try:
+            data = json.loads(request_body) if request_body else {}
+        except ValueError:
+            self._send(handler, HTTPStatus.BAD_REQUEST, {'message': 'Invalid JSON'})
+            return
+
+        status, result = self._operate(method, path, url, data)
+        if status == HTTPStatus.NO_CONTENT:
+            self._send(handler, status)
+        elif result is None:
+            self._send(handler, status, {'message': status.phrase})
+        else:
+            count = len(result) if isinstance(result, list) else 1
+            # the time is the last member, where ApiPerformance reads it
+            self._send(handler, status, {
+                'count': count,
+                'result': result,
+                'time': '%.3fmS' % ((time.perf_counter() - started) * 1000)
+            })
+
+    def _operate(self, method, path, url, data):
+        """Apply an operation to the collections; returns the status code along with the result."""
+        resolved_path = url.path[len(self.base_path):]
+        if not path.endswith('}'):
+            collection = self._get_collection(path, resolved_path)
+            if method == 'POST':
+                if not isinstance(data, dict):
+                    return HTTPStatus.BAD_REQUEST, None
+                item = dict(data)
+                item[self._get_id_field(path)] = str(uuid.uuid4())
+                with self._lock:
+                    collection[item[self._get_id_field(path)]] = item
+                return HTTPStatus.CREATED, item
+
+            query = urllib.parse.parse_qs(url.query)
+            with self._lock:
+                items = list(collection.values())
+            try:
+                offset = int(query.get('offset', [0])[0])
+                limit = int(query.get(self.page_size_param, [len(items)])[0])
+            except ValueError:
+                return HTTPStatus.BAD_REQUEST, None
+            return HTTPStatus.OK, items[offset:offset + limit]
+
+        collection_path, _, object_id = resolved_path.rpartition('/')
+        object_id = urllib.parse.unquote(object_id)
+        listing_path = path[:path.rindex('/')]
+        collection = self._get_collection(listing_path, collection_path)
+        with self._lock:
+            item = collection.get(object_id)
+            if item is None:
+                return HTTPStatus.NOT_FOUND, None
+            if method == 'DELETE':
+                del collection[object_id]
+                return HTTPStatus.NO_CONTENT, None
+            if method in ['PUT', 'PATCH']:
+                if not isinstance(data, dict):
+                    return HTTPStatus.BAD_REQUEST, None
+                item = dict(data) if method == 'PUT' else dict(item, **data)
+                item[self._get_id_field(listing_path)] = object_id
+                collection[object_id] = item
+            return HTTPStatus.OK, item
+
+    def _send(self, handler, status, body=None):
+        handler.send_response(status)
+        data = b''
+        if body is not None:
+            data = json.dumps(body).encode('utf-8')
+            handler.send_header('Content-Type', 'application/json')
+            accept_encoding = handler.headers.get('Accept-Encoding', '')
+            if self.compression and 'gzip' in [encoding.split(';')[0].strip()
+                                               for encoding in accept_encoding.split(',')]:
+                data = gzip.compress(data, compresslevel=5)
+                handler.send_header('Content-Encoding', 'gzip')
+        handler.send_header('Content-Length', str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    @property
+    def url(self):
+        """URL at which the spec is served."""
+        host, port = self._server.server_address[:2] if self._server else self.address
+        return f'http://{host}:{port}{self.spec_path}'
+
+    def serve_forever(self):
+        """Serve the API until stopped (or interrupted)."""
+        self._create_server()
+        self._server.serve_forever()
+
+    def start(self):
+        """Serve the API from a background thread."""
+        self._create_server()
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,413 @@
+import html
+import json
+
+# number of rows of the results table shown at once; the other rows are only rendered when paged to
+PAGE_SIZE = 100
+
+_TEMPLATE = """<!DOCTYPE html>
+<html>
+    <head>
+        <meta charset="utf-8">
+        <title>{{title}}</title>
+        <style>
+            body {font-family: monospace;
+                  font-size: 11pt;
+                  margin: 1em;}
+            table {border-collapse: collapse;
+                   margin-bottom: 1em;}
+            th, td {border: 1px solid #ccc;
+                    padding: 2px 6px;
+                    text-align: left;
+                    vertical-align: top;}
+            #results th {background: #eee;
+                         cursor: pointer;
+                         user-select: none;}
+            #results tbody tr {cursor: pointer;}
+            #results tbody tr:hover, #results tbody tr.selected {background: blue;
+                                                                   color: white;}
+            .SLOW {color: #c60;}
+            .FAILED, .TIMEOUT {color: #c00;}
+            .controls {margin-bottom: 0.5em;}
+            .controls input {font-family: monospace;
+                             width: 40em;}
+            #details {border-top: 1px solid #ccc;
+                      padding-top: 0.5em;}
+            .chart {display: inline-block;
+                    margin-right: 2em;
+                    vertical-align: top;}
+            .legend span {margin-right: 1em;}
+            .client {color: #1f77b4;}
+            .server {color: #ff7f0e;}
+            .sustained {color: #2ca02c;}
+        </style>
+    </head>
+    <body>
+    <div>{{title}}</div>
+    <table id="summary"></table>
+    <div class="controls">
+        <input id="filter" type="search" placeholder="Filter, e.g.: widgets SLOW">
+        <button id="previous">&lt;</button>
+        <span id="page"></span>
+        <button id="next">&gt;</button>
+    </div>
+    <table id="results"><thead></thead><tbody></tbody></table>
+    <div id="details"></div>
+    <script type="application/json" id="report-data">{{data}}</script>
+    <script>
+    (function () {
+        'use strict';
+        var data = JSON.parse(document.getElementById('report-data').textContent);
+        var pageSize = {{page_size}};
+        var labelIndex = data.fields.indexOf('API Call');
+        var statusIndex = data.fields.indexOf('Status');
+        var rowText = data.rows.map(function (row) { return row.join(' ').toLowerCase(); });
+        var state = {rows: data.rows.map(function (row, x) { return x; }), sortIndex: null,
+                     descending: false, page: 0, selected: null};
+
+        function element(tag, text, className) {
+            var node = document.createElement(tag);
+            if (text !== undefined) { node.textContent = text; }
+            if (className) { node.className = className; }
+            return node;
+        }
+
+        function toNumber(value) {
+            var number = parseFloat(value);
+            return isNaN(number) ? null : number;
+        }
+
+        // histograms are embedded as flat [value, count, value, count...] arrays
+        function getBuckets(flat) {
+            var buckets = [];
+            for (var x = 0; x < flat.length; x += 2) { buckets.push([flat[x], flat[x + 1]]); }
+            return buckets;
+        }
+
+        function getStats(buckets) {
+            var count = 0, total = 0;
+            buckets.forEach(function (bucket) { count += bucket[1]; total += bucket[0] * bucket[1]; });
+            function percentile(p) {
+                var rank = Math.max(1, Math.ceil(count * p / 100)), seen = 0;
+                for (var x = 0; x < buckets.length; x++) {
+                    seen += buckets[x][1];
+                    if (seen >= rank) { return buckets[x][0]; }
+                }
+                return null;
+            }
+            if (!count) { return null; }
+            return {count: count, mean: total / count, p50: percentile(50), p90: percentile(90),
+                    p99: percentile(99), max: buckets[buckets.length - 1][0]};
+        }
+
+        // the SVG markup built below only ever contains numbers, so it can be set as HTML
+        function sparkline(values, width, height) {
+            var points = [], known = values.filter(function (value) { return value !== null; });
+            if (known.length < 2) { return ''; }
+            var low = Math.min.apply(null, known), high = Math.max.apply(null, known);
+            values.forEach(function (value, x) {
+                if (value === null) { return; }
+                points.push((x * width / (values.length - 1)).toFixed(1) + ',' +
+                            (height - 1 - (value - low) * (height - 2) / ((high - low) || 1)).toFixed(1));
+            });
+            return '<svg width="' + width + '" height="' + height + '"><polyline fill="none" ' +
+                   'stroke="currentColor" points="' + points.join(' ') + '"/></svg>';
+        }
+
+        function renderSummary() {
+            var table = document.getElementById('summary');
+            data.summary.forEach(function (row) {
+                var tr = element('tr');
+                tr.appendChild(element('th', row[0]));
+                tr.appendChild(element('td', row[1]));
+                table.appendChild(tr);
+            });
+        }
+
+        function renderHeader() {
+            var tr = element('tr');
+            data.fields.forEach(function (field, x) {
+                var th = element('th', field + (state.sortIndex === x ? (state.descending ? ' \\u25bc' : ' \\u25b2') : ''));
+                th.addEventListener('click', function () {
+                    state.descending = state.sortIndex === x ? !state.descending : false;
+                    state.sortIndex = x;
+                    sortRows();
+                    render();
+                });
+                tr.appendChild(th);
+            });
+            if (data.history) { tr.appendChild(element('th', 'Trend (p50)')); }
+            var thead = document.querySelector('#results thead');
+            thead.textContent = '';
+            thead.appendChild(tr);
+        }
+
+        function sortRows() {
+            var x = state.sortIndex, sign = state.descending ? -1 : 1;
+            state.rows.sort(function (a, b) {
+                var valueA = data.rows[a][x], valueB = data.rows[b][x];
+                var numberA = toNumber(valueA), numberB = toNumber(valueB);
+                if (numberA !== null && numberB !== null) { return sign * (numberA - numberB) || a - b; }
+                return sign * String(valueA).localeCompare(String(valueB)) || a - b;
+            });
+        }
+
+        function filterRows() {
+            var terms = document.getElementById('filter').value.toLowerCase().split(/\\s+/).filter(Boolean);
+            state.rows = [];
+            rowText.forEach(function (text, x) {
+                if (terms.every(function (term) { return text.indexOf(term) !== -1; })) { state.rows.push(x); }
+            });
+            if (state.sortIndex !== null) { sortRows(); }
+            state.page = 0;
+            render();
+        }
+
+        function renderRows() {
+            var tbody = document.querySelector('#results tbody');
+            var numPages = Math.max(1, Math.ceil(state.rows.length / pageSize));
+            state.page = Math.min(state.page, numPages - 1);
+            tbody.textContent = '';
+            state.rows.slice(state.page * pageSize, (state.page + 1) * pageSize).forEach(function (x) {
+                var row = data.rows[x], tr = element('tr');
+                row.forEach(function (value, y) {
+                    tr.appendChild(element('td', value, y === statusIndex ? value : undefined));
+                });
+                if (data.history) {
+                    var td = element('td');
+                    td.innerHTML = sparkline(data.history.medians[row[labelIndex]] || [], 80, 16);
+                    tr.appendChild(td);
+                }
+                if (x === state.selected) { tr.className = 'selected'; }
+                tr.addEventListener('click', function () { state.selected = x; render(); renderDetails(); });
+                tbody.appendChild(tr);
+            });
+            document.getElementById('page').textContent = 'page ' + (state.page + 1) + ' / ' + numPages +
+                ' (' + state.rows.length + ' of ' + data.rows.length + ' API calls)';
+        }
+
+        function render() {
+            renderHeader();
+            renderRows();
+        }
+
+        function renderCharts(series) {
+            var width = 480, height = 160, numBins = 40;
+            var values = [];
+            series.forEach(function (s) { s.buckets.forEach(function (bucket) { values.push(bucket[0]); }); });
+            var low = Math.log(Math.max(Math.min.apply(null, values), 0.001));
+            var high = Math.log(Math.max(Math.max.apply(null, values), 0.002));
+            if (high - low < 1e-6) { high = low + 1; }
+            function scaleX(value) { return (Math.log(Math.max(value, 0.001)) - low) * width / (high - low); }
+
+            // histogram: the buckets of each series are binned on a logarithmic scale
+            var histogram = '', cdf = '';
+            series.forEach(function (s) {
+                var bins = new Array(numBins).fill(0), count = 0, points = [], seen = 0;
+                s.buckets.forEach(function (bucket) {
+                    var bin = Math.min(numBins - 1, Math.floor(scaleX(bucket[0]) * numBins / (width + 1e-9)));
+                    bins[bin] += bucket[1];
+                    count += bucket[1];
+                });
+                var highest = Math.max.apply(null, bins);
+                bins.forEach(function (binCount, x) {
+                    var barHeight = binCount * (height - 10) / highest;
+                    histogram += '<rect x="' + (x * width / numBins).toFixed(1) + '" y="' +
+                        (height - barHeight).toFixed(1) + '" width="' + (width / numBins - 1).toFixed(1) +
+                        '" height="' + barHeight.toFixed(1) + '" fill="' + s.color + '" fill-opacity="0.5"/>';
+                });
+                s.buckets.forEach(function (bucket) {
+                    seen += bucket[1];
+                    points.push(scaleX(bucket[0]).toFixed(1) + ',' + (height - seen * height / count).toFixed(1));
+                });
+                cdf += '<polyline fill="none" stroke="' + s.color + '" points="' + points.join(' ') + '"/>';
+            });
+
+            var axis = 'Response time (ms, log scale): ' + Math.exp(low).toFixed(2) + ' - ' + Math.exp(high).toFixed(2);
+            var container = element('div');
+            [['Histogram', histogram], ['Cumulative distribution', cdf]].forEach(function (chart) {
+                var div = element('div', undefined, 'chart');
+                div.appendChild(element('div', chart[0]));
+                var svg = element('div');
+                svg.innerHTML = '<svg width="' + width + '" height="' + height + '" style="border: 1px solid #ccc">' +
+                    chart[1] + '</svg>';
+                div.appendChild(svg);
+                div.appendChild(element('div', axis));
+                container.appendChild(div);
+            });
+            return container;
+        }
+
+        // the steps of the capacity search of an API call, and its p99 response time against its
+        // throughput at each step: the curve bends up at the knee
+        function renderCapacity(curve) {
+            var container = element('div'), table = element('table'), header = element('tr');
+            [data.capacity.load, 'RPS', 'p50 (ms)', 'p99 (ms)', 'Errors (%)', ''].forEach(function (field) {
+                header.appendChild(element('th', field));
+            });
+            table.appendChild(header);
+            function isSustained(x) { return curve.sustained !== null && x <= curve.sustained; }
+            curve.steps.forEach(function (step, x) {
+                var tr = element('tr');
+                step.forEach(function (value) { tr.appendChild(element('td', value)); });
+                if (x === curve.sustained) {
+                    tr.appendChild(element('td', 'max sustainable', 'sustained'));
+                } else if (isSustained(x)) {
+                    tr.appendChild(element('td', ''));
+                } else {
+                    tr.appendChild(element('td', curve.knee, 'FAILED'));
+                }
+                table.appendChild(tr);
+            });
+            container.appendChild(table);
+
+            var width = 480, height = 160;
+            var maxRps = Math.max.apply(null, curve.steps.map(function (step) { return step[1]; })) || 1;
+            var maxP99 = Math.max.apply(null, curve.steps.map(function (step) { return step[3]; })) || 1;
+            var points = curve.steps.map(function (step) {
+                return (5 + step[1] * (width - 10) / maxRps).toFixed(1) + ',' +
+                       (height - 5 - Math.max(step[3], 0) * (height - 10) / maxP99).toFixed(1);
+            });
+            var chart = '<polyline fill="none" stroke="#1f77b4" points="' + points.join(' ') + '"/>';
+            points.forEach(function (point, x) {
+                var xy = point.split(',');
+                chart += '<circle cx="' + xy[0] + '" cy="' + xy[1] + '" r="3" fill="' +
+                    (x === curve.sustained ? '#2ca02c' : isSustained(x) ? '#1f77b4' : '#c00') + '"/>';
+            });
+            var div = element('div', undefined, 'chart');
+            div.appendChild(element('div', 'p99 response time against throughput'));
+            var svg = element('div');
+            svg.innerHTML = '<svg width="' + width + '" height="' + height + '" style="border: 1px solid #ccc">' +
+                chart + '</svg>';
+            div.appendChild(svg);
+            div.appendChild(element('div', 'Throughput: 0 - ' + maxRps.toFixed(2) + ' RPS, p99: 0 - ' +
+                                     maxP99.toFixed(2) + ' ms'));
+            container.appendChild(div);
+            return container;
+        }
+
+        function renderDetails() {
+            var details = document.getElementById('details');
+            var label = data.rows[state.selected][labelIndex];
+            var metrics = data.metrics[label];
+            details.textContent = '';
+            details.appendChild(element('h3', label));
+            if (!metrics) { return; }
+
+            var series = [], statsTable = element('table'), header = element('tr');
+            ['', 'Requests', 'Avg (ms)', 'p50 (ms)', 'p90 (ms)', 'p99 (ms)', 'Max (ms)'].forEach(function (field) {
+                header.appendChild(element('th', field));
+            });
+            statsTable.appendChild(header);
+            [['Client', 'client', '#1f77b4'], ['Server', 'server', '#ff7f0e']].forEach(function (kind) {
+                var buckets = getBuckets(metrics[kind[1]]), stats = getStats(buckets);
+                if (!stats) { return; }
+                series.push({buckets: buckets, color: kind[2]});
+                var tr = element('tr');
+                tr.appendChild(element('th', kind[0], kind[1]));
+                [stats.count, stats.mean, stats.p50, stats.p90, stats.p99, stats.max].forEach(function (value, x) {
+                    tr.appendChild(element('td', x ? value.toFixed(2) : value));
+                });
+                statsTable.appendChild(tr);
+            });
+            details.appendChild(statsTable);
+
+            var notes = [];
+            Object.keys(metrics.phases).forEach(function (phase) {
+                notes.push(phase + ' avg ' + metrics.phases[phase].toFixed(2) + ' ms');
+            });
+            Object.keys(metrics.errors).forEach(function (error) {
+                notes.push(metrics.errors[error] + ' ' + error);
+            });
+            if (notes.length) { details.appendChild(element('div', notes.join(', '))); }
+
+            if (series.length) {
+                var legend = element('div', undefined, 'legend');
+                legend.appendChild(element('span', '\\u25a0 client-side', 'client'));
+                legend.appendChild(element('span', '\\u25a0 server-side', 'server'));
+                details.appendChild(legend);
+                details.appendChild(renderCharts(series));
+            }
+
+            var curve = data.capacity && data.capacity.curves[label];
+            if (curve) { details.appendChild(renderCapacity(curve)); }
+
+            var medians = data.history && data.history.medians[label];
+            if (medians) {
+                details.appendChild(element('div', 'p50 (ms) of the last ' + medians.length + ' runs (' +
+                    data.history.runs[0] + ' - ' + data.history.runs[data.history.runs.length - 1] + '): ' +
+                    medians.map(function (value) { return value === null ? '-' : value.toFixed(2); }).join(', ')));
+                var trend = element('div');
+                trend.innerHTML = sparkline(medians, 480, 60);
+                details.appendChild(trend);
+            }
+        }
+
+        document.getElementById('filter').addEventListener('input', filterRows);
+        document.getElementById('previous').addEventListener('click', function () {
+            state.page = Math.max(0, state.page - 1);
+            renderRows();
+        });
+        document.getElementById('next').addEventListener('click', function () {
+            state.page += 1;
+            renderRows();
+        });
+        renderSummary();
+        render();
+    })();
+    </script>
+    </body>
+</html>
+"""
+
+
+def _get_buckets(latency_histogram):
+    """Flatten the buckets of a histogram to a [value, count, value, count...] list."""
+    buckets = []
+    for value, count in latency_histogram.get_buckets():
+        buckets += [round(value, 3), count]
+    return buckets
+
+
+def write_report(path, title, summary_rows, field_names, rows, call_metrics, history=None, capacity=None):
+    """Write an interactive, self-contained HTML report of the results of a run.
+
+    The report lists the summary rows and the results table (rows of `field_names` values); the
+    results can be sorted, filtered and paged through, and selecting an API call shows the
+    histogram and cumulative distribution of its client-side and server-side response times from
+    its CallMetrics (`call_metrics` being keyed by API call label, or an iterable of (label,
+    CallMetrics) tuples). If given, `history` holds the start time of the latest runs (`runs`) and
+    the median response time of each API call in those (`medians`, keyed by API call label), shown
+    as trend sparklines. If given, `capacity` holds the name of the load of a capacity search
+    (`load`) and the steps of the search of each API call (`curves`, keyed by API call label; see
+    ApiPerformance.run_capacity_search()), shown as tables and latency / throughput curves.
+
+    The data is embedded as a single compact JSON document from which the page renders only what is
+    shown, so that the report stays fast for tens of thousands of API calls. The document is written
+    one row (and one CallMetrics) at a time, so `rows` and `call_metrics` may be streamed.
+    """
+    if hasattr(call_metrics, 'items'):
+        call_metrics = call_metrics.items()
+
+    def dumps(value):
+        # '</' is escaped so that no value can end the script element the data is embedded in
+        return json.dumps(value, separators=(',', ':')).replace('</', '<\\/')
+
+    page_prefix, page_suffix = _TEMPLATE.replace('{{title}}', html.escape(title)).replace(
+        '{{page_size}}', str(PAGE_SIZE)).split('{{data}}')
+    with open(path, 'w') as f:
+        f.write(page_prefix)
+        f.write('{"summary":%s,"fields":%s,"rows":[' % (
+            dumps([[str(value) for value in row] for row in summary_rows]), dumps(field_names)))
+        for x, row in enumerate(rows):
+            f.write((',' if x else '') + dumps([str(value) for value in row]))
+        f.write('],"metrics":{')
+        for x, (label, metrics) in enumerate(call_metrics):
+            f.write('%s%s:%s' % (',' if x else '', dumps(label), dumps({
+                'client': _get_buckets(metrics.client_times),
+                'server': _get_buckets(metrics.server_times),
+                'errors': dict(metrics.errors),
+                'phases': {phase: round(phase_times.mean(), 3)
+                           for phase, phase_times in metrics.phase_times.items() if phase_times.count}
+            })))
+        f.write('},"history":%s,"capacity":%s}' % (dumps(history), dumps(capacity)))
+        f.write(page_suffix)
@@ -0,0 +1,136 @@
+import collections
+import threading
+
+
+class DependencyScheduler(object):
+    """Run tasks as soon as the inputs they depend on are available.
+
+    Tasks are added along with the input they require (if any) and the inputs they produce, forming a
+    dependency graph of producers and consumers; inputs are opaque keys (e.g. the path template whose
+    ID pool a task fills or needs). A task is submitted, with `submit` (which returns a
+    concurrent.futures.Future), as soon as its input is available, i.e. provide() was called for it -
+    possibly by a producer which is still running. A task whose input cannot become available any
+    more, because every producer of the input finished without providing it (and no more tasks are
+    to be added, see close()), is skipped along with the tasks depending on what it would produce;
+    `on_skip` (if given) is called with each skipped task.
+
+    Tasks are added in order; wait() returns their results in that order, None for skipped tasks.
+    If `on_result` is given, it is called instead with each task and its result (None if skipped) as
+    soon as the task is done, in the order in which tasks finish: results are then not kept, and
+    neither are those of finished tasks held back behind a task still waiting for its input, so that
+    the number of tasks is not bounded by memory. If `max_running` is given, add() blocks while that
+    many tasks are submitted and not finished yet.
+    """
+
+    def __init__(self, submit, on_skip=None, on_result=None, max_running=None):
+        self.submit = submit
+        self.on_skip = on_skip
+        self.on_result = on_result
+        self.max_running = max_running
+
+        self._condition = threading.Condition()
+        self._closed = False
+        self._available = set()
+        self._num_added = 0
+        self._num_pending = 0
+        self._num_running = 0
+        # tasks and futures (None for skipped tasks) by index, until their result is handed out
+        self._tasks = {}
+        self._futures = {}
+        self._error = None
+        # tasks (index, task, produced inputs) waiting for each input
+        self._waiting = collections.defaultdict(list)
+        # number of the producers of each input which have not finished yet
+        self._pending_producers = collections.Counter()
+
+    def _finish(self, x, produces):
+        """Account for a task having finished (or been skipped); the caller holds the condition."""
+        self._num_pending -= 1
+        for produced in produces:
+            self._pending_producers[produced] -= 1
+        if self.on_result:
+            self._hand_out_result(x)
+        self._skip_unavailable()
+        self._condition.notify_all()
+
+    def _hand_out_result(self, x):
+        """Pass the result of a task done to on_result; the caller holds the condition."""
+        future = self._futures.pop(x)
+        task = self._tasks.pop(x)
+        try:
+            self.on_result(task, future.result() if future else None)
+        except Exception as e:
+            # raised by wait(), as on_result is called from the threads running the tasks
+            self._error = self._error or e
+
+    def _skip_unavailable(self):
+        """Skip the tasks waiting for inputs which no producer can provide any more."""
+        if not self._closed:
+            return
+        for required in [required for required in self._waiting
+                         if not self._pending_producers[required] and required not in self._available]:
+            for x, task, produces in self._waiting.pop(required, []):
+                if self.on_skip:
+                    self.on_skip(task)
+                self._futures[x] = None
+                self._finish(x, produces)
+
+    def _submit(self, x, task, produces):
+        self._num_running += 1
+        future = self.submit(task)
+        self._futures[x] = future
+
+        def done(_):
+            with self._condition:
+                self._num_running -= 1
+                self._finish(x, produces)
+
+        future.add_done_callback(done)
+
+    def add(self, task, requires=None, produces=()):
+        """Add a task, requiring the input `requires` (if any) and producing the inputs `produces`."""
+        with self._condition:
+            while self.max_running and self._num_running >= self.max_running:
+                self._condition.wait()
+
+            x = self._num_added
+            self._num_added += 1
+            self._tasks[x] = task
+            self._num_pending += 1
+            for produced in produces:
+                self._pending_producers[produced] += 1
+
+            if requires is None or requires in self._available:
+                self._submit(x, task, produces)
+            else:
+                self._waiting[requires].append((x, task, produces))
+
+    def close(self):
+        """Mark that no more tasks will be added, so that tasks whose input cannot become available
+        are skipped."""
+        with self._condition:
+            self._closed = True
+            self._skip_unavailable()
+            self._condition.notify_all()
+
+    def provide(self, produced):
+        """Make an input available (which may be called from any thread), running its consumers."""
+        with self._condition:
+            if produced in self._available:
+                return
+            self._available.add(produced)
+            for x, task, produces in self._waiting.pop(produced, []):
+                self._submit(x, task, produces)
+
+    def wait(self):
+        """Close the scheduler and wait until every task has finished or been skipped; returns the list
+        of the results of the tasks, in the order in which they were added (empty if on_result is
+        given)."""
+        self.close()
+        with self._condition:
+            while self._num_pending:
+                self._condition.wait()
+        if self._error:
+            raise self._error
+        return [self._futures[x].result() if self._futures[x] else None
+                for x in range(self._num_added) if x in self._futures]
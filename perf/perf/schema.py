@@ -0,0 +1,117 @@
+from perf import utils
+
+import base64
+import datetime
+import uuid
+
+
+def _get_string_example(schema, unique):
+    string_format = schema.get('format')
+    if string_format == 'date-time':
+        return datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
+    if string_format == 'date':
+        return datetime.date.today().isoformat()
+    if string_format == 'uuid':
+        return str(uuid.uuid4())
+    if string_format == 'email':
+        return f'perf-{unique}@example.com'
+    if string_format in ['uri', 'url']:
+        return f'https://example.com/perf-{unique}'
+    if string_format == 'byte':
+        return base64.b64encode(f'perf-{unique}'.encode()).decode()
+
+    value = f'perf-{unique}'
+    min_length = schema.get('minLength', 0)
+    max_length = schema.get('maxLength')
+    if len(value) < min_length:
+        value += 'x' * (min_length - len(value))
+    if max_length is not None:
+        value = value[-max_length:] if max_length else ''
+    return value
+
+
+def _get_number_example(schema, number_type):
+    minimum = schema.get('minimum')
+    maximum = schema.get('maximum')
+    step = 1 if number_type is int else 0.5
+
+    # OpenAPI 2.0 / 3.0 use booleans for exclusive bounds, OpenAPI 3.1 (JSON schema) uses numbers
+    exclusive_minimum = schema.get('exclusiveMinimum')
+    if isinstance(exclusive_minimum, bool):
+        if exclusive_minimum and minimum is not None:
+            minimum += step
+    elif exclusive_minimum is not None:
+        minimum = exclusive_minimum + step
+    exclusive_maximum = schema.get('exclusiveMaximum')
+    if isinstance(exclusive_maximum, bool):
+        if exclusive_maximum and maximum is not None:
+            maximum -= step
+    elif exclusive_maximum is not None:
+        maximum = exclusive_maximum - step
+
+    value = minimum if minimum is not None else min(1, maximum) if maximum is not None else 1
+    return number_type(value)
+
+
+def get_example(document, schema, unique=None, refs=()):
+    """Build a value which is valid against a schema of an API spec (OpenAPI 2.0 or 3.x).
+
+    The `example`, `default` or first `enum` value of a schema is used if given; otherwise a value
+    of its type is built, honoring the usual constraints (formats, lengths, bounds, numbers of items).
+    Objects get all of their properties which are not read-only. Strings embed `unique` (by default, a
+    random token), so that objects created with different examples do not conflict. Returns None for
+    a recursive schema within itself (`refs` being the references being built), which is left out of
+    the example unless required.
+    """
+    if unique is None:
+        unique = uuid.uuid4().hex[:12]
+
+    schema = schema or {}
+    if '$ref' in schema:
+        if schema['$ref'] in refs:
+            return None
+        refs += (schema['$ref'],)
+    schema = utils.resolve_ref(document, schema)
+    for key in ['example', 'default']:
+        if key in schema:
+            return schema[key]
+    if schema.get('enum'):
+        return schema['enum'][0]
+
+    if 'allOf' in schema:
+        value = {}
+        for sub_schema in schema['allOf']:
+            sub_value = get_example(document, sub_schema, unique, refs)
+            if isinstance(sub_value, dict):
+                value.update(sub_value)
+        return value
+    for key in ['oneOf', 'anyOf']:
+        if schema.get(key):
+            return get_example(document, schema[key][0], unique, refs)
+
+    schema_type = schema.get('type')
+    if isinstance(schema_type, list):
+        # OpenAPI 3.1, e.g. ['string', 'null']
+        schema_type = next((item for item in schema_type if item != 'null'), None)
+    if schema_type is None:
+        schema_type = 'object' if 'properties' in schema else 'string'
+
+    if schema_type == 'object':
+        value = {}
+        for name, property_schema in schema.get('properties', {}).items():
+            if utils.resolve_ref(document, property_schema).get('readOnly'):
+                continue
+            property_value = get_example(document, property_schema, unique, refs)
+            if property_value is not None or name in schema.get('required', []):
+                value[name] = property_value
+        return value
+    if schema_type == 'array':
+        item = get_example(document, schema.get('items', {}), unique, refs)
+        return [] if item is None else [item] * max(schema.get('minItems', 1), 1)
+    if schema_type == 'integer':
+        return _get_number_example(schema, int)
+    if schema_type == 'number':
+        return _get_number_example(schema, float)
+    if schema_type == 'boolean':
+        return True
+    return _get_string_example(schema, unique)
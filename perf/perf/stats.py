@@ -0,0 +1,83 @@
+import math
+import statistics
+
+
+def mann_whitney_u(baseline, candidate):
+    """Test whether the values of `candidate` tend to be greater than those of `baseline`.
+
+    Both arguments are lists of (value, count) tuples, as returned by LatencyHistogram.get_buckets().
+    The one-sided Mann-Whitney U test makes no assumption about the shape of either distribution,
+    which suits (typically long-tailed) latencies. Returns the U statistic of `candidate` and the
+    p-value, using the normal approximation with tie and continuity correction.
+    """
+    baseline_size = sum(count for _, count in baseline)
+    candidate_size = sum(count for _, count in candidate)
+    if not baseline_size or not candidate_size:
+        return None, 1.0
+
+    counts = {}
+    for value, count in baseline:
+        counts.setdefault(value, [0, 0])[0] += count
+    for value, count in candidate:
+        counts.setdefault(value, [0, 0])[1] += count
+
+    # rank all values together; tied values get the average of the ranks they span
+    rank_sum = 0.0
+    tie_correction = 0
+    rank = 0
+    for value in sorted(counts):
+        baseline_count, candidate_count = counts[value]
+        ties = baseline_count + candidate_count
+        rank_sum += candidate_count * (rank + (ties + 1) / 2)
+        tie_correction += ties ** 3 - ties
+        rank += ties
+
+    size = baseline_size + candidate_size
+    u = rank_sum - candidate_size * (candidate_size + 1) / 2
+    mean = baseline_size * candidate_size / 2
+    variance = baseline_size * candidate_size / 12 * (
+        (size + 1) - tie_correction / (size * (size - 1)))
+    if variance <= 0:
+        return u, 1.0
+
+    z = (u - mean - 0.5) / math.sqrt(variance)
+    return u, 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def _get_t_quantile(probability, degrees_of_freedom):
+    """Approximate a quantile of Student's t distribution (Cornish-Fisher expansion)."""
+    z = statistics.NormalDist().inv_cdf(probability)
+    return (z + (z ** 3 + z) / (4 * degrees_of_freedom) +
+            (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * degrees_of_freedom ** 2) +
+            (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * degrees_of_freedom ** 3))
+
+
+def get_confidence_interval(samples, confidence=0.95, percentile=None):
+    """Get a confidence interval of the mean (or the given percentile) of samples.
+
+    Returns a (low, estimate, high) tuple, or None if there are too few samples to bound the
+    statistic. The interval of the mean is based on Student's t distribution; the interval of a
+    percentile is distribution-free, bounded by the order statistics whose ranks are the normal
+    approximation of the binomial distribution of the number of samples below the percentile.
+    """
+    size = len(samples)
+    if size < 2:
+        return None
+
+    if percentile is None:
+        mean = statistics.mean(samples)
+        margin = (_get_t_quantile((1 + confidence) / 2, size - 1) *
+                  statistics.stdev(samples) / math.sqrt(size))
+        return mean - margin, mean, mean + margin
+
+    fraction = percentile / 100
+    z = statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+    margin = z * math.sqrt(size * fraction * (1 - fraction))
+    low_rank = math.floor(size * fraction - margin)
+    high_rank = math.ceil(size * fraction + margin)
+    if low_rank < 1 or high_rank > size:
+        return None
+
+    samples = sorted(samples)
+    estimate = samples[max(math.ceil(size * fraction), 1) - 1]
+    return samples[low_rank - 1], estimate, samples[high_rank - 1]
@@ -0,0 +1,89 @@
+from perf import histogram
+
+import json
+import sqlite3
+
+
+class ResultStore(object):
+    """SQLite database of the results of every performance test run.
+
+    Each run records its metadata (API URL, mode, build identifiers) along with a row per API call
+    holding its status, object count and serialized latency histograms (see histogram.CallMetrics).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._connection = sqlite3.connect(path)
+        self._connection.row_factory = sqlite3.Row
+        with self._connection:
+            self._connection.executescript("""
+                CREATE TABLE IF NOT EXISTS runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    started_at TEXT NOT NULL,
+                    api_base_url TEXT NOT NULL,
+                    mode TEXT NOT NULL,
+                    git_commit TEXT,
+                    build_tag TEXT,
+                    metadata TEXT
+                );
+                CREATE TABLE IF NOT EXISTS results (
+                    run_id INTEGER NOT NULL REFERENCES runs (id),
+                    label TEXT NOT NULL,
+                    description TEXT,
+                    object_count INTEGER,
+                    status TEXT NOT NULL,
+                    metrics TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS results_run_id ON results (run_id);
+                CREATE INDEX IF NOT EXISTS results_label ON results (label, run_id);
+            """)
+
+    def add_run(self, started_at, api_base_url, mode, git_commit=None, build_tag=None,
+                metadata=None):
+        """Record a new run; returns its ID."""
+        with self._connection:
+            cursor = self._connection.execute(
+                'INSERT INTO runs (started_at, api_base_url, mode, git_commit, build_tag, metadata) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (started_at, api_base_url, mode, git_commit, build_tag, json.dumps(metadata or {})))
+        return cursor.lastrowid
+
+    def add_results(self, run_id, results):
+        """Record the results of a run.
+
+        `results` is an iterable of (label, description, object count, status, CallMetrics) tuples.
+        """
+        with self._connection:
+            self._connection.executemany(
+                'INSERT INTO results (run_id, label, description, object_count, status, metrics) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                ((run_id, label, description, object_count, status,
+                  json.dumps(metrics.to_dict(), separators=(',', ':')))
+                 for label, description, object_count, status, metrics in results))
+
+    def close(self):
+        self._connection.close()
+
+    def get_latest_run(self, api_base_url, mode):
+        """Get the most recent run against the given API in the given mode, if any."""
+        return self._connection.execute(
+            'SELECT * FROM runs WHERE api_base_url = ? AND mode = ? ORDER BY id DESC LIMIT 1',
+            (api_base_url, mode)).fetchone()
+
+    def get_results(self, run_id):
+        """Get the results of a run, keyed by API call label."""
+        results = {}
+        for row in self._connection.execute('SELECT * FROM results WHERE run_id = ?', (run_id,)):
+            result = dict(row)
+            result['metrics'] = histogram.CallMetrics.from_dict(json.loads(row['metrics']))
+            results[row['label']] = result
+        return results
+
+    def get_runs(self, api_base_url, mode, limit):
+        """Get the `limit` most recent runs against the given API in the given mode, oldest first."""
+        return list(reversed(self._connection.execute(
+            'SELECT * FROM runs WHERE api_base_url = ? AND mode = ? ORDER BY id DESC LIMIT ?',
+            (api_base_url, mode, limit)).fetchall()))
+
+    def get_run(self, run_id):
+        return self._connection.execute('SELECT * FROM runs WHERE id = ?', (run_id,)).fetchone()
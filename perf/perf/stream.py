@@ -0,0 +1,102 @@
+from perf import histogram
+
+import json
+import threading
+
+
+class ResultRecord(object):
+    """Result of an API call read back from a ResultStream: its result row, its CallMetrics (if any)
+    and the API call itself (if it was kept)."""
+
+    __slots__ = ('row', 'metrics', 'api_call')
+
+    def __init__(self, row, metrics=None, api_call=None):
+        self.row = row
+        self.metrics = metrics
+        self.api_call = api_call
+
+
+class ResultStream(object):
+    """Results of a run, appended to a file (JSON lines) as they come rather than kept in memory.
+
+    A ResultStream stands in for the list of result rows: rows are added with append(), along with
+    the CallMetrics and API call they belong to, and iterating over it reads the rows back from the
+    file, one at a time; see records() for the rest of each result.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'w')
+        self._lock = threading.Lock()
+        self._num_rows = 0
+
+    def __iter__(self):
+        for record in self.records():
+            yield record.row
+
+    def __len__(self):
+        return self._num_rows
+
+    def append(self, row, metrics=None, api_call=None):
+        line = json.dumps({'row': row,
+                           'metrics': metrics.to_dict() if metrics else None,
+                           'api_call': api_call}, separators=(',', ':'))
+        with self._lock:
+            self._file.write(line + '\n')
+            self._num_rows += 1
+
+    def close(self):
+        self._file.close()
+
+    def records(self):
+        """Generate the results appended so far, as ResultRecord objects, in order."""
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+        with open(self.path, 'r') as f:
+            for line in f:
+                result = json.loads(line)
+                yield ResultRecord(
+                    result['row'],
+                    histogram.CallMetrics.from_dict(result['metrics']) if result['metrics'] else None,
+                    result['api_call'])
+
+
+def get_table_lines(table, rows, chunk_size=1000):
+    """Generate the lines of the text of `table` (a prettytable.PrettyTable without rows) holding
+    `rows`, without having every row in memory at once.
+
+    `rows` is iterated over twice: first to size the columns, then to format the rows, a chunk of
+    `chunk_size` rows at a time. The text is the same as if all rows were added to the table.
+    """
+    widths = {field_name: len(field_name) for field_name in table.field_names}
+    num_rows = 0
+    for row in rows:
+        num_rows += 1
+        for field_name, value in zip(table.field_names, row):
+            widths[field_name] = max([widths[field_name]] + [len(line) for line in str(value).split('\n')])
+
+    if not num_rows:
+        yield from str(table).split('\n')
+        return
+
+    chunk_table = table.copy()
+    chunk_table.min_width = widths
+    bottom_border = None
+    rows = iter(rows)
+    while True:
+        chunk_table.clear_rows()
+        for row in rows:
+            chunk_table.add_row(row)
+            if len(chunk_table.rows) == chunk_size:
+                break
+        if not chunk_table.rows:
+            break
+
+        lines = chunk_table.get_string(header=bottom_border is None).split('\n')
+        # chunks after the first one continue the table, without a border in between
+        if bottom_border is not None:
+            lines = lines[1:]
+        yield from lines[:-1]
+        bottom_border = lines[-1]
+    yield bottom_border
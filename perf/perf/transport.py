@@ -0,0 +1,93 @@
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+import socket
+import threading
+import time
+
+# phases of establishing connections made by the current thread, in milliseconds
+_phase_timings = threading.local()
+
+
+def get_phase_timings():
+    """Get the time spent (in milliseconds) on DNS resolution, TCP connection and TLS handshake.
+
+    Only connections established by the current thread since the last call to reset_phase_timings()
+    are accounted for; a request sent over a kept-alive connection spends no time on these phases.
+    """
+    timings = getattr(_phase_timings, 'timings', {})
+    return {phase: timings.get(phase, 0.0) for phase in ['dns', 'connect', 'tls']}
+
+
+def reset_phase_timings():
+    _phase_timings.timings = {}
+
+
+def _record_phase_timing(phase, milliseconds):
+    timings = getattr(_phase_timings, 'timings', None)
+    if timings is None:
+        timings = _phase_timings.timings = {}
+    timings[phase] = timings.get(phase, 0.0) + milliseconds
+
+
+class _TimedConnectionMixin(object):
+
+    def _new_conn(self):
+        # resolve the host name separately from (and ahead of) establishing the TCP connection,
+        # then have urllib3 connect to the resolved address. TLS still uses the host name.
+        start = time.perf_counter()
+        host = self._dns_host
+        try:
+            address = socket.getaddrinfo(host, self.port, 0, socket.SOCK_STREAM)[0][4][0]
+        except socket.gaierror:
+            # let urllib3 fail to resolve the host name and report it as usual
+            address = host
+        resolved = time.perf_counter()
+
+        self._dns_host = address
+        try:
+            conn = super()._new_conn()
+        finally:
+            self._dns_host = host
+        connected = time.perf_counter()
+
+        _record_phase_timing('dns', (resolved - start) * 1000)
+        _record_phase_timing('connect', (connected - resolved) * 1000)
+        self._new_conn_time = connected - start
+        return conn
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+
+    def connect(self):
+        self._new_conn_time = 0
+        start = time.perf_counter()
+        super().connect()
+        _record_phase_timing('tls', (time.perf_counter() - start - self._new_conn_time) * 1000)
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """Transport adapter whose connections time DNS resolution, TCP connection and TLS handshake.
+
+    See get_phase_timings().
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool
+        }
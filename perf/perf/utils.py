@@ -1,6 +1,123 @@
-from itertools import chain, combinations
+from itertools import chain, combinations, product
+import hashlib
+import json
 import logging
+import os
+import re
+import subprocess
 import sys
+from urllib.parse import unquote
+
+
+# skips JSON whitespace
+_skip_whitespace = re.compile(r'[ \t\n\r]*').match
+_json_decoder = json.JSONDecoder()
+
+_path_param = re.compile(r'{([^{}/]+)}')
+
+
+def get_json_fields(text, fields, list_fields=(), num_items=1):
+    """Get some members of a JSON object without decoding the rest of it.
+
+    Returns a dict holding the members of the (top-level) JSON object whose names are in `fields`, or
+    in `list_fields` - of which only the first `num_items` items are decoded, if the value is an
+    array. For example:
+
+    get_json_fields('{"count": 2, "result": [{"uuid": "a"}, {"uuid": "b"}], "time": "3mS"}',
+                    ['count', 'time'], ['result'])
+    --> {'count': 2, 'result': [{'uuid': 'a'}], 'time': '3mS'}
+
+    Members are read from the start of the object until an array or object value is found; a member of
+    `fields` placed after it can only be found if it is the last member of the object. Returns None if
+    a member may be present but could not be found this way (or if `text` is not a JSON object), in
+    which case the whole text should be decoded instead.
+    """
+    found = {}
+    pos = _skip_whitespace(text, 0).end()
+    if text[pos:pos + 1] != '{':
+        return None
+
+    # read members from the start of the object: scalar values are cheap to decode (or skip)
+    pos = _skip_whitespace(text, pos + 1).end()
+    complete = text[pos:pos + 1] == '}'
+    while not complete:
+        if text[pos:pos + 1] != '"':
+            return None
+        key, pos = json.decoder.scanstring(text, pos + 1)
+        pos = _skip_whitespace(text, pos).end()
+        if text[pos:pos + 1] != ':':
+            return None
+        pos = _skip_whitespace(text, pos + 1).end()
+
+        if key in list_fields and text[pos:pos + 1] == '[':
+            found[key] = []
+            pos = _skip_whitespace(text, pos + 1).end()
+            is_list_complete = text[pos:pos + 1] == ']'
+            while not is_list_complete and len(found[key]) < num_items:
+                item, pos = _json_decoder.raw_decode(text, pos)
+                found[key].append(item)
+                pos = _skip_whitespace(text, pos).end()
+                if text[pos:pos + 1] == ',':
+                    pos = _skip_whitespace(text, pos + 1).end()
+                elif text[pos:pos + 1] == ']':
+                    is_list_complete = True
+                else:
+                    return None
+            if not is_list_complete:
+                break
+            pos += 1
+        elif text[pos:pos + 1] in ('[', '{') and key not in fields:
+            # skipping an array or object would take about as long as decoding it
+            break
+        else:
+            value, pos = _json_decoder.raw_decode(text, pos)
+            if key in fields or key in list_fields:
+                found[key] = value
+
+        pos = _skip_whitespace(text, pos).end()
+        if text[pos:pos + 1] == ',':
+            pos = _skip_whitespace(text, pos + 1).end()
+        elif text[pos:pos + 1] == '}':
+            complete = True
+        else:
+            return None
+
+    if complete:
+        return found
+    if any(key not in found for key in list_fields):
+        return None
+
+    # read the last member of the object, which e.g. the server-side response time typically is
+    for key in fields:
+        if key in found:
+            continue
+        pos = text.rfind(json.dumps(key))
+        if pos < 0:
+            return None
+        # the quote must not be escaped, i.e. be part of a longer string
+        backslashes = 0
+        while pos > backslashes and text[pos - backslashes - 1] == '\\':
+            backslashes += 1
+        if backslashes % 2:
+            return None
+        _, pos = json.decoder.scanstring(text, pos + 1)
+        pos = _skip_whitespace(text, pos).end()
+        if text[pos:pos + 1] != ':':
+            return None
+        try:
+            value, pos = _json_decoder.raw_decode(text, _skip_whitespace(text, pos + 1).end())
+        except ValueError:
+            return None
+        if text[pos:].strip(' \t\n\r') != '}':
+            return None
+        found[key] = value
+
+    return found
+
+
+def get_path_params(path):
+    """Get the names of the parameters of a path template, e.g. ['id', 'id2'] for /a/{id}/b/{id2}."""
+    return _path_param.findall(path)
 
 
 def get_logger(level=logging.INFO, logger_name='api_perf_logger'):
@@ -47,3 +164,153 @@ def get_zfill_hyphenated_uuid(base_uuid, number):
         raise RuntimeError('Wrong base_uuid length')
 
     return '{}-{}'.format(base_uuid, str(number).zfill(12))
+
+
+def get_compatible_subsets(items, conflicts):
+    """Get every non-empty subset of items in which no two items conflict with one another.
+
+    conflicts maps an item to the items it may not be combined with; a conflict declared by either
+    item of a pair applies to both, and an item which conflicts with itself is never used. Subsets
+    containing a conflict are pruned while enumerating (rather than filtered afterwards), so each
+    compatible subset is built and yielded exactly once, as a sorted tuple.
+
+    For example:
+    get_compatible_subsets([1,2,3], {1: [2]}) --> (1,) (1,3) (2,) (2,3) (3,)
+    """
+    items = sorted(items)
+    conflicts = {item: frozenset(conflicts.get(item, ())) for item in items}
+
+    def is_compatible(item, subset):
+        return not any(other in conflicts[item] or item in conflicts[other] for other in subset)
+
+    def extend(subset, start):
+        for x in range(start, len(items)):
+            item = items[x]
+            if item in conflicts[item] or not is_compatible(item, subset):
+                continue
+            extended_subset = subset + (item,)
+            yield extended_subset
+            yield from extend(extended_subset, x + 1)
+
+    return extend((), 0)
+
+
+def get_covering_array(domains, conflicts, strength=2):
+    """Get rows of parameter values which cover every valid combination of `strength` parameter values.
+
+    domains maps each parameter to its possible values. Any parameter may also be absent from a row,
+    which is treated as one more value to be covered. conflicts maps a parameter to the parameters it
+    may not be combined with (see get_compatible_subsets()). Rows are built greedily: each row starts
+    from a combination which is not yet covered and every other parameter gets the value covering the
+    most remaining combinations. Rows are yielded as dicts of the parameters present in them; a row
+    with no parameters at all is not yielded.
+
+    For example:
+    get_covering_array({1: ['a'], 2: ['a'], 3: ['a']}, {}) --> {1:'a'} {3:'a'} {2:'a'} {1:'a',2:'a',3:'a'}
+    """
+    params = sorted(param for param in domains if param not in conflicts.get(param, ()))
+    conflicts = {param: frozenset(conflicts.get(param, ())) for param in params}
+    choices = {param: list(domains[param]) + [None] for param in params}
+    strength = min(strength, len(params))
+
+    def is_compatible(param, value, row):
+        return value is None or not any(
+            other_value is not None and (other in conflicts[param] or param in conflicts[other])
+            for other, other_value in row.items())
+
+    # every combination of `strength` parameter values which may appear together in a row
+    uncovered = set()
+    for param_combo in combinations(params, strength):
+        for value_combo in product(*(choices[param] for param in param_combo)):
+            row = {}
+            for param, value in zip(param_combo, value_combo):
+                if not is_compatible(param, value, row):
+                    break
+                row[param] = value
+            else:
+                uncovered.add((param_combo, value_combo))
+
+    pending = sorted(uncovered, key=repr)
+    while uncovered:
+        while pending[-1] not in uncovered:
+            pending.pop()
+        param_combo, value_combo = pending.pop()
+        row = dict(zip(param_combo, value_combo))
+
+        for param in params:
+            if param in row:
+                continue
+
+            # combinations which the value of this parameter completes along with those already set
+            assigned = sorted(row)
+            best_value, best_score = None, -1
+            for value in choices[param]:
+                if not is_compatible(param, value, row):
+                    continue
+                score = 0
+                for others in combinations(assigned, strength - 1):
+                    key = tuple(sorted(others + (param,)))
+                    values = tuple(value if key_param == param else row[key_param]
+                                   for key_param in key)
+                    score += (key, values) in uncovered
+                if score > best_score:
+                    best_value, best_score = value, score
+            row[param] = best_value
+
+        for param_combo in combinations(params, strength):
+            uncovered.discard((param_combo, tuple(row[param] for param in param_combo)))
+
+        row = {param: row[param] for param in params if row[param] is not None}
+        if row:
+            yield row
+
+
+def get_file_digest(path):
+    """Get the SHA-256 digest of the content of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_git_commit():
+    """Get the commit being tested: $GIT_COMMIT (as set by Jenkins) or HEAD of the current directory."""
+    if os.environ.get('GIT_COMMIT'):
+        return os.environ['GIT_COMMIT']
+
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, check=True,
+                              text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_server_url(server):
+    """Get the URL of an OpenAPI 3.x `servers` entry, substituting the default of each variable."""
+    url = server['url']
+    for name, variable in server.get('variables', {}).items():
+        url = url.replace('{%s}' % name, str(variable['default']))
+    return url
+
+
+def resolve_ref(document, item):
+    """Resolve an item of a JSON document which may be a (local) JSON reference, e.g.
+
+    resolve_ref(api_spec, {'$ref': '#/components/parameters/limit'}) --> the `limit` parameter
+
+    References to references are followed; any other item is returned as is.
+    """
+    seen = set()
+    while isinstance(item, dict) and '$ref' in item:
+        ref = item['$ref']
+        if not ref.startswith('#/'):
+            raise ValueError(f'Unsupported (non-local) reference: {ref}')
+        if ref in seen:
+            raise ValueError(f'Circular reference: {ref}')
+        seen.add(ref)
+
+        item = document
+        for token in ref[2:].split('/'):
+            item = item[unquote(token).replace('~1', '/').replace('~0', '~')]
+    return item
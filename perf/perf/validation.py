@@ -0,0 +1,243 @@
+from perf import utils
+
+import re
+
+# HTTP status codes counted as success when an operation does not declare its responses
+DEFAULT_SUCCESS_STATUSES = [200, 201, 204, 207]
+
+_json_types = {
+    'object': lambda value: isinstance(value, dict),
+    'array': lambda value: isinstance(value, list),
+    'string': lambda value: isinstance(value, str),
+    'integer': lambda value: isinstance(value, int) and not isinstance(value, bool) or
+    isinstance(value, float) and value.is_integer(),
+    'number': lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    'boolean': lambda value: isinstance(value, bool),
+    'null': lambda value: value is None
+}
+
+
+def _get_json_type(value):
+    for json_type in ['null', 'boolean', 'integer', 'number', 'string', 'array', 'object']:
+        if _json_types[json_type](value):
+            return json_type
+    return type(value).__name__
+
+
+def compile_schema(document, schema, max_items=None, max_errors=10):
+    """Compile a schema of an API spec (OpenAPI 2.0 or 3.x) into a validator function.
+
+    The validator takes a (decoded JSON) value and returns the list of the errors found, up to
+    `max_errors`, each being a message prefixed with the location of the error (e.g. '$.result[3].name').
+    Types, enums, string lengths and patterns, numeric bounds, numbers of items, required and additional
+    properties and allOf / anyOf / oneOf are checked; formats are not. Only the first `max_items` items
+    of an array are validated, if given, to bound the cost of large lists. References are compiled once,
+    recursive schemas included.
+    """
+    compiled_refs = {}
+
+    def compile_node(schema):
+        if '$ref' in schema:
+            ref = schema['$ref']
+            if ref not in compiled_refs:
+                # placeholder for recursive references, which are looked up when validating
+                compiled_refs[ref] = None
+                compiled_refs[ref] = compile_node(utils.resolve_ref(document, schema))
+            return lambda value, path, errors: compiled_refs[ref](value, path, errors)
+
+        checks = []
+        schema_type = schema.get('type')
+        types = schema_type if isinstance(schema_type, list) else [schema_type] if schema_type else []
+        nullable = 'null' in types or schema.get('nullable') or schema.get('x-nullable')
+        types = [json_type for json_type in types if json_type != 'null']
+        if types:
+            def check_type(value, path, errors):
+                if not any(_json_types[json_type](value) for json_type in types):
+                    errors.append(f"{path}: expected {' or '.join(types)}, got {_get_json_type(value)}")
+                    return False
+                return True
+            checks.append(check_type)
+
+        if 'enum' in schema:
+            enum = schema['enum']
+
+            def check_enum(value, path, errors):
+                if value not in enum:
+                    errors.append(f'{path}: {value!r} is not one of {enum!r}')
+            checks.append(check_enum)
+
+        if any(key in schema for key in ['minLength', 'maxLength', 'pattern']):
+            min_length = schema.get('minLength', 0)
+            max_length = schema.get('maxLength')
+            pattern = re.compile(schema['pattern']) if 'pattern' in schema else None
+
+            def check_string(value, path, errors):
+                if not isinstance(value, str):
+                    return
+                if len(value) < min_length or max_length is not None and len(value) > max_length:
+                    errors.append(f'{path}: length {len(value)} is out of bounds')
+                if pattern and not pattern.search(value):
+                    errors.append(f'{path}: {value!r} does not match {pattern.pattern!r}')
+            checks.append(check_string)
+
+        if any(key in schema for key in ['minimum', 'maximum', 'exclusiveMinimum', 'exclusiveMaximum']):
+            # OpenAPI 2.0 / 3.0 use booleans for exclusive bounds, OpenAPI 3.1 (JSON schema) uses numbers
+            bounds = []
+            for bound, exclusive, is_below in [('minimum', 'exclusiveMinimum', True),
+                                               ('maximum', 'exclusiveMaximum', False)]:
+                if isinstance(schema.get(exclusive), bool):
+                    if bound in schema:
+                        bounds.append((schema[bound], schema[exclusive], is_below))
+                else:
+                    if bound in schema:
+                        bounds.append((schema[bound], False, is_below))
+                    if exclusive in schema:
+                        bounds.append((schema[exclusive], True, is_below))
+
+            def check_number(value, path, errors):
+                if not _json_types['number'](value):
+                    return
+                for limit, exclusive, is_below in bounds:
+                    if is_below and (value < limit or exclusive and value == limit) or \
+                            not is_below and (value > limit or exclusive and value == limit):
+                        errors.append(f"{path}: {value} is {'below' if is_below else 'above'} {limit}")
+            checks.append(check_number)
+
+        if 'items' in schema or 'minItems' in schema or 'maxItems' in schema:
+            validate_item = compile_node(schema.get('items') or {})
+            min_items = schema.get('minItems', 0)
+            max_array_items = schema.get('maxItems')
+
+            def check_array(value, path, errors):
+                if not isinstance(value, list):
+                    return
+                if len(value) < min_items or max_array_items is not None and len(value) > max_array_items:
+                    errors.append(f'{path}: {len(value)} items is out of bounds')
+                for x, item in enumerate(value[:max_items] if max_items is not None else value):
+                    validate_item(item, f'{path}[{x}]', errors)
+            checks.append(check_array)
+
+        if any(key in schema for key in ['properties', 'required', 'additionalProperties']):
+            properties = {name: compile_node(property_schema)
+                          for name, property_schema in schema.get('properties', {}).items()}
+            required = schema.get('required', [])
+            additional = schema.get('additionalProperties', True)
+            validate_additional = compile_node(additional) if isinstance(additional, dict) else None
+
+            def check_object(value, path, errors):
+                if not isinstance(value, dict):
+                    return
+                for name in required:
+                    if name not in value:
+                        errors.append(f'{path}: missing required property {name!r}')
+                for name, property_value in value.items():
+                    if name in properties:
+                        properties[name](property_value, f'{path}.{name}', errors)
+                    elif validate_additional:
+                        validate_additional(property_value, f'{path}.{name}', errors)
+                    elif additional is False:
+                        errors.append(f'{path}: unexpected property {name!r}')
+            checks.append(check_object)
+
+        for sub_schema in schema.get('allOf', []):
+            checks.append(compile_node(sub_schema))
+        for key in ['anyOf', 'oneOf']:
+            if schema.get(key):
+                alternatives = [compile_node(sub_schema) for sub_schema in schema[key]]
+
+                def check_alternatives(value, path, errors, key=key, alternatives=alternatives):
+                    num_valid = 0
+                    for validate_alternative in alternatives:
+                        alternative_errors = []
+                        validate_alternative(value, path, alternative_errors)
+                        num_valid += not alternative_errors
+                    if not num_valid or key == 'oneOf' and num_valid > 1:
+                        errors.append(f'{path}: matches {num_valid} of the schemas of {key}')
+                checks.append(check_alternatives)
+
+        def validate(value, path, errors):
+            if value is None and nullable or len(errors) >= max_errors:
+                return
+            for check in checks:
+                # no further check applies to a value of the wrong type
+                if check(value, path, errors) is False:
+                    return
+
+        return validate
+
+    validate_root = compile_node(schema)
+
+    def validator(value):
+        errors = []
+        validate_root(value, '$', errors)
+        return errors[:max_errors]
+
+    return validator
+
+
+def get_failed_items(data):
+    """Get the failed items of a multi-status (207) response body, as a list of (index, status) tuples.
+
+    The items are those of the `result` list of the body (or of the body itself, if a list), an item
+    having failed if its `status` (or `code`) is an HTTP status code of 400 or above.
+    """
+    items = data.get('result') if isinstance(data, dict) else data
+    failed_items = []
+    for x, item in enumerate(items if isinstance(items, list) else []):
+        if not isinstance(item, dict):
+            continue
+        status = item.get('status', item.get('code'))
+        try:
+            if int(status) >= 400:
+                failed_items.append((x, status))
+        except (TypeError, ValueError):
+            continue
+    return failed_items
+
+
+class OperationValidator(object):
+    """Validator of the responses of an operation of an API spec.
+
+    The response declared for a status code (e.g. '200'), a range of status codes (OpenAPI 3.x, e.g.
+    '2XX') or, failing those, the `default` response applies to a response. Validators of the response
+    bodies are compiled (see compile_schema()) on first use, once per status code.
+    """
+
+    def __init__(self, document, operation, max_items=None, max_errors=10):
+        self.document = document
+        self.responses = operation.get('responses', {})
+        self.max_items = max_items
+        self.max_errors = max_errors
+        self._validators = {}
+
+    def _get_response(self, status):
+        for key in [str(status), f'{str(status)[0]}XX', f'{str(status)[0]}xx', 'default']:
+            if key in self.responses:
+                return utils.resolve_ref(self.document, self.responses[key])
+        return None
+
+    def is_success(self, status):
+        """Determine whether a status code is a success status code declared by the operation.
+
+        Operations which declare no success (2xx) response fall back to DEFAULT_SUCCESS_STATUSES.
+        """
+        declared = [str(key).upper() for key in self.responses if str(key).startswith('2')]
+        if not declared:
+            return status in DEFAULT_SUCCESS_STATUSES
+        return str(status) in declared or '2XX' in declared and 200 <= status < 300
+
+    def validate(self, status, body):
+        """Validate a (decoded JSON) response body; returns the list of the errors found."""
+        if status not in self._validators:
+            response = self._get_response(status) or {}
+            response_schema = response.get('schema')
+            if response_schema is None:
+                # OpenAPI 3.x
+                content = response.get('content', {})
+                media_type = next((media_type for media_type in content if 'json' in media_type), None)
+                response_schema = content[media_type].get('schema') if media_type else None
+            self._validators[status] = compile_schema(self.document, response_schema, self.max_items,
+                                                      self.max_errors) if response_schema else None
+
+        validator = self._validators[status]
+        return validator(body) if validator else []
@@ -10,7 +10,6 @@ setup(
     author_email='jmader@jmader.com',
     packages=find_packages(exclude=['*.tests', '*.tests.*']),
     install_requires=[
-        'numpy',
         'prettytable',
         'requests'
     ]